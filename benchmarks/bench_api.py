@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of the API fetch and download path against the mock CommCareHQ server.
+
+Starts benchmarks/mock_hq.py in-process (or uses --url for one already running),
+points COMMCARE_HQ_URL at it, and runs the same get_forms_from_api and
+download_attachments calls the app uses, with a fresh form cache and download
+folder each run:
+
+    python benchmarks/bench_api.py --domains 3 --forms 300 --latency-ms 50 --jitter-ms 30
+    python benchmarks/bench_api.py --rate-429 0.05 --drop-rate 0.02 --triage --json results.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from urllib.parse import urlparse
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from mock_hq import add_dataset_arguments, dataset_and_faults, start_in_thread
+from photo_utility import commcare
+from photo_utility.forms import attachment_filename
+from photo_utility.scheduler import DOWNLOAD_WORKERS, ThroughputReport
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+class RequestRecorder:
+    """Times every HTTP request made through requests, split into form list pages and attachments.
+
+    Non-streamed requests are timed to the end of the body inside send(); streamed
+    downloads are timed until the response is closed.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = Counter()
+        self._orig_send = requests.Session.send
+        self._orig_close = requests.Response.close
+
+    @staticmethod
+    def kind(url):
+        return "form_list" if "/api/v0.5/form/" in urlparse(url).path else "attachment"
+
+    def _record(self, kind, seconds, status):
+        with self.lock:
+            self.latencies[kind].append(seconds)
+            self.statuses[status] += 1
+
+    def install(self):
+        recorder = self
+        orig_send, orig_close = self._orig_send, self._orig_close
+
+        def send(session, request, **kwargs):
+            started = time.perf_counter()
+            response = orig_send(session, request, **kwargs)
+            if kwargs.get("stream"):
+                response._bench_started = started
+            else:
+                recorder._record(recorder.kind(request.url), time.perf_counter() - started, response.status_code)
+            return response
+
+        def close(response):
+            started = getattr(response, "_bench_started", None)
+            if started is not None:
+                response._bench_started = None
+                recorder._record(recorder.kind(response.url), time.perf_counter() - started, response.status_code)
+            return orig_close(response)
+
+        requests.Session.send = send
+        requests.Response.close = close
+
+    def uninstall(self):
+        requests.Session.send = self._orig_send
+        requests.Response.close = self._orig_close
+
+    def summary(self):
+        out = {}
+        for kind, values in sorted(self.latencies.items()):
+            out[kind] = {
+                "requests": len(values),
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+                "max_ms": round(max(values) * 1000, 2),
+            }
+        return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark form fetch and photo download against a mock CommCareHQ")
+    parser.add_argument("--url", help="Use an already running mock server (the dataset options must match it)")
+    parser.add_argument("--limit", type=int, default=None, help="Forms per domain/app (default: all generated forms)")
+    parser.add_argument("--download-workers", type=int, default=None, help="Override DOWNLOAD_WORKERS")
+    parser.add_argument("--triage", action="store_true", help="Fetch EXIF heads only instead of full photos")
+    parser.add_argument("--warm-cache", action="store_true", help="Fetch forms twice and report the cached second pass too")
+    parser.add_argument("--json", help="Write the results as JSON to this path")
+    add_dataset_arguments(parser)
+    args = parser.parse_args()
+
+    dataset, faults = dataset_and_faults(args)
+    server = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        server = start_in_thread(dataset, faults, seed=args.seed)
+        base_url = server.base_url
+    os.environ["COMMCARE_HQ_URL"] = base_url
+
+    pairs = {domain: apps for domain, apps in dataset.app_ids.items()}
+    limit = args.limit or args.forms
+    recorder = RequestRecorder()
+    recorder.install()
+    results = {"url": base_url, "args": vars(args)}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            cache_path = tmp / "form_cache.sqlite3"
+            stats = ThroughputReport()
+
+            started = time.perf_counter()
+            records = commcare.get_forms_from_api(pairs, "", "", "bench", "bench", limit, stats=stats, cache_path=cache_path)
+            fetch_seconds = time.perf_counter() - started
+
+            if args.warm_cache:
+                started = time.perf_counter()
+                commcare.get_forms_from_api(pairs, "", "", "bench", "bench", limit, cache_path=cache_path)
+                results["warm_fetch_seconds"] = round(time.perf_counter() - started, 3)
+
+            out_dir = tmp / "photos"
+            jobs = [
+                (record, attachment, out_dir / attachment_filename(record, attachment))
+                for record in records
+                for attachment in record.attachments
+            ]
+            started = time.perf_counter()
+            handled = commcare.download_attachments(jobs, "bench", "bench", stats=stats, triage=args.triage,
+                                                   workers=args.download_workers or DOWNLOAD_WORKERS)
+            download_seconds = time.perf_counter() - started
+            bytes_on_disk = sum(p.stat().st_size for p in out_dir.glob("*") if p.is_file())
+    finally:
+        recorder.uninstall()
+        if server is not None:
+            server.shutdown()
+
+    total_bytes = sum(s.bytes for s in stats.domains())
+    results.update({
+        "forms": len(records),
+        "fetch_seconds": round(fetch_seconds, 3),
+        "forms_per_second": round(len(records) / fetch_seconds, 1) if fetch_seconds else 0.0,
+        "photos_requested": len(jobs),
+        "photos_ok": len(handled),
+        "photos_failed": sum(s.failed for s in stats.domains()),
+        "download_seconds": round(download_seconds, 3),
+        "photos_per_second": round(len(handled) / download_seconds, 1) if download_seconds else 0.0,
+        "mb_transferred": round(total_bytes / 1024 / 1024, 2),
+        "mb_per_second": round(total_bytes / 1024 / 1024 / download_seconds, 2) if download_seconds else 0.0,
+        "mb_on_disk": round(bytes_on_disk / 1024 / 1024, 2),
+        "latency": recorder.summary(),
+        "status_codes": dict(recorder.statuses),
+    })
+
+    print()
+    print(f"Server:     {base_url}")
+    print(f"Forms:      {results['forms']} in {results['fetch_seconds']}s ({results['forms_per_second']} forms/s)")
+    if "warm_fetch_seconds" in results:
+        print(f"Warm fetch: {results['warm_fetch_seconds']}s")
+    print(f"Photos:     {results['photos_ok']}/{results['photos_requested']} ok, {results['photos_failed']} failed "
+          f"in {results['download_seconds']}s ({results['photos_per_second']} photos/s, {results['mb_per_second']} MB/s)")
+    for kind, summary in results["latency"].items():
+        print(f"{kind:<11} {summary['requests']} requests, p50 {summary['p50_ms']} ms, p99 {summary['p99_ms']} ms, max {summary['max_ms']} ms")
+    print(f"Statuses:   {results['status_codes']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
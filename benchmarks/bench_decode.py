@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Benchmark how review-screen photo decoding affects the UI thread: decoding
+inline on the UI thread, in a thread pool, or in decode worker processes
+handing frames over in shared memory (the app's --decode-workers).
+
+A simulated reviewer steps through synthetic JPEGs, spending --think-ms on
+each visit. The time the "UI thread" spends getting each frame on screen is
+reported, along with how late a 5 ms heartbeat thread wakes up - a stand-in
+for Tk's event loop waiting on the GIL while decoders run:
+
+    python benchmarks/bench_decode.py --photos 120 --photo-size 3000 2250 --workers 2 --json decode.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from mock_hq import make_jpeg
+from photo_utility.decode_service import DecodeService
+from photo_utility.thumbnails import REVIEW_WIDTH, load_review_image
+
+MODES = ("inline", "threads", "service")
+HEARTBEAT_S = 0.005
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+class Heartbeat(threading.Thread):
+    """Wakes every 5 ms and records how late it woke"""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.lags = []
+        self._stopping = threading.Event()
+
+    def run(self):
+        while not self._stopping.is_set():
+            start = time.perf_counter()
+            time.sleep(HEARTBEAT_S)
+            self.lags.append(max(0.0, time.perf_counter() - start - HEARTBEAT_S))
+
+    def stop(self):
+        self._stopping.set()
+        self.join()
+
+
+def make_photos(root, count, size, variants):
+    """``count`` photo paths, hard-linked to ``variants`` distinct JPEGs"""
+    sources = []
+    for seed in range(variants):
+        source = root / f"source_{seed}.jpg"
+        source.write_bytes(make_jpeg(size[0], size[1], seed=seed, thumbnail=False))
+        sources.append(source)
+    photos = []
+    for n in range(count):
+        photo = root / f"photo_{n:05d}.jpg"
+        try:
+            os.link(sources[n % variants], photo)
+        except OSError:
+            photo.write_bytes(sources[n % variants].read_bytes())
+        photos.append(photo)
+    return photos
+
+
+def run_mode(mode, photos, args):
+    per_visit = args.photos_per_visit
+    visits = [photos[i:i + per_visit] for i in range(0, len(photos), per_visit)]
+    frame_times = []
+    pool = service = None
+    futures = {}
+    if mode == "threads":
+        pool = ThreadPoolExecutor(max_workers=args.workers)
+    elif mode == "service":
+        service = DecodeService(workers=args.workers, budget_bytes=args.budget_mb * 1024 * 1024, width=REVIEW_WIDTH)
+
+    def prefetch(index):
+        upcoming = [p for visit in visits[index + 1:index + 1 + args.prefetch_visits] for p in visit]
+        if pool is not None:
+            for path in upcoming:
+                if path not in futures:
+                    futures[path] = pool.submit(load_review_image, path, REVIEW_WIDTH)
+        elif service is not None:
+            service.prefetch(upcoming)
+
+    heartbeat = Heartbeat()
+    heartbeat.start()
+    started = time.perf_counter()
+    try:
+        for index, visit in enumerate(visits):
+            for path in visit:
+                start = time.perf_counter()
+                frame = None
+                if pool is not None and path in futures:
+                    img = futures.pop(path).result()
+                elif service is not None and (frame := service.take(path, timeout=5.0)) is not None:
+                    img = frame.image
+                else:
+                    img = load_review_image(path, REVIEW_WIDTH)
+                # Tk's PhotoImage copies the pixels into its own storage
+                img.copy()
+                img = None
+                if frame is not None:
+                    frame.release()
+                frame_times.append(time.perf_counter() - start)
+            prefetch(index)
+            time.sleep(args.think_ms / 1000.0)
+        wall = time.perf_counter() - started
+    finally:
+        heartbeat.stop()
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+        hits = misses = None
+        if service is not None:
+            hits, misses = service.hits, service.misses
+            service.close()
+
+    think = len(visits) * args.think_ms / 1000.0
+    result = {
+        "wall_s": round(wall, 3),
+        # Time not spent "thinking": what the reviewer waited for overall
+        "waiting_s": round(max(0.0, wall - think), 3),
+        "frames_per_s": round(len(photos) / max(1e-9, wall - think), 1),
+        "frame_p50_ms": round(percentile(frame_times, 50) * 1000, 2),
+        "frame_p95_ms": round(percentile(frame_times, 95) * 1000, 2),
+        "heartbeat_p95_lag_ms": round(percentile(heartbeat.lags, 95) * 1000, 2),
+        "heartbeat_max_lag_ms": round(max(heartbeat.lags, default=0.0) * 1000, 2),
+    }
+    if hits is not None:
+        result.update(prefetch_hits=hits, prefetch_misses=misses)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark inline, threaded and multi-process review photo decoding")
+    parser.add_argument("--photos", type=int, default=60, help="Photos to review (default: 60)")
+    parser.add_argument("--photo-size", type=int, nargs=2, default=[3000, 2250], metavar=("W", "H"))
+    parser.add_argument("--photo-variants", type=int, default=6, help="Distinct JPEGs the photos link to (default: 6)")
+    parser.add_argument("--photos-per-visit", type=int, default=3)
+    parser.add_argument("--think-ms", type=float, default=150.0, help="Reviewer time per visit (default: 150)")
+    parser.add_argument("--prefetch-visits", type=int, default=3, help="Visits decoded ahead (default: 3)")
+    parser.add_argument("--workers", type=int, default=2, help="Decode threads or processes (default: 2)")
+    parser.add_argument("--budget-mb", type=int, default=128, help="Decode service frame budget (default: 128)")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--json", help="Write the results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Generating {args.photo_variants} {args.photo_size[0]}x{args.photo_size[1]} JPEGs...")
+        photos = make_photos(Path(tmp), args.photos, args.photo_size, args.photo_variants)
+        modes = {}
+        for mode in args.modes:
+            modes[mode] = result = run_mode(mode, photos, args)
+            print(f"{mode:8s} frame p50 {result['frame_p50_ms']:7.2f} ms  p95 {result['frame_p95_ms']:7.2f} ms  "
+                  f"heartbeat lag p95 {result['heartbeat_p95_lag_ms']:6.2f} ms  max {result['heartbeat_max_lag_ms']:6.2f} ms  "
+                  f"waiting {result['waiting_s']:.2f} s")
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "dataset": {
+            "photos": args.photos,
+            "photo_size": args.photo_size,
+            "photos_per_visit": args.photos_per_visit,
+            "think_ms": args.think_ms,
+            "workers": args.workers,
+        },
+        "modes": modes,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
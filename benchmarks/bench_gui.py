@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Drive the real review screen on a virtual display and measure per-visit render latency.
+
+Builds a synthetic session (or opens --session FILE), opens it in the App the
+same way `python photo_utility --session` does, then clicks bucket buttons in a
+scripted order. For every visit it records click-to-painted latency (the button
+handler, then Tk processing every pending redraw), and every --sample-every
+visits the widget count, the number of live Tk images and the process RSS:
+
+    python benchmarks/bench_gui.py --visits 2000 --photos-per-visit 3 --json gui.json
+    python benchmarks/bench_gui.py --session session.json --sequence "Real,Real,Fake" --max-p95-ms 150
+
+Without DISPLAY set (or with --xvfb) an Xvfb server is started for the run.
+The script exits with status 1 when a --max-* limit is exceeded or the Tk image
+count keeps growing, which points at leaked PhotoImage references.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from mock_hq import make_jpeg
+from photo_utility.filenames import parse_commcare_filename
+from photo_utility.profiling import percentile
+from photo_utility.session import sample_visits, save_session_manifest
+
+# Live Tk images allowed above the first sample before it counts as a leak
+IMAGE_LEAK_SLACK = 16
+
+
+def start_xvfb(size):
+    """Start Xvfb on a free display, point DISPLAY at it and return the process"""
+    if shutil.which("Xvfb") is None:
+        sys.exit("Xvfb not found: install it (e.g. apt install xvfb) or run with DISPLAY set")
+    read_fd, write_fd = os.pipe()
+    proc = subprocess.Popen(
+        ["Xvfb", "-displayfd", str(write_fd), "-screen", "0", f"{size}x24", "-nolisten", "tcp"],
+        pass_fds=(write_fd,), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    os.close(write_fd)
+    display = os.read(read_fd, 16).decode().strip()
+    os.close(read_fd)
+    if not display:
+        proc.kill()
+        sys.exit("Xvfb did not report a display number")
+    os.environ["DISPLAY"] = f":{display}"
+    return proc
+
+
+def rss_bytes():
+    """Current resident set size, or the peak where /proc is not available"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def widget_count(widget):
+    return 1 + sum(widget_count(child) for child in widget.winfo_children())
+
+
+def build_session(root, visits, photos_per_visit, photo_size, variants, seed):
+    """Photos named like CommCare exports (hard links to a few real JPEGs) and a session file reviewing all of them"""
+    rng = random.Random(seed)
+    root.mkdir(parents=True, exist_ok=True)
+    sources = []
+    for i in range(variants):
+        source = root / f".variant_{i}.jpg"
+        source.write_bytes(make_jpeg(photo_size[0], photo_size[1], seed=seed + i))
+        sources.append(source)
+    metas = []
+    for v in range(visits):
+        form_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        user_id = uuid.UUID(int=rng.getrandbits(128)).hex
+        for p in range(photos_per_visit):
+            path = root / f"form-photo_{p}-{user_id}-form_{form_id}.jpg"
+            try:
+                os.link(sources[(v + p) % len(sources)], path)
+            except OSError:
+                shutil.copyfile(sources[(v + p) % len(sources)], path)
+            metas.append(parse_commcare_filename(path))
+    questions = sorted({m.question_id for m in metas})
+    selected, _ = sample_visits(metas, questions, 0, rng)
+    config = {
+        "question_ids": questions,
+        "percent": 100.0,
+        "target_count": len(metas),
+        "buckets": ["Real", "Fake"],
+        "include_known_bad": False,
+    }
+    session_path = root / "session.json"
+    save_session_manifest(session_path, config, selected)
+    return session_path
+
+
+def summarize(values_ms):
+    ordered = sorted(values_ms)
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered), 3) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 50), 3),
+        "p95_ms": round(percentile(ordered, 95), 3),
+        "p99_ms": round(percentile(ordered, 99), 3),
+        "max_ms": round(ordered[-1], 3) if ordered else 0.0,
+    }
+
+
+def drive(session_path, sequence, sample_every, max_visits):
+    """Open the session in the App and click through it; returns the measurements"""
+    from photo_utility.gui import App
+
+    app = App()
+    finished = []
+    # The real completion handler opens modal dialogs; just note that the session ended
+    app._on_review_complete = lambda: finished.append(True)
+    app.update()
+    app.open_session_manifest(str(session_path))
+    app.update()
+
+    handler_ms, paint_ms, total_ms = [], [], []
+    samples = []
+    visits = len(app.session_visits)
+    if max_visits:
+        visits = min(visits, max_visits)
+
+    def sample(index):
+        samples.append({
+            "visit": index,
+            "widgets": widget_count(app),
+            "review_widgets": widget_count(app.inner),
+            "tk_images": len(app.tk.call("image", "names")),
+            "image_refs": len(getattr(app, "_image_refs", [])),
+            "rss_mb": round(rss_bytes() / 1024 / 1024, 2),
+        })
+
+    sample(0)
+    started = time.perf_counter()
+    for index in range(visits):
+        buttons = {b.cget("text"): b for b in app.bucket_frame.winfo_children()}
+        bucket = sequence[index % len(sequence)]
+        button = buttons.get(bucket) or next(iter(buttons.values()))
+        clicked = time.perf_counter()
+        button.invoke()
+        handled = time.perf_counter()
+        # Draw everything the click scheduled, as the event loop would before the next input
+        app.update_idletasks()
+        app.update()
+        painted = time.perf_counter()
+        handler_ms.append((handled - clicked) * 1000.0)
+        paint_ms.append((painted - handled) * 1000.0)
+        total_ms.append((painted - clicked) * 1000.0)
+        if (index + 1) % sample_every == 0 or index + 1 == visits:
+            sample(index + 1)
+        if finished:
+            break
+    elapsed = time.perf_counter() - started
+    results_recorded = len(app.results)
+    app.destroy()
+    return {
+        "visits_reviewed": len(total_ms),
+        "results_recorded": results_recorded,
+        "session_finished": bool(finished),
+        "seconds": round(elapsed, 3),
+        "click_to_paint": summarize(total_ms),
+        "handler": summarize(handler_ms),
+        "paint": summarize(paint_ms),
+        "samples": samples,
+    }
+
+
+def check(results, args):
+    """Names of the limits the run broke"""
+    failures = []
+    samples = results["samples"]
+    if args.max_p95_ms and results["click_to_paint"]["p95_ms"] > args.max_p95_ms:
+        failures.append(f"p95 click-to-paint {results['click_to_paint']['p95_ms']} ms > {args.max_p95_ms} ms")
+    # Measure growth from the first sample after some clicks, once fonts and caches are warm
+    settled = samples[1:] or samples
+    growth = settled[-1]["rss_mb"] - settled[0]["rss_mb"]
+    results["rss_growth_mb"] = round(growth, 2)
+    if args.max_rss_growth_mb is not None and growth > args.max_rss_growth_mb:
+        failures.append(f"RSS grew {growth:.1f} MB > {args.max_rss_growth_mb} MB")
+    image_growth = settled[-1]["tk_images"] - settled[0]["tk_images"]
+    results["tk_image_growth"] = image_growth
+    if image_growth > IMAGE_LEAK_SLACK:
+        failures.append(f"Tk images grew by {image_growth} over the run (leaked PhotoImage references?)")
+    widget_growth = settled[-1]["widgets"] - settled[0]["widgets"]
+    results["widget_growth"] = widget_growth
+    if widget_growth > IMAGE_LEAK_SLACK:
+        failures.append(f"Widget count grew by {widget_growth} over the run")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure review screen render latency on a virtual display")
+    parser.add_argument("--session", help="Session file to review (default: build a synthetic one)")
+    parser.add_argument("--visits", type=int, default=1000, help="Synthetic visits (default: 1000)")
+    parser.add_argument("--photos-per-visit", type=int, default=3)
+    parser.add_argument("--photo-size", type=int, nargs=2, default=[1280, 960], metavar=("W", "H"))
+    parser.add_argument("--photo-variants", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-visits", type=int, help="Stop after this many visits")
+    parser.add_argument("--sequence", default="Real,Fake", help="Bucket clicks, repeated in order (default: Real,Fake)")
+    parser.add_argument("--sample-every", type=int, default=50, help="Visits between widget/image/RSS samples")
+    parser.add_argument("--xvfb", action="store_true", help="Start Xvfb even if DISPLAY is set")
+    parser.add_argument("--screen", default="1280x1024", help="Xvfb screen size (default: 1280x1024)")
+    parser.add_argument("--max-p95-ms", type=float, help="Fail if p95 click-to-paint latency exceeds this")
+    parser.add_argument("--max-rss-growth-mb", type=float, help="Fail if RSS grows more than this over the run")
+    parser.add_argument("--json", help="Write the results as JSON to this path")
+    args = parser.parse_args()
+
+    xvfb = None
+    if args.xvfb or not os.environ.get("DISPLAY"):
+        xvfb = start_xvfb(args.screen)
+    tmp = None
+    try:
+        if args.session:
+            session_path = Path(args.session)
+        else:
+            tmp = tempfile.TemporaryDirectory()
+            session_path = build_session(Path(tmp.name) / "photos", args.visits, args.photos_per_visit,
+                                         args.photo_size, args.photo_variants, args.seed)
+        sequence = [b.strip() for b in args.sequence.split(",") if b.strip()]
+        results = drive(session_path, sequence, max(1, args.sample_every), args.max_visits)
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+        if xvfb is not None:
+            xvfb.terminate()
+            xvfb.wait()
+
+    failures = check(results, args)
+    results.update({
+        "python": platform.python_version(),
+        "display": "xvfb" if xvfb is not None else os.environ.get("DISPLAY"),
+        "args": vars(args),
+        "failures": failures,
+    })
+
+    latency = results["click_to_paint"]
+    print(f"Visits:         {results['visits_reviewed']} in {results['seconds']}s")
+    print(f"Click to paint: p50 {latency['p50_ms']} ms, p95 {latency['p95_ms']} ms, p99 {latency['p99_ms']} ms, max {latency['max_ms']} ms")
+    print(f"  handler p50 {results['handler']['p50_ms']} ms, paint p50 {results['paint']['p50_ms']} ms")
+    last = results["samples"][-1]
+    print(f"Widgets:        {last['widgets']} ({results['widget_growth']:+d}), Tk images: {last['tk_images']} ({results['tk_image_growth']:+d})")
+    print(f"RSS:            {last['rss_mb']} MB ({results['rss_growth_mb']:+.1f} MB)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
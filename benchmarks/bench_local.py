@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Benchmark the local hot paths on a synthetic photo directory: filename parsing,
+directory scanning, grouping, session building and photo decode/resize.
+
+The first run generates a directory of CommCare-named photos (both naming
+formats, a few percent unparseable names) as hard links to a handful of real
+small JPEGs, so 1M files cost little disk; later runs with the same options
+reuse it:
+
+    python benchmarks/bench_local.py --files 100000 --dir /tmp/bench_photos --json results.json
+    python benchmarks/bench_local.py --files 100000 --dir /tmp/bench_photos --compare results.json
+
+With --compare, any stage whose median is more than --threshold percent slower
+than in the baseline is flagged and the script exits with status 1.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from mock_hq import make_jpeg
+from photo_utility.filenames import parse_commcare_filename
+from photo_utility.imaging import open_image
+from photo_utility.scanner import group_by_form_id, group_by_question_id, scan_directory_for_photos
+from photo_utility.session import insert_known_bad, sample_visits, save_session_manifest, target_photo_count
+from photo_utility.thumbnails import REVIEW_WIDTH
+
+DATASET_MARKER = ".bench_dataset.json"
+# Photos per form: one for sparse forms, several questions' worth for dense ones
+DENSITIES = {"sparse": (1, 1), "dense": (4, 12), "mixed": (1, 12)}
+QUESTIONS = ["photo_house", "photo_id_card", "photo_child", "photo_meter", "photo_receipt",
+             "photo_shop_front", "photo_crop", "photo_water_point"]
+
+
+def photo_names(files, density, prefix_share, invalid_share, seed):
+    """Yield ``files`` CommCare photo filenames, grouped by form"""
+    rng = random.Random(seed)
+    low, high = DENSITIES[density]
+    users = [uuid.UUID(int=rng.getrandbits(128)).hex for _ in range(max(10, files // 500))]
+    made = 0
+    while made < files:
+        form_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        user_id = rng.choice(users)
+        for n in range(min(rng.randint(low, high), files - made)):
+            question = QUESTIONS[n % len(QUESTIONS)]
+            if n >= len(QUESTIONS):
+                # Dense forms repeat questions; keep every photo name unique
+                question += f"_{n // len(QUESTIONS) + 1}"
+            if rng.random() < invalid_share:
+                name = f"IMG_{made:08d}.jpg"
+            elif rng.random() < prefix_share:
+                name = f"export{rng.randint(1, 9)}-{rng.getrandbits(16):04x}-form-{question}-{user_id}-form_{form_id}.jpg"
+            else:
+                name = f"form-{question}-{user_id}-form_{form_id}.jpg"
+            made += 1
+            yield name
+
+
+def ensure_dataset(root, args):
+    """Generate the synthetic directory unless ``root`` already holds one made with the same options"""
+    params = {
+        "files": args.files,
+        "density": args.density,
+        "prefix_share": args.prefix_share,
+        "invalid_share": args.invalid_share,
+        "photo_size": args.photo_size,
+        "photo_variants": args.photo_variants,
+        "seed": args.seed,
+    }
+    marker = root / DATASET_MARKER
+    if marker.exists():
+        try:
+            if json.loads(marker.read_text(encoding="utf-8")) == params:
+                print(f"Reusing dataset in {root}")
+                return
+        except ValueError:
+            pass
+        print(f"Dataset in {root} was made with other options; regenerating")
+        shutil.rmtree(root)
+
+    root.mkdir(parents=True, exist_ok=True)
+    width, height = args.photo_size
+    sources = root / ".sources"
+    sources.mkdir(exist_ok=True)
+    variants = []
+    for i in range(args.photo_variants):
+        path = sources / f"variant_{i}.jpg"
+        path.write_bytes(make_jpeg(width, height, seed=args.seed + i))
+        variants.append(path)
+
+    started = time.perf_counter()
+    can_link = True
+    created = 0
+    for i, name in enumerate(photo_names(args.files, args.density, args.prefix_share, args.invalid_share, args.seed)):
+        source = variants[i % len(variants)]
+        target = root / name
+        if can_link:
+            try:
+                os.link(source, target)
+                created += 1
+                continue
+            except FileExistsError:
+                # Left by an earlier run that was interrupted
+                continue
+            except OSError:
+                # e.g. a filesystem without hard links
+                can_link = False
+        shutil.copyfile(source, target)
+        created += 1
+    marker.write_text(json.dumps(params), encoding="utf-8")
+    kept = f" ({args.files - created} already there)" if created < args.files else ""
+    print(f"Generated {created} files{kept} in {root} in {time.perf_counter() - started:.1f}s")
+
+
+def run_stage(name, fn, rounds, items):
+    """Time ``fn`` ``rounds`` times; returns the stage summary and the last result"""
+    times = []
+    result = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - started)
+    median = statistics.median(times)
+    summary = {
+        "items": items,
+        "rounds": rounds,
+        "min_seconds": round(min(times), 6),
+        "median_seconds": round(median, 6),
+        "items_per_second": round(items / median, 1) if median else 0.0,
+    }
+    print(f"  {name:<14} median {median * 1000:10.2f} ms  min {min(times) * 1000:10.2f} ms  "
+          f"({summary['items_per_second']:,.0f} items/s)")
+    return summary, result
+
+
+def decode_resize(paths):
+    """The review screen's per-photo work: open, decode and resize to REVIEW_WIDTH"""
+    from PIL import Image
+
+    for path in paths:
+        with open_image(path) as img:
+            img.load()
+            w, h = img.size
+            if w > REVIEW_WIDTH:
+                img.resize((REVIEW_WIDTH, int(h * REVIEW_WIDTH / float(w))), Image.LANCZOS)
+
+
+def run_benchmarks(root, args):
+    rounds = args.rounds
+    stages = {}
+
+    names = [entry.name for entry in os.scandir(root) if entry.is_file() and not entry.name.startswith(".")]
+    paths = [root / name for name in names]
+    stages["parse"], _ = run_stage("parse", lambda: [parse_commcare_filename(p) for p in paths], rounds, len(paths))
+    stages["scan"], (valid, invalid) = run_stage("scan", lambda: scan_directory_for_photos(root), rounds, len(paths))
+    stages["group"], by_question = run_stage(
+        "group", lambda: (group_by_question_id(valid), group_by_form_id(valid))[0], rounds, len(valid))
+
+    questions = sorted(by_question)
+    config = {
+        "question_ids": questions,
+        "percent": args.percent,
+        "buckets": ["Real", "Fake"],
+        "include_known_bad": False,
+    }
+
+    def build_session():
+        target = target_photo_count(valid, questions, args.percent)
+        visits, _ = sample_visits(valid, questions, target, random.Random(args.seed))
+        visits = insert_known_bad(visits, config, random.Random(args.seed))
+        with tempfile.TemporaryDirectory() as tmp:
+            save_session_manifest(Path(tmp) / "session.json", dict(config, target_count=target), visits)
+        return visits
+
+    stages["session"], visits = run_stage("session", build_session, rounds, len(valid))
+
+    sample = [meta.filepath for visit in visits for meta in visit["photos"]][:args.decode_photos]
+    stages["decode_resize"], _ = run_stage("decode_resize", lambda: decode_resize(sample), rounds, len(sample))
+    return {"valid": len(valid), "invalid": len(invalid), "visits": len(visits)}, stages
+
+
+def compare(stages, baseline_path, threshold):
+    """Print each stage against the baseline; returns the names of stages that regressed"""
+    baseline = json.loads(Path(baseline_path).read_text(encoding="utf-8"))
+    dataset = baseline.get("dataset", {})
+    print(f"Baseline {baseline_path}: {dataset.get('files', '?')} files, {dataset.get('density', '?')} forms, Python {baseline.get('python', '?')}")
+    regressions = []
+    for name, summary in stages.items():
+        before = baseline.get("stages", {}).get(name)
+        if not before or not before.get("median_seconds"):
+            print(f"  {name:<14} no baseline")
+            continue
+        change = (summary["median_seconds"] / before["median_seconds"] - 1.0) * 100.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"  {name:<14} {before['median_seconds'] * 1000:10.2f} ms -> {summary['median_seconds'] * 1000:10.2f} ms  ({change:+.1f}%){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scan, parse, grouping, sampling and decode on synthetic photos")
+    parser.add_argument("--files", type=int, default=10000, help="Photos to generate (default: 10000)")
+    parser.add_argument("--density", choices=sorted(DENSITIES), default="mixed", help="Photos per form (default: mixed)")
+    parser.add_argument("--prefix-share", type=float, default=0.3, help="Share of names in the prefixed format (default: 0.3)")
+    parser.add_argument("--invalid-share", type=float, default=0.02, help="Share of unparseable names (default: 0.02)")
+    parser.add_argument("--photo-size", type=int, nargs=2, default=[640, 480], metavar=("W", "H"))
+    parser.add_argument("--photo-variants", type=int, default=8, help="Distinct JPEGs the files link to (default: 8)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dir", help="Dataset directory, kept for later runs (default: a temporary directory)")
+    parser.add_argument("--rounds", type=int, default=3, help="Timed rounds per stage (default: 3)")
+    parser.add_argument("--percent", type=float, default=10.0, help="Percent of photos sampled into the session")
+    parser.add_argument("--decode-photos", type=int, default=50, help="Sampled photos to decode and resize (default: 50)")
+    parser.add_argument("--json", help="Write the results as JSON to this path")
+    parser.add_argument("--compare", metavar="BASELINE", help="Compare against a results file written with --json")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent slowdown flagged as a regression (default: 10)")
+    args = parser.parse_args()
+
+    tmp = None
+    if args.dir:
+        root = Path(args.dir)
+    else:
+        tmp = tempfile.TemporaryDirectory()
+        root = Path(tmp.name) / "photos"
+    try:
+        ensure_dataset(root, args)
+        print(f"Timing {args.rounds} rounds per stage:")
+        counts, stages = run_benchmarks(root, args)
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "dataset": {
+            "files": args.files,
+            "density": args.density,
+            "prefix_share": args.prefix_share,
+            "invalid_share": args.invalid_share,
+            "photo_size": args.photo_size,
+            **counts,
+        },
+        "stages": stages,
+    }
+    print(f"Dataset: {counts['valid']} valid, {counts['invalid']} invalid names, {counts['visits']} visits sampled")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+    if args.compare:
+        regressions = compare(stages, args.compare, args.threshold)
+        if regressions:
+            print(f"Regressions over {args.threshold}%: {', '.join(regressions)}")
+            sys.exit(1)
+        print("No regressions")
+
+
+if __name__ == "__main__":
+    main()
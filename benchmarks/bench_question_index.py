@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark attachment -> question lookup on large synthetic forms with repeat groups.
+
+Compares the old per-attachment recursive search with the single-pass index:
+
+    python benchmarks/bench_question_index.py --questions 2000 --repeats 50 --photos 40
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+from photo_utility.forms import index_attachments
+
+
+def build_form(questions, repeats, photos, seed=0):
+    """Nested form JSON with filler questions, groups and a repeat group holding most photos"""
+    rng = random.Random(seed)
+    form = {"meta": {"userID": "abc123", "instanceID": "x"}}
+    for g in range(questions // 20):
+        form[f"group_{g}"] = {f"q_{g}_{q}": f"answer {rng.random()}" for q in range(20)}
+    names = [f"{1700000000000 + i}.jpg" for i in range(photos)]
+    form["cover_photo"] = names[0]
+    form["members"] = [
+        {"name": f"member {r}", "age": str(r), "details": {"note": "n/a"}}
+        for r in range(repeats)
+    ]
+    for i, name in enumerate(names[1:]):
+        form["members"][i % repeats][f"photo_{i}"] = name
+    return form, names
+
+
+def per_attachment_search(attachment_name, form_data):
+    """The previous approach: a fresh dict-only walk per attachment (lists are skipped)"""
+    def find_question_in_data(data):
+        if isinstance(data, dict):
+            for key, value in data.items():
+                if isinstance(value, str) and value == attachment_name:
+                    return key
+                elif isinstance(value, str) and attachment_name in value:
+                    return key
+                elif isinstance(value, dict):
+                    result = find_question_in_data(value)
+                    if result:
+                        return result
+        return None
+    return find_question_in_data(form_data)
+
+
+def timeit(fn, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark attachment question lookup")
+    parser.add_argument("--questions", type=int, default=2000)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--photos", type=int, default=40)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    form, names = build_form(args.questions, args.repeats, args.photos)
+
+    old = timeit(lambda: [per_attachment_search(n, form) for n in names], args.rounds)
+    new = timeit(lambda: index_attachments(form, names), args.rounds)
+
+    found_old = sum(1 for n in names if per_attachment_search(n, form))
+    found_new = len(index_attachments(form, names))
+
+    print(f"Form: {args.questions} questions, {args.repeats} repeat entries, {len(names)} photos")
+    print(f"  per-attachment search: {old * 1000:8.2f} ms  ({found_old}/{len(names)} found)")
+    print(f"  single-pass index:     {new * 1000:8.2f} ms  ({found_new}/{len(names)} found)")
+    print(f"  speedup: {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
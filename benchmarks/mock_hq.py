@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the CommCareHQ List Forms API and form attachment downloads.
+
+Serves /a/<domain>/api/v0.5/form/ with HQ-style pagination and filtering, and
+/a/<domain>/api/form/attachment/<form_id>/<name> with synthetic JPEG bodies
+(each carrying an EXIF thumbnail, with HTTP Range support). Latency,
+bandwidth, 429 responses and dropped connections can be injected.
+
+    python benchmarks/mock_hq.py --port 8765 --domains 3 --forms 500 --latency-ms 40 --rate-429 0.02
+    COMMCARE_HQ_URL=http://127.0.0.1:8765 python photo_utility --debug
+
+Any username/API key is accepted.
+"""
+
+import argparse
+import io
+import json
+import random
+import re
+import struct
+import threading
+import time
+import uuid
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from PIL import Image, ImageDraw
+
+
+FORM_LIST_RE = re.compile(r"^/a/(?P<domain>[^/]+)/api/v0\.5/form/?$")
+ATTACHMENT_RE = re.compile(r"^/a/(?P<domain>[^/]+)/api/form/attachment/(?P<form_id>[^/]+)/(?P<name>[^/]+)$")
+RANGE_RE = re.compile(r"bytes=(\d+)-(\d*)")
+
+MAX_PAGE_SIZE = 1000
+
+
+def make_jpeg(width, height, seed=0, quality=85, thumbnail=True):
+    """A photo-like JPEG: gradient background, random shapes and sensor-ish noise, with an EXIF thumbnail."""
+    rng = random.Random(seed)
+    img = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    tint = Image.new("RGB", (width, height), (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    img = Image.blend(img, tint, 0.5)
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):
+        x0, y0 = rng.randrange(width), rng.randrange(height)
+        x1, y1 = x0 + rng.randrange(width // 3 + 1), y0 + rng.randrange(height // 3 + 1)
+        draw.rectangle((x0, y0, x1, y1), fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    noise = Image.effect_noise((width, height), 24).convert("RGB")
+    img = Image.blend(img, noise, 0.15)
+
+    body = io.BytesIO()
+    img.save(body, "JPEG", quality=quality)
+    body = body.getvalue()
+    if not thumbnail:
+        return body
+
+    thumb = img.copy()
+    thumb.thumbnail((160, 120))
+    thumb_io = io.BytesIO()
+    thumb.save(thumb_io, "JPEG", quality=75)
+    return _insert_exif(body, thumb_io.getvalue(), seed)
+
+
+def _insert_exif(jpeg, thumb, seed):
+    """Insert an APP1 segment with Make/Model/DateTime in IFD0 and a JPEG thumbnail in IFD1."""
+    make = b"MockPhone\x00"
+    model = b"Model %d\x00" % (seed % 10)
+    stamp = (datetime(2024, 1, 1) + timedelta(minutes=seed)).strftime("%Y:%m:%d %H:%M:%S").encode() + b"\x00"
+    entries = [(0x010F, make), (0x0110, model), (0x0132, stamp)]
+
+    ifd0_offset = 8
+    ifd0_size = 2 + 12 * len(entries) + 4
+    data_offset = ifd0_offset + ifd0_size
+    ifd0 = struct.pack("<H", len(entries))
+    data = b""
+    for tag, value in entries:
+        ifd0 += struct.pack("<HHII", tag, 2, len(value), data_offset + len(data))
+        data += value
+    ifd1_offset = data_offset + len(data)
+    ifd0 += struct.pack("<I", ifd1_offset)
+    thumb_offset = ifd1_offset + 2 + 24 + 4
+    ifd1 = struct.pack("<H", 2)
+    ifd1 += struct.pack("<HHII", 0x0201, 4, 1, thumb_offset)
+    ifd1 += struct.pack("<HHII", 0x0202, 4, 1, len(thumb))
+    ifd1 += struct.pack("<I", 0)
+    tiff = b"II*\x00" + struct.pack("<I", ifd0_offset) + ifd0 + data + ifd1 + thumb
+    app1 = b"Exif\x00\x00" + tiff
+    return jpeg[:2] + b"\xff\xe1" + struct.pack(">H", len(app1) + 2) + app1 + jpeg[2:]
+
+
+@dataclass
+class Faults:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    bandwidth_kbps: float = 0.0  # 0 = unlimited
+    rate_429: float = 0.0
+    drop_rate: float = 0.0
+    ignore_range: bool = False
+
+
+class MockDataset:
+    """Deterministic synthetic forms for a set of domains."""
+
+    def __init__(self, domains=2, forms_per_domain=200, photos_per_form=3, apps_per_domain=1,
+                 users_per_domain=20, photo_size=(1280, 960), photo_variants=8, seed=0):
+        rng = random.Random(seed)
+        self.domains = {}
+        self.app_ids = {}
+        start = datetime(2024, 1, 1, 8, 0, 0)
+        for d in range(domains):
+            domain = f"mock-domain-{d}"
+            apps = [uuid.UUID(int=rng.getrandbits(128)).hex for _ in range(apps_per_domain)]
+            users = [uuid.UUID(int=rng.getrandbits(128)).hex for _ in range(users_per_domain)]
+            self.app_ids[domain] = apps
+            forms = []
+            for i in range(forms_per_domain):
+                received = start + timedelta(minutes=7 * i + d)
+                forms.append(self._make_form(rng, domain, rng.choice(apps), rng.choice(users), received, i, photos_per_form))
+            forms.sort(key=lambda f: f["received_on"])
+            self.domains[domain] = forms
+        self.form_index = {f["id"]: f for forms in self.domains.values() for f in forms}
+        self.photos = [make_jpeg(photo_size[0], photo_size[1], seed=seed + v) for v in range(photo_variants)]
+
+    @staticmethod
+    def _make_form(rng, domain, app_id, user_id, received, index, photos_per_form):
+        form_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        names = [f"{1700000000000 + index * 10 + p}.jpg" for p in range(photos_per_form)]
+        form = {
+            "@name": "Visit",
+            "meta": {"userID": user_id, "instanceID": form_id, "timeEnd": received.isoformat()},
+            "household": {"name": f"household {index}", "size": str(rng.randrange(1, 9))},
+            "members": [],
+        }
+        if names:
+            form["household"]["house_photo"] = names[0]
+        for p, name in enumerate(names[1:]):
+            form["members"].append({"member_name": f"member {p}", "member_photo": name})
+        # Filler answers so payloads resemble real forms
+        form["survey"] = {f"q{q}": f"answer {rng.random():.6f}" for q in range(40)}
+        return {
+            "id": form_id,
+            "domain": domain,
+            "app_id": app_id,
+            "type": "data",
+            "received_on": received.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+            "form": form,
+            "attachments": {name: {"content_type": "image/jpeg"} for name in names},
+        }
+
+    def photo_for(self, form_id, name):
+        # crc32 rather than hash(): str hashes change with every interpreter run
+        return self.photos[zlib.crc32(f"{form_id}/{name}".encode("utf-8")) % len(self.photos)]
+
+
+class MockHQHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        faults = self.server.faults
+        rng = self.server.rng
+        with self.server.lock:
+            delay = faults.latency_ms + (rng.uniform(0, faults.jitter_ms) if faults.jitter_ms else 0)
+            throttle = rng.random() < faults.rate_429
+            drop = rng.random() < faults.drop_rate
+        if delay:
+            time.sleep(delay / 1000.0)
+        if throttle:
+            self._send_body(429, b'{"error": "rate limited"}', "application/json", {"Retry-After": "1"})
+            return
+
+        parsed = urlparse(self.path)
+        match = FORM_LIST_RE.match(parsed.path)
+        if match:
+            self._form_list(match.group("domain"), parse_qs(parsed.query), drop)
+            return
+        match = ATTACHMENT_RE.match(parsed.path)
+        if match:
+            self._attachment(match.group("domain"), match.group("form_id"), match.group("name"), drop)
+            return
+        self._send_body(404, b'{"error": "not found"}', "application/json")
+
+    def _form_list(self, domain, query, drop):
+        dataset = self.server.dataset
+        if domain not in dataset.domains:
+            self._send_body(404, b'{"error": "unknown domain"}', "application/json")
+            return
+        q = {k: v[-1] for k, v in query.items()}
+        forms = dataset.domains[domain]
+        if q.get("app_id"):
+            forms = [f for f in forms if f["app_id"] == q["app_id"]]
+        start = q.get("received_on_start")
+        if start:
+            forms = [f for f in forms if f["received_on"] >= start]
+        end = q.get("received_on_end")
+        if end:
+            # A bare date means "through the end of that day"
+            forms = [f for f in forms if (f["received_on"][:10] <= end if len(end) == 10 else f["received_on"] <= end)]
+        if q.get("order_by") == "-received_on":
+            forms = list(reversed(forms))
+        limit = min(int(q.get("limit", 20)), MAX_PAGE_SIZE)
+        offset = int(q.get("offset", 0))
+        page = forms[offset:offset + limit]
+
+        base = f"http://{self.headers.get('Host')}"
+        objects = []
+        for form in page:
+            obj = dict(form)
+            obj["attachments"] = {
+                name: dict(info, url=f"{base}/a/{domain}/api/form/attachment/{form['id']}/{name}",
+                           length=len(dataset.photo_for(form["id"], name)))
+                for name, info in form["attachments"].items()
+            }
+            objects.append(obj)
+        next_query = None
+        if offset + limit < len(forms):
+            next_query = "?" + urlencode(dict(q, offset=offset + limit, limit=limit))
+        body = json.dumps({
+            "meta": {"limit": limit, "offset": offset, "total_count": len(forms), "next": next_query, "previous": None},
+            "objects": objects,
+        }).encode("utf-8")
+        self._send_body(200, body, "application/json", drop=drop)
+
+    def _attachment(self, domain, form_id, name, drop):
+        dataset = self.server.dataset
+        form = dataset.form_index.get(form_id)
+        if form is None or form["domain"] != domain or name not in form["attachments"]:
+            self._send_body(404, b'{"error": "no such attachment"}', "application/json")
+            return
+        body = dataset.photo_for(form_id, name)
+        range_header = self.headers.get("Range")
+        match = RANGE_RE.match(range_header) if range_header else None
+        if match and not self.server.faults.ignore_range:
+            first = int(match.group(1))
+            last = int(match.group(2)) if match.group(2) else len(body) - 1
+            last = min(last, len(body) - 1)
+            part = body[first:last + 1]
+            headers = {"Content-Range": f"bytes {first}-{first + len(part) - 1}/{len(body)}", "Accept-Ranges": "bytes"}
+            self._send_body(206, part, "image/jpeg", headers, drop=drop)
+            return
+        self._send_body(200, body, "image/jpeg", {"Accept-Ranges": "bytes"}, drop=drop)
+
+    def _send_body(self, status, body, content_type, headers=None, drop=False):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if drop:
+            # Advertise the full length, send half, then hang up
+            body = body[:len(body) // 2]
+            self.close_connection = True
+        self._write_throttled(body)
+        if drop:
+            self.wfile.flush()
+            self.connection.shutdown(2)
+
+    def _write_throttled(self, body):
+        kbps = self.server.faults.bandwidth_kbps
+        if not kbps:
+            self.wfile.write(body)
+            return
+        chunk = 16 * 1024
+        per_chunk = chunk / (kbps * 1024 / 8)
+        for i in range(0, len(body), chunk):
+            self.wfile.write(body[i:i + chunk])
+            time.sleep(per_chunk)
+
+
+class MockHQServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 makes bursts of parallel downloads stall on SYN retries
+    request_queue_size = 128
+
+    def __init__(self, address, dataset, faults=None, seed=0, verbose=False):
+        super().__init__(address, MockHQHandler)
+        self.dataset = dataset
+        self.faults = faults or Faults()
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.verbose = verbose
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_in_thread(dataset, faults=None, host="127.0.0.1", port=0, seed=0):
+    """Start a mock server on a background thread; returns the server (call .shutdown() to stop)."""
+    server = MockHQServer((host, port), dataset, faults, seed)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_dataset_arguments(parser):
+    parser.add_argument("--domains", type=int, default=2)
+    parser.add_argument("--forms", type=int, default=200, help="Forms per domain")
+    parser.add_argument("--photos-per-form", type=int, default=3)
+    parser.add_argument("--apps-per-domain", type=int, default=1)
+    parser.add_argument("--photo-width", type=int, default=1280)
+    parser.add_argument("--photo-height", type=int, default=960)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--bandwidth-kbps", type=float, default=0.0, help="Per-connection bandwidth cap (0 = unlimited)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Fraction of responses cut off mid-body")
+    parser.add_argument("--ignore-range", action="store_true", help="Answer Range requests with the full body")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def dataset_and_faults(args):
+    dataset = MockDataset(
+        domains=args.domains,
+        forms_per_domain=args.forms,
+        photos_per_form=args.photos_per_form,
+        apps_per_domain=args.apps_per_domain,
+        photo_size=(args.photo_width, args.photo_height),
+        seed=args.seed,
+    )
+    faults = Faults(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        bandwidth_kbps=args.bandwidth_kbps,
+        rate_429=args.rate_429,
+        drop_rate=args.drop_rate,
+        ignore_range=args.ignore_range,
+    )
+    return dataset, faults
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock CommCareHQ server for local testing and benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    parser.add_argument("--pairs-file", help="Write a domain/app pairs file for the generated domains here")
+    add_dataset_arguments(parser)
+    args = parser.parse_args()
+
+    dataset, faults = dataset_and_faults(args)
+    server = MockHQServer((args.host, args.port), dataset, faults, args.seed, args.verbose)
+    if args.pairs_file:
+        with open(args.pairs_file, "w", encoding="utf-8") as f:
+            json.dump(dataset.app_ids, f, indent=2)
+        print(f"Wrote domain/app pairs to {args.pairs_file}")
+    print(f"Mock CommCareHQ serving {len(dataset.form_index)} forms on {server.base_url}")
+    print(f"Point the app at it with COMMCARE_HQ_URL={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,69 @@
-from .gui import run_app
+import argparse
+import os
+import sys
 
+from . import profiling
+from .cli import COMMANDS
+from .startup import StartupProfile
 
-def main() -> None:
-    run_app()
+
+def main(argv=None) -> None:
+    profile = StartupProfile()
+    argv = sys.argv[1:] if argv is None else argv
+
+    # Batch commands run headless and never import Tk
+    if argv and argv[0] in COMMANDS:
+        from .cli import main as cli_main
+
+        sys.exit(cli_main(argv))
+
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(
+        description='Photo Review Utility',
+        epilog=f"Batch commands (no GUI): {', '.join(COMMANDS)}. Run '<command> --help' for details.",
+    )
+    parser.add_argument('--debug', action='store_true', 
+                       help='Enable debug mode with verbose output')
+    parser.add_argument('--session', metavar='FILE',
+                       help='Open a review session prepared with the session command (or a bundle made with the bundle command)')
+    parser.add_argument('--startup-profile', action='store_true',
+                       help='Print an import and first-paint timing breakdown to stderr')
+    parser.add_argument('--profile', metavar='FILE',
+                       help='Write a JSON timing report of scan, fetch, download and render spans to FILE on exit')
+    parser.add_argument('--profile-capture', choices=profiling.CAPTURE_MODES,
+                       help='Also capture a cProfile or tracemalloc profile of the slowest span')
+    parser.add_argument('--decode-workers', type=int, default=0, metavar='N',
+                       help='Decode upcoming photos in N worker processes instead of the UI thread (default: off)')
+    parser.add_argument('--decode-budget-mb', type=int, metavar='MB',
+                       help='Memory for photos decoded ahead by the decode workers (default: 128)')
+    parser.add_argument('--image-cache-mb', type=int, metavar='MB',
+                       help='Memory for decoded photos of recently viewed visits, for going back (default: 64)')
+    args = parser.parse_args(argv)
+    
+    # Set debug mode as environment variable
+    if args.debug:
+        os.environ['PHOTO_REVIEW_DEBUG'] = '1'
+        print("🐛 Debug mode enabled - verbose output will be shown")
+
+    if not args.startup_profile:
+        profile = None
+        from .gui import run_app
+    else:
+        with profile.span("import customtkinter"):
+            import customtkinter  # noqa: F401
+        with profile.span("import photo_utility.gui"):
+            from .gui import run_app
+
+    if args.profile:
+        profiling.enable(args.profile_capture)
+    try:
+        run_app(session=args.session, startup_profile=profile,
+                decode_workers=args.decode_workers, decode_budget_mb=args.decode_budget_mb,
+                image_cache_mb=args.image_cache_mb)
+    finally:
+        if args.profile:
+            profiling.write_report(args.profile)
+            print(f"Profile written to {args.profile}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,213 @@
+"""Packed review bundles: a prepared session in one file for offline reviewers.
+
+A bundle holds the session config, its visits (known-bad inserts included)
+and a review-size JPEG of every photo. Layout, all integers little-endian::
+
+    header   magic, version, photo count, table offset, index offset, index length
+    images   the photos' bytes, back to back
+    table    (offset, length) per photo, fixed width, in photo order
+    index    JSON: config and visits; each photo carries its table entry number
+
+The reader maps the file with ``mmap``, so the review screen pulls a photo's
+bytes straight out of the mapping instead of opening one file per photo.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import mmap
+import os
+import struct
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from . import profiling
+from .filenames import PhotoMeta
+from .imaging import open_image
+from .thumbnails import REVIEW_WIDTH, review_image_bytes
+
+
+BUNDLE_MAGIC = b"PRBUNDLE"
+BUNDLE_VERSION = 1
+BUNDLE_SUFFIX = ".prb"
+BUNDLE_HEADER = struct.Struct("<8sIIQQQ")
+BUNDLE_ENTRY = struct.Struct("<QQ")
+
+
+def is_review_bundle(path: Path) -> bool:
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(BUNDLE_MAGIC)) == BUNDLE_MAGIC
+    except OSError:
+        return False
+
+
+def _bundle_job(args: Tuple[Path, int]) -> Tuple[Optional[bytes], Optional[str]]:
+    photo, width = args
+    try:
+        return review_image_bytes(photo, width), None
+    except Exception as e:
+        return None, str(e)
+
+
+def write_bundle(
+    path: Path,
+    config: dict,
+    visits: List[dict],
+    width: int = REVIEW_WIDTH,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int, Path, Optional[str]], None]] = None,
+) -> Tuple[int, int, int]:
+    """Pack a session's config, visits and review-size photos into ``path``.
+
+    Photos that cannot be read are left out, as are visits left with no
+    photos. ``progress(done, total, photo, error)`` is called per photo.
+    Returns ``(visits packed, photos packed, photos failed)``.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    photos: List[Path] = []
+    seen = set()
+    for visit in visits:
+        for meta in visit["photos"]:
+            if meta.filepath not in seen:
+                seen.add(meta.filepath)
+                photos.append(meta.filepath)
+
+    path = Path(path)
+    tmp = path.with_name(path.name + ".part")
+    entries: Dict[Path, int] = {}
+    table: List[Tuple[int, int]] = []
+    failed = 0
+    with open(tmp, "wb") as f:
+        f.write(b"\0" * BUNDLE_HEADER.size)
+        offset = BUNDLE_HEADER.size
+        if photos:
+            with profiling.span("bundle.pack"), ProcessPoolExecutor(max_workers=workers) as pool:
+                chunksize = max(1, min(32, len(photos) // ((workers or os.cpu_count() or 4) * 4)))
+                jobs = [(photo, width) for photo in photos]
+                for done, (photo, (data, error)) in enumerate(zip(photos, pool.map(_bundle_job, jobs, chunksize=chunksize)), 1):
+                    if data is None:
+                        failed += 1
+                    else:
+                        entries[photo] = len(table)
+                        table.append((offset, len(data)))
+                        f.write(data)
+                        offset += len(data)
+                    if progress is not None:
+                        progress(done, len(photos), photo, error)
+
+        packed_visits = []
+        for visit in visits:
+            packed = [dict(_bundle_meta(meta), entry=entries[meta.filepath]) for meta in visit["photos"] if meta.filepath in entries]
+            if packed:
+                packed_visits.append(dict(visit, photos=packed))
+        # Known-bad photos travel inside the bundle; their folder does not
+        packed_config = dict(config, known_bad_dir=None)
+        index = json.dumps({
+            "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "config": packed_config,
+            "visits": packed_visits,
+        }, separators=(",", ":")).encode("utf-8")
+
+        table_offset = offset
+        f.write(b"".join(BUNDLE_ENTRY.pack(start, length) for start, length in table))
+        index_offset = table_offset + len(table) * BUNDLE_ENTRY.size
+        f.write(index)
+        f.seek(0)
+        f.write(BUNDLE_HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, len(table), table_offset, index_offset, len(index)))
+    os.replace(tmp, path)
+    return len(packed_visits), len(table), failed
+
+
+def _bundle_meta(meta: PhotoMeta) -> dict:
+    # Source paths mean nothing on the reviewer's machine; photos are looked up by entry
+    return {
+        "filename": meta.filename,
+        "json_block": meta.json_block,
+        "question_id": meta.question_id,
+        "user_id": meta.user_id,
+        "form_id": meta.form_id,
+        "extension": meta.extension,
+    }
+
+
+class ReviewBundle:
+    """A bundle opened for review; photos are read from a read-only memory map"""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # mmap refuses empty files
+            self._file.close()
+            raise ValueError(f"{self.path.name} is not a review bundle")
+        try:
+            self._load_index()
+        except Exception:
+            self.close()
+            raise
+
+    def _load_index(self) -> None:
+        if len(self._map) < BUNDLE_HEADER.size:
+            raise ValueError(f"{self.path.name} is not a review bundle")
+        magic, version, count, table_offset, index_offset, index_length = BUNDLE_HEADER.unpack_from(self._map, 0)
+        if magic != BUNDLE_MAGIC:
+            raise ValueError(f"{self.path.name} is not a review bundle")
+        if version != BUNDLE_VERSION:
+            raise ValueError(f"Unsupported review bundle version: {version}")
+        if index_offset + index_length > len(self._map) or table_offset + count * BUNDLE_ENTRY.size > index_offset:
+            raise ValueError(f"{self.path.name} is truncated")
+        self._count = count
+        self._table_offset = table_offset
+        index = json.loads(self._map[index_offset:index_offset + index_length])
+        self.created = index.get("created", "")
+        self.config = index["config"]
+        # Photo path (under the bundle, so names stay unique) -> table entry
+        self._entries: Dict[Path, int] = {}
+        self.visits = []
+        for visit in index["visits"]:
+            metas = []
+            for data in visit["photos"]:
+                entry = data["entry"]
+                meta = PhotoMeta(
+                    json_block=data["json_block"],
+                    question_id=data["question_id"],
+                    user_id=data["user_id"],
+                    form_id=data["form_id"],
+                    extension=data["extension"],
+                    filename=data["filename"],
+                    filepath=self.path / str(entry) / data["filename"],
+                )
+                self._entries[meta.filepath] = entry
+                metas.append(meta)
+            self.visits.append(dict(visit, photos=metas))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, photo: Path) -> bool:
+        return photo in self._entries
+
+    def photo_bytes(self, photo: Path) -> bytes:
+        entry = self._entries[photo]
+        start, length = BUNDLE_ENTRY.unpack_from(self._map, self._table_offset + entry * BUNDLE_ENTRY.size)
+        return self._map[start:start + length]
+
+    def open_image(self, photo: Path):
+        """The photo as a PIL image, decoded from the mapping"""
+        return open_image(io.BytesIO(self.photo_bytes(photo)))
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> "ReviewBundle":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
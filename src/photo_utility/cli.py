@@ -0,0 +1,562 @@
+"""Headless batch commands: fetch, scan, validation, compaction, thumbnails, quality pre-screen, reviewed-forms index, session preparation and bundling.
+
+None of these import Tk, so they can run on a server or from cron:
+
+    python photo_utility fetch --pairs api_inputs.txt --start 01/01/24 --out prepared/ --thumbnails
+    python photo_utility scan prepared/
+    python photo_utility validate prepared/ --workers 8
+    python photo_utility compact prepared/ --max-edge 1600 --quality 85 --cold originals/
+    python photo_utility thumbnails prepared/ --workers 8
+    python photo_utility prescreen prepared/ --csv prescreen.csv --sort blur
+    python photo_utility reviewed results/
+    python photo_utility session prepared/ --percent 10 --auto-bucket Fake --collapse-clusters --out session.json
+    python photo_utility bundle session.json --out review.prb
+
+With --json, progress is written to stdout as one JSON object per line and
+all other output goes to stderr.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from . import profiling
+
+
+COMMANDS = ("fetch", "scan", "validate", "compact", "thumbnails", "prescreen", "reviewed", "session", "bundle")
+
+ISO_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+class Progress:
+    """Emits progress events as JSON lines (for scripts) or short human-readable lines."""
+
+    def __init__(self, stream, as_json: bool) -> None:
+        self.stream = stream
+        self.as_json = as_json
+        self._last_emit = 0.0
+
+    def emit(self, event: str, **fields) -> None:
+        if self.as_json:
+            record = {"event": event, "time": round(time.time(), 3)}
+            record.update(fields)
+            self.stream.write(json.dumps(record) + "\n")
+        else:
+            details = ", ".join(f"{k}={v}" for k, v in fields.items())
+            self.stream.write(f"[{event}] {details}\n")
+        self.stream.flush()
+
+    def counter(self, stage: str):
+        """Callback for (done, total, ...) progress that emits at most ~4 events a second, plus the last one."""
+        def report(done: int, total: int, *_) -> None:
+            now = time.monotonic()
+            if done == total or now - self._last_emit >= 0.25:
+                self._last_emit = now
+                self.emit("progress", stage=stage, done=done, total=total)
+        return report
+
+
+def _parse_date(value: str) -> str:
+    """Accept YYYY-MM-DD or the GUI's MM/DD/YY"""
+    from .commcare import convert_date_format
+
+    if not value:
+        return ""
+    if ISO_DATE_RE.match(value):
+        return value
+    converted = convert_date_format(value)
+    if not converted:
+        raise argparse.ArgumentTypeError(f"invalid date '{value}' (use YYYY-MM-DD or MM/DD/YY)")
+    return converted
+
+
+def _directory(value: str) -> Path:
+    path = Path(value)
+    if not path.is_dir():
+        raise argparse.ArgumentTypeError(f"'{value}' is not a directory")
+    return path
+
+
+def _scan(root: Path, progress: Progress, refresh: bool = False):
+    from .scanner import load_scan_manifest, scan_directory_for_photos, write_scan_manifest
+
+    cached = None if refresh else load_scan_manifest(root)
+    if cached is not None:
+        progress.emit("scan", directory=str(root), photos=len(cached[0]), invalid=len(cached[1]), cached=True)
+        return cached
+    started = time.perf_counter()
+    valid, invalid = scan_directory_for_photos(root)
+    write_scan_manifest(root, valid, invalid)
+    progress.emit("scan", directory=str(root), photos=len(valid), invalid=len(invalid), cached=False,
+                  seconds=round(time.perf_counter() - started, 3))
+    return valid, invalid
+
+
+def _validate(root: Path, valid: list, workers: Optional[int], progress: Progress, check: bool = True) -> list:
+    """``valid`` without the photos quarantined as unreadable, checking any not checked before unless ``check`` is off"""
+    from .validation import drop_quarantined, quarantined_photos, validate_photos
+
+    started = time.perf_counter()
+    if check:
+        quarantined, checked = validate_photos(root, [m.filepath for m in valid], workers, progress.counter("validate"))
+    else:
+        quarantined, checked = quarantined_photos(root), 0
+    progress.emit("validate", directory=str(root), checked=checked, quarantined=len(quarantined),
+                  seconds=round(time.perf_counter() - started, 3))
+    for path, reason in sorted(quarantined.items()):
+        progress.emit("quarantined", photo=path.name, reason=reason)
+    return drop_quarantined(valid, set(quarantined))
+
+
+def _thumbnails(paths: List[Path], width: int, workers: Optional[int], progress: Progress) -> int:
+    from .thumbnails import generate_thumbnails
+
+    started = time.perf_counter()
+    made, skipped, failed = generate_thumbnails(paths, width, workers, progress.counter("thumbnails"))
+    progress.emit("thumbnails", made=made, skipped=skipped, failed=failed,
+                  seconds=round(time.perf_counter() - started, 3))
+    return failed
+
+
+def _reviewed_index(args, progress: Progress):
+    """The reviewed-forms index named by ``--reviewed-index``, or None (reported) if it cannot be read"""
+    from .reviewed import ReviewedIndex
+
+    try:
+        return ReviewedIndex(Path(args.reviewed_index))
+    except (OSError, ValueError) as e:
+        progress.emit("error", message=f"Could not read reviewed-forms index {args.reviewed_index}: {e}")
+        return None
+
+
+def cmd_fetch(args, progress: Progress) -> int:
+    from .commcare import download_attachments, find_env_file, get_forms_from_api, load_api_credentials, parse_domain_form_file
+    from .form_cache import DEFAULT_CACHE_PATH
+    from .ingest import IngestOptions, duplicate_photos
+    from .scheduler import DOWNLOAD_WORKERS, ThroughputReport
+    from .session import index_remote_photos, new_download_dir
+
+    domain_form_pairs = parse_domain_form_file(args.pairs)
+    if not domain_form_pairs:
+        progress.emit("error", message=f"Could not parse domain/app pairs file {args.pairs}")
+        return 2
+    env_file = args.env or find_env_file()
+    if not env_file:
+        progress.emit("error", message="Could not find .env file")
+        return 2
+    username, api_key = load_api_credentials(env_file)
+    if not username or not api_key:
+        progress.emit("error", message="Could not load API credentials from .env file")
+        return 2
+
+    stats = ThroughputReport()
+    started = time.perf_counter()
+    records = get_forms_from_api(domain_form_pairs, args.start, args.end, username, api_key, args.limit, stats,
+                                 cache_path=Path(args.cache) if args.cache else DEFAULT_CACHE_PATH)
+    progress.emit("fetched", forms=len(records), domains=len(domain_form_pairs),
+                  seconds=round(time.perf_counter() - started, 3))
+    if args.forms_only:
+        return 0
+
+    out_dir = Path(args.out) if args.out else new_download_dir()
+    metas, remote = index_remote_photos(records, out_dir)
+    jobs = [(record, attachment, path) for path, (record, attachment) in remote.items() if not path.exists()]
+    if args.skip_reviewed:
+        reviewed = _reviewed_index(args, progress)
+        if reviewed is None:
+            return 2
+        skipped = {record.id for record, _, _ in jobs if record.id in reviewed}
+        jobs = [job for job in jobs if job[0].id not in skipped]
+        progress.emit("reviewed_skipped", forms=len(skipped))
+    progress.emit("download_start", photos=len(jobs), already_present=len(remote) - len(jobs), directory=str(out_dir))
+    out_dir.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+    # Thumbnails and compaction come out of the same in-memory decode as each photo lands
+    ingest = IngestOptions(thumbnail_width=args.width if args.thumbnails else None,
+                           compact=(args.max_edge, args.quality) if args.compact else None)
+    results = download_attachments(jobs, username, api_key, stats, workers=args.workers or DOWNLOAD_WORKERS,
+                                   progress=progress.counter("download"), ingest=ingest)
+    failed = len(jobs) - len(results)
+    progress.emit("downloaded", photos=len(results), failed=failed, seconds=round(time.perf_counter() - started, 3))
+    for domain_stats in stats.domains():
+        progress.emit("domain", domain=domain_stats.domain, forms=domain_stats.forms, photos=domain_stats.photos,
+                      failed=domain_stats.failed, bytes=domain_stats.bytes)
+
+    duplicates = duplicate_photos(out_dir)
+    if duplicates:
+        # The same picture submitted on several forms is worth a reviewer's attention
+        progress.emit("duplicates", groups=len(duplicates), photos=sum(len(names) for names in duplicates.values()))
+        for sha256, names in sorted(duplicates.items()):
+            progress.emit("duplicate", sha256=sha256, photos=names)
+
+    valid, _ = _scan(out_dir, progress, refresh=True)
+    if args.thumbnails:
+        _thumbnails([m.filepath for m in valid], args.width, args.workers, progress)
+    return 1 if failed else 0
+
+
+def _quality_rules(args) -> list:
+    from .quality import DEFAULT_RULES, QualityRule
+
+    overrides = {"dark": args.dark_below, "blank": args.contrast_below, "blurry": args.blur_below, "flat": args.entropy_below}
+    return [QualityRule(rule.flag, rule.signal, rule.below if overrides[rule.flag] is None else overrides[rule.flag])
+            for rule in DEFAULT_RULES]
+
+
+def _analyze(paths: List[Path], workers: Optional[int], progress: Progress) -> dict:
+    from .quality import analyze_photos
+
+    started = time.perf_counter()
+    signals, measured = analyze_photos(paths, workers, progress.counter("prescreen"))
+    progress.emit("measured", photos=len(paths), measured=measured, unreadable=len(paths) - len(signals),
+                  seconds=round(time.perf_counter() - started, 3))
+    return signals
+
+
+def cmd_scan(args, progress: Progress) -> int:
+    from .scanner import group_by_question_id
+
+    valid, invalid = _scan(args.directory, progress, refresh=True)
+    if args.validate:
+        valid = _validate(args.directory, valid, args.workers, progress)
+    groups = group_by_question_id(valid)
+    progress.emit("questions", counts={q: len(metas) for q, metas in sorted(groups.items())})
+    return 0
+
+
+def cmd_validate(args, progress: Progress) -> int:
+    valid, _ = _scan(args.directory, progress)
+    readable = _validate(args.directory, valid, args.workers, progress)
+    return 1 if len(readable) < len(valid) else 0
+
+
+def cmd_compact(args, progress: Progress) -> int:
+    from .compaction import compact_photos
+
+    valid, _ = _scan(args.directory, progress)
+    valid = _validate(args.directory, valid, args.workers, progress, check=False)
+    cold = Path(args.cold) if args.cold else None
+    if cold is not None and cold.resolve() == args.directory.resolve():
+        progress.emit("error", message="The cold directory must differ from the photo directory")
+        return 2
+    report = progress.counter("compact")
+
+    def on_photo(done: int, total: int, photo: Path, error: Optional[str]) -> None:
+        if error is not None:
+            progress.emit("compact_failed", photo=photo.name, reason=error)
+        report(done, total)
+
+    started = time.perf_counter()
+    summary = compact_photos([m.filepath for m in valid], args.max_edge, args.quality, cold, args.workers, on_photo)
+    progress.emit("compacted", compacted=summary.compacted, skipped=summary.skipped, failed=summary.failed,
+                  bytes_before=summary.bytes_before, bytes_after=summary.bytes_after,
+                  bytes_saved=summary.bytes_saved, seconds=round(time.perf_counter() - started, 3))
+    return 1 if summary.failed else 0
+
+
+def cmd_thumbnails(args, progress: Progress) -> int:
+    valid, _ = _scan(args.directory, progress)
+    valid = _validate(args.directory, valid, args.workers, progress, check=False)
+    failed = _thumbnails([m.filepath for m in valid], args.width, args.workers, progress)
+    return 1 if failed else 0
+
+
+def cmd_prescreen(args, progress: Progress) -> int:
+    import csv
+
+    from .quality import SIGNALS, photo_flags
+
+    valid, _ = _scan(args.directory, progress)
+    valid = _validate(args.directory, valid, args.workers, progress, check=False)
+    signals = _analyze([m.filepath for m in valid], args.workers, progress)
+    rules = _quality_rules(args)
+    rows = []
+    counts = {rule.flag: 0 for rule in rules}
+    for meta in valid:
+        values = signals.get(meta.filepath)
+        if values is None:
+            continue
+        flags = photo_flags(values, rules)
+        for flag in flags:
+            counts[flag] += 1
+        rows.append(dict(zip(SIGNALS, values), photo=meta.filename, form_id=meta.form_id,
+                         question_id=meta.question_id, flags=";".join(flags)))
+    rows.sort(key=lambda row: row[args.sort])
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=["photo", "form_id", "question_id", *SIGNALS, "flags"])
+            writer.writeheader()
+            writer.writerows(rows)
+    progress.emit("prescreen", photos=len(rows), flagged=sum(1 for row in rows if row["flags"]), flags=counts,
+                  csv=args.csv)
+    return 0
+
+
+def cmd_reviewed(args, progress: Progress) -> int:
+    import csv
+
+    from .reviewed import results_files
+
+    index = _reviewed_index(args, progress)
+    if index is None:
+        return 2
+    files = results_files(args.paths)
+    missing = [str(path) for path in files if not path.is_file()]
+    if missing:
+        progress.emit("error", message=f"Results CSVs not found: {', '.join(missing)}")
+        return 2
+    try:
+        read, added = index.add_results(files)
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        progress.emit("error", message=f"Could not read results CSV: {e}")
+        return 1
+    if read:
+        index.save()
+    progress.emit("reviewed", files=len(files), read=read, added=added, forms=len(index), index=str(index.path))
+    return 0
+
+
+def cmd_session(args, progress: Progress) -> int:
+    import random
+
+    from .reviewed import drop_reviewed
+    from .scanner import group_by_question_id
+    from .session import insert_known_bad, sample_visits, save_session_manifest, target_photo_count
+
+    valid, _ = _scan(args.directory, progress)
+    valid = _validate(args.directory, valid, None, progress, check=not args.no_validate)
+    available = sorted(group_by_question_id(valid))
+    questions = [q.strip() for q in args.questions.split(",") if q.strip()] if args.questions else available
+    unknown = [q for q in questions if q not in available]
+    if unknown:
+        progress.emit("error", message=f"Unknown questions: {', '.join(unknown)}")
+        return 2
+    buckets = [b.strip() for b in args.buckets.split(",") if b.strip()]
+    if len(buckets) < 2:
+        progress.emit("error", message="Provide at least two buckets (comma-separated)")
+        return 2
+    if args.auto_bucket and args.auto_bucket not in buckets:
+        progress.emit("error", message=f"Auto-bucket {args.auto_bucket} is not one of the buckets")
+        return 2
+    if not (0 < args.percent <= 100):
+        progress.emit("error", message="Percent must be in (0, 100]")
+        return 2
+    if args.known_bad_dir and not Path(args.known_bad_dir).is_dir():
+        progress.emit("error", message=f"Known bad directory {args.known_bad_dir} does not exist")
+        return 2
+
+    config = {
+        "question_ids": questions,
+        "buckets": buckets,
+        "percent": args.percent,
+        "include_known_bad": bool(args.known_bad_dir),
+        "known_bad_dir": str(Path(args.known_bad_dir).resolve()) if args.known_bad_dir else None,
+        "known_bad_count": str(args.known_bad_count),
+        "target_count": target_photo_count(valid, questions, args.percent),
+    }
+    if not args.include_reviewed:
+        reviewed = _reviewed_index(args, progress)
+        if reviewed is None:
+            return 2
+        # The target stays a percent of all photos; forms reviewed before just cannot be picked
+        valid, skipped = drop_reviewed(valid, reviewed)
+        progress.emit("reviewed_skipped", forms=skipped)
+    rng = random.Random(args.seed)
+    visits, _ = sample_visits(valid, questions, config["target_count"], rng)
+    if args.prescreen or args.auto_bucket:
+        from .quality import prescreen_visits
+
+        signals = _analyze([m.filepath for visit in visits for m in visit["photos"]], None, progress)
+        flagged = prescreen_visits(visits, signals, _quality_rules(args), args.auto_bucket)
+        config.update(prescreen=True, auto_bucket=args.auto_bucket)
+        progress.emit("prescreened", visits=len(visits), flagged=flagged, auto_bucket=args.auto_bucket)
+    if args.collapse_clusters:
+        from .clusters import collapse_similar_visits, hash_photos
+
+        started = time.perf_counter()
+        hashes, hashed = hash_photos([m.filepath for visit in visits for m in visit["photos"]], None, progress.counter("hash"))
+        sampled = len(visits)
+        visits = collapse_similar_visits(visits, hashes, args.cluster_distance)
+        config.update(collapse_clusters=True, cluster_distance=args.cluster_distance)
+        progress.emit("clustered", visits=sampled, review_screens=len(visits), hashed=hashed,
+                      clusters=sum(1 for visit in visits if visit.get("cluster")),
+                      seconds=round(time.perf_counter() - started, 3))
+    visits = insert_known_bad(visits, config, rng)
+    if not visits:
+        progress.emit("error", message="No visits were selected for review")
+        return 1
+    out = Path(args.out) if args.out else Path(f"session_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    save_session_manifest(out, config, visits)
+    progress.emit("session", path=str(out), visits=len(visits),
+                  photos=sum(len(v["photos"]) for v in visits), target_photos=config["target_count"])
+    return 0
+
+
+def cmd_bundle(args, progress: Progress) -> int:
+    from .bundle import BUNDLE_SUFFIX, write_bundle
+    from .session import load_session_manifest
+
+    try:
+        config, visits = load_session_manifest(Path(args.session))
+    except (OSError, ValueError, KeyError) as e:
+        progress.emit("error", message=f"Could not open session file {args.session}: {e}")
+        return 2
+    out = Path(args.out) if args.out else Path(args.session).with_suffix(BUNDLE_SUFFIX)
+    report = progress.counter("bundle")
+
+    def on_photo(done: int, total: int, photo: Path, error: Optional[str]) -> None:
+        if error is not None:
+            progress.emit("bundle_failed", photo=photo.name, reason=error)
+        report(done, total)
+
+    started = time.perf_counter()
+    packed_visits, photos, failed = write_bundle(out, config, visits, args.width, args.workers, on_photo)
+    progress.emit("bundle", path=str(out), visits=packed_visits, photos=photos, failed=failed,
+                  bytes=out.stat().st_size, seconds=round(time.perf_counter() - started, 3))
+    return 1 if failed else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    from .clusters import DEFAULT_MAX_DISTANCE
+    from .compaction import COMPACT_MAX_EDGE, COMPACT_QUALITY
+    from .reviewed import DEFAULT_REVIEWED_PATH, RESULTS_GLOB
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--json", action="store_true", help="Write progress to stdout as JSON lines")
+    common.add_argument("--debug", action="store_true", help="Enable debug mode with verbose output")
+    common.add_argument("--profile", metavar="FILE", help="Write a JSON timing report of the run's spans to FILE")
+    common.add_argument("--profile-capture", choices=profiling.CAPTURE_MODES,
+                        help="Also capture a cProfile or tracemalloc profile of the slowest span")
+
+    parser = argparse.ArgumentParser(prog="photo_utility", description="Photo Review Utility batch commands")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    reviewed_index = argparse.ArgumentParser(add_help=False)
+    reviewed_index.add_argument("--reviewed-index", default=str(DEFAULT_REVIEWED_PATH), metavar="FILE",
+                                help=f"Index of forms reviewed in earlier sessions (default: {DEFAULT_REVIEWED_PATH})")
+
+    fetch = sub.add_parser("fetch", parents=[common, reviewed_index], help="Fetch forms from CommCareHQ and download their photos")
+    fetch.add_argument("--pairs", required=True, help="Domain/app pairs file")
+    fetch.add_argument("--start", type=_parse_date, default="", help="Start date (YYYY-MM-DD or MM/DD/YY)")
+    fetch.add_argument("--end", type=_parse_date, default=time.strftime("%Y-%m-%d"), help="End date (default: today)")
+    fetch.add_argument("--limit", type=int, default=1000, help="Forms per domain/app (default: 1000)")
+    fetch.add_argument("--out", help="Download directory (default: downloaded_photos/session_<timestamp>)")
+    fetch.add_argument("--env", help=".env file with COMMCARE_USERNAME and COMMCARE_API_KEY")
+    fetch.add_argument("--cache", help="Form cache database (default: form_cache.sqlite3)")
+    fetch.add_argument("--workers", type=int, help="Parallel download and thumbnail workers")
+    fetch.add_argument("--forms-only", action="store_true", help="Only refresh the form cache")
+    fetch.add_argument("--thumbnails", action="store_true", help="Also generate review thumbnails")
+    fetch.add_argument("--width", type=int, default=400, help="Thumbnail width (default: 400)")
+    fetch.add_argument("--compact", action="store_true", help="Re-encode each photo to --max-edge/--quality as it downloads")
+    fetch.add_argument("--max-edge", type=int, default=COMPACT_MAX_EDGE,
+                       help=f"Longest side of compacted photos in pixels (default: {COMPACT_MAX_EDGE})")
+    fetch.add_argument("--quality", type=int, default=COMPACT_QUALITY,
+                       help=f"JPEG quality of compacted photos (default: {COMPACT_QUALITY})")
+    fetch.add_argument("--skip-reviewed", action="store_true", help="Do not download photos of forms reviewed in earlier sessions")
+    fetch.set_defaults(func=cmd_fetch)
+
+    scan = sub.add_parser("scan", parents=[common], help="Scan a photo directory and write its scan manifest")
+    scan.add_argument("directory", type=_directory)
+    scan.add_argument("--validate", action="store_true", help="Also check every photo decodes and quarantine unreadable ones")
+    scan.add_argument("--workers", type=int, help="Validation worker processes (default: CPU count)")
+    scan.set_defaults(func=cmd_scan)
+
+    validate = sub.add_parser("validate", parents=[common], help="Check photos decode and quarantine unreadable ones")
+    validate.add_argument("directory", type=_directory)
+    validate.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    validate.set_defaults(func=cmd_validate)
+
+    compact = sub.add_parser("compact", parents=[common], help="Shrink archived photos in place to a bounded resolution")
+    compact.add_argument("directory", type=_directory)
+    compact.add_argument("--max-edge", type=int, default=COMPACT_MAX_EDGE,
+                         help=f"Longest side in pixels (default: {COMPACT_MAX_EDGE})")
+    compact.add_argument("--quality", type=int, default=COMPACT_QUALITY, help=f"JPEG quality (default: {COMPACT_QUALITY})")
+    compact.add_argument("--cold", help="Copy each original here before it is replaced")
+    compact.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    compact.set_defaults(func=cmd_compact)
+
+    thumbs = sub.add_parser("thumbnails", parents=[common], help="Generate review thumbnails for a photo directory")
+    thumbs.add_argument("directory", type=_directory)
+    thumbs.add_argument("--width", type=int, default=400, help="Thumbnail width (default: 400)")
+    thumbs.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    thumbs.set_defaults(func=cmd_thumbnails)
+
+    rules = argparse.ArgumentParser(add_help=False)
+    rules.add_argument("--dark-below", type=float, help="Flag photos darker than this mean brightness, 0-255 (default: 35)")
+    rules.add_argument("--contrast-below", type=float, help="Flag photos as blank below this brightness spread (default: 10)")
+    rules.add_argument("--blur-below", type=float, help="Flag photos as blurry below this Laplacian variance (default: 25)")
+    rules.add_argument("--entropy-below", type=float, help="Flag photos as flat below this colour entropy in bits (default: 3)")
+
+    prescreen = sub.add_parser("prescreen", parents=[common, rules],
+                               help="Measure brightness, contrast, blur and colour entropy and flag obviously invalid photos")
+    prescreen.add_argument("directory", type=_directory)
+    prescreen.add_argument("--csv", help="Write one row per photo with its signals and flags to this CSV file")
+    prescreen.add_argument("--sort", choices=("brightness", "contrast", "blur", "entropy"), default="blur",
+                           help="Signal to sort the CSV by, lowest first (default: blur)")
+    prescreen.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    prescreen.set_defaults(func=cmd_prescreen)
+
+    reviewed = sub.add_parser("reviewed", parents=[common, reviewed_index],
+                              help="Add review results CSVs to the index of forms reviewed in earlier sessions")
+    reviewed.add_argument("paths", nargs="*", type=Path,
+                          help=f"Results CSVs, or directories to search for {RESULTS_GLOB} (none: just report the index size)")
+    reviewed.set_defaults(func=cmd_reviewed)
+
+    session = sub.add_parser("session", parents=[common, rules, reviewed_index], help="Sample a review session from a photo directory")
+    session.add_argument("directory", type=_directory)
+    session.add_argument("--questions", help="Comma-separated question ids (default: all)")
+    session.add_argument("--percent", type=float, default=10.0, help="Percent of photos to review (default: 10)")
+    session.add_argument("--buckets", default="Real, Fake", help="Comma-separated review buckets")
+    session.add_argument("--known-bad-dir", help="Directory of known bad photos to mix in")
+    session.add_argument("--known-bad-count", type=int, default=5, help="Known bad photos to insert (default: 5)")
+    session.add_argument("--seed", type=int, help="Random seed for reproducible sampling")
+    session.add_argument("--no-validate", action="store_true",
+                         help="Skip checking unchecked photos (photos already quarantined are still left out)")
+    session.add_argument("--prescreen", action="store_true", help="Flag dark, blank and blurry photos in the sampled visits")
+    session.add_argument("--auto-bucket", metavar="BUCKET",
+                         help="Pre-screen and put visits whose photos are all flagged in BUCKET instead of reviewing them")
+    session.add_argument("--include-reviewed", action="store_true",
+                         help="Also sample forms reviewed in earlier sessions, to review them again")
+    session.add_argument("--collapse-clusters", action="store_true",
+                         help="Review visits with near-identical photos once; the decision applies to every member visit")
+    session.add_argument("--cluster-distance", type=int, default=DEFAULT_MAX_DISTANCE, metavar="BITS",
+                         help=f"Most differing bits of a 64-bit photo hash for photos to count as the same (default: {DEFAULT_MAX_DISTANCE})")
+    session.add_argument("--out", help="Session file to write (default: session_<timestamp>.json)")
+    session.set_defaults(func=cmd_session)
+
+    bundle = sub.add_parser("bundle", parents=[common], help="Pack a session and its photos into one review bundle file")
+    bundle.add_argument("session", help="Session file written by the session command")
+    bundle.add_argument("--out", help="Bundle to write (default: the session file name with .prb)")
+    bundle.add_argument("--width", type=int, default=400, help="Width photos are packed at (default: 400)")
+    bundle.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    bundle.set_defaults(func=cmd_bundle)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.debug:
+        os.environ['PHOTO_REVIEW_DEBUG'] = '1'
+    if args.profile:
+        profiling.enable(args.profile_capture)
+    progress = Progress(sys.stdout, args.json)
+    # Keep stdout clean for JSON consumers; the fetch/download code prints freely
+    redirect = contextlib.redirect_stdout(sys.stderr) if args.json else contextlib.nullcontext()
+    with redirect:
+        try:
+            return args.func(args, progress)
+        except KeyboardInterrupt:
+            progress.emit("error", message="Interrupted")
+            return 130
+        finally:
+            if args.profile:
+                profiling.write_report(Path(args.profile))
+                progress.emit("profile", path=args.profile)
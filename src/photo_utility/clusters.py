@@ -0,0 +1,193 @@
+"""Collapse visits whose photos are the same picture into one review decision.
+
+Every photo gets a 64-bit difference hash (dHash): the photo is shrunk to
+9x8 grey pixels and each bit records whether a pixel is brighter than its
+right-hand neighbour. Re-encoded, resized or slightly cropped copies of a
+photo differ in only a few bits, so the number of differing bits (Hamming
+distance) measures how alike two photos are.
+
+Visits are compared photo for photo, in question order. Each visit joins
+the first cluster whose representative (its first visit) is within the
+distance for every photo, so no member is further than that from the visit
+the reviewer actually sees. Candidates are found with a multi-index: the
+hash is cut into ``max_distance + 1`` bands, and two hashes within
+``max_distance`` bits must share at least one band exactly, so only visits
+sharing a band are compared.
+
+Hashes are cached per folder in the cache folder, keyed by size and mtime
+like the quality signals.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from . import profiling
+from .imaging import open_image
+from .scanner import PhotoState, is_fresh, load_photo_state, write_photo_state
+from .thumbnails import cached_thumbnail
+
+
+HASHES_NAME = "hashes.json"
+HASHES_VERSION = 1
+HASH_BITS = 64
+# Differing bits at or below which two photos count as the same picture
+DEFAULT_MAX_DISTANCE = 6
+# Photos hashed per worker job
+HASH_CHUNK = 256
+# Photos handed to the process pool between cancel checks
+HASH_BATCH = 4096
+
+# Photo name -> [size, mtime_ns, hash as hex]; the hash is None for photos that could not be read
+HashState = PhotoState
+
+
+def photo_hash(photo: Path) -> int:
+    """64-bit difference hash of ``photo`` (from its review thumbnail when one is cached)"""
+    from .imaging import load_pillow
+
+    Image = load_pillow()
+    with open_image(cached_thumbnail(photo) or photo) as img:
+        if img.format == "JPEG":
+            # 1/8 scale is plenty for 9x8 pixels
+            img.draft("L", (72, 64))
+        small = img.convert("L").resize((9, 8), Image.BOX)
+    pixels = small.tobytes()
+    value = 0
+    for y in range(8):
+        row = pixels[y * 9:(y + 1) * 9]
+        for x in range(8):
+            value = (value << 1) | (row[x] < row[x + 1])
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _hash_job(paths: List[str]) -> List[Optional[str]]:
+    results: List[Optional[str]] = []
+    for path in paths:
+        try:
+            results.append(f"{photo_hash(Path(path)):016x}")
+        except Exception:
+            results.append(None)
+    return results
+
+
+def load_hash_state(root: Path) -> HashState:
+    """Hashes computed earlier in ``root``; empty if there are none"""
+    return load_photo_state(root, HASHES_NAME, HASHES_VERSION)
+
+
+def write_hash_state(root: Path, state: HashState) -> Path:
+    return write_photo_state(root, HASHES_NAME, HASHES_VERSION, state)
+
+
+def hash_photos(
+    photos: Iterable[Path],
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+    cancel: Optional[threading.Event] = None,
+) -> Tuple[Dict[Path, int], int]:
+    """Hash ``photos`` in a process pool, reusing hashes cached for unchanged photos.
+
+    Returns ``({path: hash}`` for every readable photo, number hashed this
+    time). ``progress(done, total)`` counts the photos that needed hashing.
+    Setting ``cancel`` stops after the current batch; hashes so far are
+    still saved.
+    """
+    states: Dict[Path, HashState] = {}
+    requested: List[Path] = []
+    pending: List[Tuple[Path, int, int]] = []
+    for photo in photos:
+        root = photo.parent
+        if root not in states:
+            states[root] = load_hash_state(root)
+        try:
+            st = photo.stat()
+        except OSError:
+            continue
+        requested.append(photo)
+        if is_fresh(states[root].get(photo.name), st):
+            continue
+        pending.append((photo, st.st_size, st.st_mtime_ns))
+
+    hashed = 0
+    if pending:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with profiling.span("hash"), ProcessPoolExecutor(max_workers=workers) as pool:
+            for start in range(0, len(pending), HASH_BATCH):
+                if cancel is not None and cancel.is_set():
+                    break
+                batch = pending[start:start + HASH_BATCH]
+                chunks = [batch[i:i + HASH_CHUNK] for i in range(0, len(batch), HASH_CHUNK)]
+                jobs = [[str(photo) for photo, _, _ in chunk] for chunk in chunks]
+                for chunk, results in zip(chunks, pool.map(_hash_job, jobs)):
+                    for (photo, size, mtime_ns), value in zip(chunk, results):
+                        states[photo.parent][photo.name] = [size, mtime_ns, value]
+                    hashed += len(chunk)
+                    if progress is not None:
+                        progress(hashed, len(pending))
+        for root, state in states.items():
+            write_hash_state(root, state)
+
+    hashes = {}
+    for photo in requested:
+        known = states[photo.parent].get(photo.name)
+        if known is not None and known[2] is not None:
+            hashes[photo] = int(known[2], 16)
+    return hashes, hashed
+
+
+def _bands(value: int, count: int) -> List[int]:
+    """``value`` cut into ``count`` bit ranges of nearly equal width"""
+    bands = []
+    start = 0
+    for n in range(count):
+        width = (HASH_BITS - start) // (count - n)
+        bands.append((value >> start) & ((1 << width) - 1))
+        start += width
+    return bands
+
+
+def collapse_similar_visits(visits: List[dict], hashes: Dict[Path, int], max_distance: int = DEFAULT_MAX_DISTANCE) -> List[dict]:
+    """``visits`` with each cluster of alike visits replaced by its first visit.
+
+    The representative keeps its place in the review order and gets
+    ``visit["cluster"]``: the ``form_id`` and ``user_id`` of the other
+    members, which share its decision. Known-bad and auto-bucketed visits,
+    and visits with a photo that could not be hashed, are never collapsed.
+    """
+    bands = max_distance + 1
+    # (question ids, band number, band value) -> indexes of representatives in ``kept``
+    index: Dict[tuple, List[int]] = defaultdict(list)
+    kept: List[dict] = []
+    signatures: List[List[int]] = []
+    with profiling.span("cluster"):
+        for visit in visits:
+            photos = sorted(visit["photos"], key=lambda m: m.question_id)
+            signature = [hashes.get(m.filepath) for m in photos]
+            if visit.get("is_known_bad", False) or visit.get("auto_bucket") or not photos or None in signature:
+                kept.append(visit)
+                signatures.append([])
+                continue
+            questions = tuple(m.question_id for m in photos)
+            keys = [(questions, n, band) for n, band in enumerate(_bands(signature[0], bands))]
+            match = None
+            for candidate in sorted({i for key in keys for i in index.get(key, ())}):
+                if all(hamming(a, b) <= max_distance for a, b in zip(signature, signatures[candidate])):
+                    match = candidate
+                    break
+            if match is not None:
+                kept[match].setdefault("cluster", []).append({"form_id": visit["form_id"], "user_id": visit.get("user_id", "")})
+                continue
+            for key in keys:
+                index[key].append(len(kept))
+            kept.append(visit)
+            signatures.append(signature)
+    return kept
@@ -0,0 +1,437 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+import requests
+
+from . import profiling
+from .debug import debug_print
+from .downloads import IncompleteDownloadError, download_body, download_to_file
+from .exif_triage import TriageResult, fetch_triage
+from .form_cache import DEFAULT_CACHE_PATH, FormCache
+from .forms import API_PAGE_SIZE, AttachmentRecord, FormRecord, project_form
+from .ingest import IngestedPhoto, IngestOptions, ingest_photo, record_ingested
+from .scheduler import DOWNLOAD_WORKERS, FETCH_WORKERS, ThroughputReport, round_robin
+
+
+DEFAULT_HQ_URL = "https://www.commcarehq.org"
+
+
+def hq_base_url() -> str:
+    """CommCareHQ server to talk to; COMMCARE_HQ_URL points the API path at another server, e.g. a local mock."""
+    return os.environ.get("COMMCARE_HQ_URL", DEFAULT_HQ_URL).rstrip("/")
+
+
+def form_list_url(domain: str) -> str:
+    return f"{hq_base_url()}/a/{domain}/api/v0.5/form/"
+
+
+def convert_date_format(date_str: str) -> str:
+    """Convert MM/DD/YY to YYYY-MM-DD format"""
+    try:
+        parts = date_str.split('/')
+        if len(parts) != 3:
+            return ""
+        
+        month, day, year = parts
+        month = int(month)
+        day = int(day)
+        year = int(year)
+        
+        # Convert 2-digit year to 4-digit
+        if year < 100:
+            if year < 50:  # Assume 20xx for years 00-49
+                year += 2000
+            else:  # Assume 19xx for years 50-99
+                year += 1900
+        
+        # Validate month and day
+        if not (1 <= month <= 12):
+            return ""
+        if not (1 <= day <= 31):
+            return ""
+        
+        return f"{year}-{month:02d}-{day:02d}"
+    except (ValueError, IndexError):
+        return ""
+
+
+def parse_domain_form_file(file_path: str) -> dict:
+    """Parse the domain/app pairs file into {domain: [app_id, ...]}"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        
+        # Filter out comments
+        lines = [line.strip() for line in content.split('\n') if line.strip() and not line.strip().startswith('#')]
+        content = '\n'.join(lines)
+        
+        # Parse as JSON
+        data = json.loads(content)
+        
+        domain_form_pairs = {}
+        for domain, app_ids in data.items():
+            # A domain maps to a single app id or a list of them
+            if isinstance(app_ids, str):
+                app_ids = [app_ids]
+            cleaned = []
+            for app_id in app_ids:
+                # Extract UUID from app_id if it's a full URL
+                if app_id.startswith('http'):
+                    # Extract UUID from URL like "http://openrosa.org/formdesigner/UUID"
+                    app_id = app_id.split('/')[-1]
+                cleaned.append(app_id)
+            domain_form_pairs[domain] = cleaned
+        
+        return domain_form_pairs
+    except Exception as e:
+        print(f"Error parsing domain/app file: {e}")
+        return {}
+
+
+def find_env_file() -> str:
+    """Find the .env file - first check current directory, then Coverage directories"""
+    # First priority: Check for .env file in current photo_utility directory
+    current_env = Path.cwd() / ".env"
+    if current_env.exists():
+        debug_print(f"  Found .env file in current directory: {current_env}")
+        return str(current_env)
+    
+    # Second priority: Search for Coverage folder in common locations
+    home_dir = Path.home()
+    
+    search_paths = [
+        home_dir / "Documents" / "Coverage" / ".env",
+        home_dir / "Coverage" / ".env",
+        home_dir / "Documents" / "Coverage" / "Coverage" / ".env",  # Nested Coverage folder
+        Path.cwd() / "Coverage" / ".env",  # Current working directory
+    ]
+    
+    # Also search for any Coverage folder in Documents
+    documents_dir = home_dir / "Documents"
+    if documents_dir.exists():
+        for item in documents_dir.iterdir():
+            if item.is_dir() and item.name.lower() == "coverage":
+                search_paths.append(item / ".env")
+    
+    # Check each potential path
+    for env_path in search_paths:
+        if env_path.exists():
+            print(f"  Found .env file at: {env_path}")
+            return str(env_path)
+    
+    return ""
+
+
+def load_api_credentials(env_file: str) -> tuple:
+    """Load API credentials from .env file"""
+    try:
+        username = api_key = ""
+        with open(env_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith('COMMCARE_USERNAME='):
+                    username = line.split('=', 1)[1].strip()
+                elif line.startswith('COMMCARE_API_KEY='):
+                    api_key = line.split('=', 1)[1].strip()
+        
+        return username, api_key
+    except Exception as e:
+        print(f"Error loading credentials: {e}")
+        return "", ""
+
+
+def get_forms_from_api(domain_form_pairs: dict, date_start: str, date_end: str, username: str, api_key: str, limit: int, stats: Optional[ThroughputReport] = None, cache_path: Path = DEFAULT_CACHE_PATH, cancel: Optional[threading.Event] = None, progress: Optional[Callable[[int, int], None]] = None) -> List[FormRecord]:
+    """Get forms from CommCare List Forms API for every domain/app pair concurrently, only fetching what the local form cache lacks.
+
+    Setting ``cancel`` stops paging after the current page; ``progress(done, total)``
+    is called as each domain/app pair finishes."""
+    all_forms = []
+    seen_ids = set()
+    pairs = [(domain, app_id) for domain, app_ids in domain_form_pairs.items() for app_id in app_ids]
+
+    with FormCache(cache_path) as cache, ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+        futures = {
+            pool.submit(_fetch_domain_app, cache, domain, app_id, date_start, date_end, username, api_key, limit, stats, cancel): (domain, app_id)
+            for domain, app_id in pairs
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            domain, app_id = futures[future]
+            if progress is not None:
+                progress(done, len(futures))
+            try:
+                forms = future.result()
+            except requests.exceptions.Timeout:
+                print(f"  [ERROR] API request timed out for domain {domain}")
+                continue
+            except requests.exceptions.RequestException as e:
+                print(f"  [ERROR] API request failed for domain {domain}: {e}")
+                continue
+            except Exception as e:
+                print(f"  [ERROR] Unexpected error for domain {domain}: {e}")
+                import traceback
+                print(f"  Traceback: {traceback.format_exc()}")
+                continue
+
+            # Several apps in one domain may fall back to the same unfiltered forms
+            for record in forms:
+                if record.id in seen_ids:
+                    continue
+                seen_ids.add(record.id)
+                all_forms.append(record)
+
+    print(f"Total forms collected: {len(all_forms)}")
+    return all_forms
+
+def _fetch_domain_app(cache: FormCache, domain: str, app_id: str, date_start: str, date_end: str, username: str, api_key: str, limit: int, stats: Optional[ThroughputReport] = None, cancel: Optional[threading.Event] = None) -> list:
+    """Fetch forms for a single domain/app pair; runs on a fetch worker thread"""
+    debug_print(f"  Processing domain: {domain}")
+    debug_print(f"  Form app_id: {app_id}")
+    started = time.perf_counter()
+
+    with profiling.span("fetch.domain_app"):
+        forms = sync_forms(cache, domain, app_id, date_start, date_end, username, api_key, limit, cancel)
+    debug_print(f"  Found {len(forms)} forms for domain {domain}")
+
+    # If no forms found with app_id, try without app_id parameter
+    if len(forms) == 0 and not (cancel is not None and cancel.is_set()):
+        print(f"  No forms found with app_id '{app_id}', trying without app_id filter...")
+        with profiling.span("fetch.domain_app"):
+            forms = sync_forms(cache, domain, "", date_start, date_end, username, api_key, limit, cancel)
+        debug_print(f"  Found {len(forms)} forms without app_id filter")
+
+        # Show sample of what forms are available
+        if forms:
+            debug_print(f"  Sample form app_id: {forms[0].app_id or 'N/A'}")
+
+    if stats is not None:
+        stats.record_fetch(domain, len(forms), time.perf_counter() - started)
+    return forms
+
+def sync_forms(cache: FormCache, domain: str, app_id: str, date_start: str, date_end: str, username: str, api_key: str, limit: int, cancel: Optional[threading.Event] = None) -> list:
+    """Fetch forms newer than the cached watermark for domain/app page by page, merge them, and return the cached range as FormRecords"""
+    # CommCare List Forms API
+    url = form_list_url(domain)
+    debug_print(f"  API URL: {url}")
+
+    # Ascending order lets the watermark advance without leaving gaps behind it
+    params = {
+        'limit': min(limit, API_PAGE_SIZE),
+        'order_by': 'received_on',
+    }
+    if app_id:
+        params['app_id'] = app_id
+
+    # Only add date filters if dates are provided and not empty
+    watermark = cache.watermark(domain, app_id, date_start)
+    if watermark:
+        debug_print(f"  Cached through {watermark}, requesting newer forms only")
+        params['received_on_start'] = watermark
+    elif date_start and date_start.strip():
+        params['received_on_start'] = date_start
+    if date_end and date_end.strip():
+        params['received_on_end'] = date_end
+    debug_print(f"  API Parameters: {params}")
+
+    fetched = 0
+    page_url = url
+    while page_url and fetched < limit:
+        if cancel is not None and cancel.is_set():
+            debug_print(f"  Cancelled after {fetched} forms")
+            break
+        debug_print(f"  Making API request...")
+        with profiling.span("fetch.page"):
+            response = requests.get(page_url, auth=(username, api_key), params=params, timeout=30)
+        debug_print(f"  Response status: {response.status_code}")
+
+        if response.status_code != 200:
+            print(f"  [ERROR] API call failed with status {response.status_code}")
+            print(f"  Response: {response.text}")
+            break
+
+        with profiling.span("fetch.parse"):
+            data = response.json()
+        debug_print(f"  [OK] API call successful")
+        if 'objects' not in data:
+            print(f"  [ERROR] No 'objects' key in response for domain {domain}")
+            print(f"  Response data: {data}")
+            break
+
+        # Project each form as the page is parsed so the raw payloads can be dropped
+        with profiling.span("fetch.parse"):
+            records = [project_form(form) for form in data['objects'][:limit - fetched]]
+        next_page = (data.get('meta') or {}).get('next')
+        del data
+
+        stored = cache.merge(domain, app_id, (record.to_json() for record in records), date_start)
+        fetched += len(records)
+        debug_print(f"  Merged {stored} new or updated forms into cache ({fetched} this run)")
+        if records:
+            sample = records[0]
+            debug_print(f"  Sample form {sample.id} has {sample.attachment_count} attachments, {len(sample.attachments)} photos")
+
+        if not records or not next_page:
+            break
+        # meta.next is a query string (or URL) relative to the endpoint and carries the filters
+        page_url = urljoin(url, next_page)
+        params = None
+
+    return [FormRecord.from_json(form) for form in cache.forms(domain, app_id, date_start, date_end, limit)]
+
+def download_attachments(jobs: list, username: str, api_key: str, stats: Optional[ThroughputReport] = None, triage: bool = False, workers: int = DOWNLOAD_WORKERS, progress: Optional[Callable[[int, int], None]] = None, on_photo: Optional[Callable[[Path, bool, Optional[TriageResult]], None]] = None, cancel: Optional[threading.Event] = None, ingest: Optional[IngestOptions] = None) -> Dict[Path, Optional[TriageResult]]:
+    """Download (record, attachment, file_path) jobs, sharing the worker pool round-robin across domains.
+
+    Returns {file_path: TriageResult or None} for every photo handled. In triage
+    mode only the head of each photo is fetched and the result carries its EXIF
+    thumbnail; full downloads map to None. ``progress(done, total)`` is called
+    as each job finishes, successful or not, and ``on_photo(file_path, ok,
+    result)`` with its outcome. Once ``cancel`` is set, jobs that have not
+    started are skipped and reported as failed. With ``ingest`` set, full
+    downloads are held in memory and go through the ingest pipeline (hash,
+    EXIF, one decode for compaction and the thumbnail) before being written."""
+    print(f"Starting photo download process...")
+    print(f"Photos to download: {len(jobs)}")
+
+    downloaded_photos: Dict[Path, Optional[TriageResult]] = {}
+    if stats is None:
+        stats = ThroughputReport()
+
+    # Photo attachments queued per domain
+    jobs_per_domain = {}
+    for record, attachment, file_path in jobs:
+        jobs_per_domain.setdefault(record.domain, []).append((record, attachment, file_path))
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Interleave domains so each one gets a fair share of the pool
+    span_name = "download.triage" if triage else "download.attachment"
+    ingested: List[IngestedPhoto] = []
+    if ingest is not None and not triage:
+        def keep(file_path: Path, body: bytes) -> None:
+            ingested.append(ingest_photo(file_path, body, ingest))
+
+        def worker(file_path, record, attachment, username, api_key, stats):
+            return download_attachment(file_path, record, attachment, username, api_key, stats, ingest=keep)
+    else:
+        worker = triage_attachment if triage else download_attachment
+
+    def run(file_path, record, attachment):
+        if cancel is not None and cancel.is_set():
+            return None
+        with profiling.span(span_name):
+            return worker(file_path, record, attachment, username, api_key, stats)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(run, file_path, record, attachment): file_path
+            for domain, (record, attachment, file_path) in round_robin(jobs_per_domain)
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            outcome = future.result()
+            if outcome is not None:
+                file_path, result = outcome
+                downloaded_photos[file_path] = result
+            if on_photo is not None:
+                on_photo(futures[future], outcome is not None, outcome[1] if outcome is not None else None)
+            if progress is not None:
+                progress(done, len(futures))
+
+    print(f"Download summary:")
+    print(f"  - Forms with photos: {len({record.id for record, _, _ in jobs})}")
+    print(f"  - Photos requested: {len(jobs)}")
+    if triage:
+        print(f"  - Photos triaged: {len(downloaded_photos)} ({sum(1 for r in downloaded_photos.values() if r and r.thumbnail)} with thumbnails)")
+    else:
+        print(f"  - Photos downloaded: {len(downloaded_photos)}")
+    if ingested:
+        record_ingested(ingested)
+        unreadable = sum(1 for photo in ingested if photo.reason is not None)
+        print(f"  - Photos processed in memory: {len(ingested)} ({sum(1 for photo in ingested if photo.thumbnail)} thumbnails, {unreadable} unreadable)")
+        if ingest.compact is not None:
+            from .compaction import format_bytes
+
+            saved = sum(photo.downloaded - photo.size for photo in ingested)
+            print(f"  - Photos compacted: {sum(1 for photo in ingested if photo.size < photo.downloaded)} (saved {format_bytes(saved)})")
+
+    # Show throughput per domain
+    summary = stats.summary_lines()
+    if summary:
+        print(f"  - Per-domain throughput:")
+        for line in summary:
+            print(f"    * {line}")
+    else:
+        print(f"  - No photos downloaded from any domain")
+
+    return downloaded_photos
+
+def download_attachment(file_path: Path, record: FormRecord, attachment: AttachmentRecord, username: str, api_key: str, stats: ThroughputReport, ingest: Optional[Callable[[Path, bytes], None]] = None) -> Optional[Tuple[Path, None]]:
+    """Download a single photo attachment; runs on a download worker thread.
+
+    With ``ingest``, the body is downloaded into memory and ``ingest(file_path,
+    body)`` writes it out; photos too large to buffer are streamed to disk."""
+    attachment_name = attachment.name
+    started = time.perf_counter()
+    debug_print(f"      Processing attachment: {attachment_name} (form {record.id}, user {record.user_id}, domain {record.domain})")
+
+    try:
+        download_url = attachment.download_url
+        debug_print(f"      Download URL: {download_url}")
+
+        if not download_url:
+            print(f"      [ERROR] No download URL found for {attachment_name}")
+            return None
+
+        debug_print(f"      Downloading photo...")
+        if ingest is None:
+            # Stream the photo to disk; the file only appears once complete
+            size = download_to_file(download_url, file_path, auth=(username, api_key), timeout=30)
+            stats.record_download(record.domain, started, size)
+        else:
+            body = download_body(download_url, file_path, auth=(username, api_key), timeout=30)
+            if body is None:
+                size = file_path.stat().st_size
+            else:
+                size = len(body)
+                ingest(file_path, body)
+            stats.record_download(record.domain, started, size)
+
+        debug_print(f"      [OK] Downloaded: {file_path.name} ({size} bytes)")
+        return file_path, None
+
+    except requests.exceptions.Timeout:
+        print(f"      [ERROR] Download timeout for {attachment_name}")
+    except IncompleteDownloadError as e:
+        print(f"      [ERROR] Incomplete download for {attachment_name}: {e}")
+    except requests.exceptions.RequestException as e:
+        print(f"      [ERROR] Download failed for {attachment_name}: {e}")
+    except Exception as e:
+        print(f"      [ERROR] Error downloading {attachment_name}: {e}")
+        import traceback
+        print(f"      Traceback: {traceback.format_exc()}")
+    stats.record_download(record.domain, started, 0, ok=False)
+    return None
+
+def triage_attachment(file_path: Path, record: FormRecord, attachment: AttachmentRecord, username: str, api_key: str, stats: ThroughputReport) -> Optional[Tuple[Path, TriageResult]]:
+    """Fetch only the EXIF head of a photo attachment; runs on a download worker thread"""
+    attachment_name = attachment.name
+    started = time.perf_counter()
+    try:
+        if not attachment.download_url:
+            print(f"      [ERROR] No download URL found for {attachment_name}")
+            return None
+        result = fetch_triage(attachment.download_url, file_path, auth=(username, api_key), timeout=30)
+        stats.record_download(record.domain, started, result.bytes_transferred)
+        debug_print(f"      [OK] Triaged: {file_path.name} ({result.bytes_transferred} bytes, thumbnail: {result.thumbnail is not None}, full: {result.full_download})")
+        return file_path, result
+    except requests.exceptions.RequestException as e:
+        print(f"      [ERROR] Triage failed for {attachment_name}: {e}")
+    except Exception as e:
+        print(f"      [ERROR] Error triaging {attachment_name}: {e}")
+    stats.record_download(record.domain, started, 0, ok=False)
+    return None
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import io
+import os
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Optional, Tuple
+
+from . import profiling
+from .imaging import open_image
+
+
+# Photos are reviewed 400px wide; this leaves room to zoom in
+COMPACT_MAX_EDGE = 1600
+COMPACT_QUALITY = 85
+
+
+@dataclass
+class CompactionSummary:
+    compacted: int = 0
+    skipped: int = 0
+    failed: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.bytes_before - self.bytes_after
+
+    def add(self, before: int, after: Optional[int]) -> None:
+        """Count one photo: ``after`` is None for a failure, equal to ``before`` if left alone"""
+        if after is None:
+            self.failed += 1
+            return
+        self.bytes_before += before
+        self.bytes_after += after
+        if after < before:
+            self.compacted += 1
+        else:
+            self.skipped += 1
+
+
+def compact_size(img, max_edge: int = COMPACT_MAX_EDGE, quality: int = COMPACT_QUALITY) -> Optional[Tuple[int, int]]:
+    """Size to re-encode an opened (not yet decoded) image at, or None to leave it alone.
+
+    Only the header is consulted: photos within ``max_edge`` are left alone
+    unless they are JPEGs quantized more finely than ``quality``.
+    """
+    w, h = img.size
+    scale = max_edge / float(max(w, h))
+    if scale >= 1.0 and (img.format != "JPEG" or _jpeg_quality_at_most(img, quality)):
+        return None
+    scale = min(scale, 1.0)
+    return max(1, int(round(w * scale))), max(1, int(round(h * scale)))
+
+
+def encode_compact(img, fmt: str, info: dict, size: Tuple[int, int], quality: int = COMPACT_QUALITY):
+    """Resize a decoded image to ``size`` and encode it in ``fmt``; returns ``(bytes, resized image)``.
+
+    JPEGs keep the EXIF and ICC profile from ``info``.
+    """
+    if img.size != size:
+        with profiling.span("resize"):
+            from PIL import Image
+
+            img = img.resize(size, Image.LANCZOS)
+    body = io.BytesIO()
+    options = {}
+    for key in ("exif", "icc_profile"):
+        if info.get(key):
+            options[key] = info[key]
+    if fmt == "JPEG":
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        img.save(body, "JPEG", quality=quality, optimize=True, **options)
+    elif fmt == "PNG":
+        img.save(body, "PNG", optimize=True, **options)
+    else:
+        img.save(body, fmt)
+    return body.getvalue(), img
+
+
+def compact_photo(path: Path, max_edge: int = COMPACT_MAX_EDGE, quality: int = COMPACT_QUALITY, cold_dir: Optional[Path] = None) -> Tuple[int, int]:
+    """Shrink ``path`` in place so its long edge is at most ``max_edge``.
+
+    JPEGs are re-encoded at ``quality`` with their EXIF and ICC profile kept;
+    other formats are resized in their own format so the file name (and the
+    form/question ids parsed from it) stay valid. The photo is left alone when
+    it is already small enough or re-encoding would not make it smaller. With
+    ``cold_dir`` the original is copied there first. Returns ``(bytes before,
+    bytes after)``.
+    """
+    from .downloads import write_atomic
+
+    before = path.stat().st_size
+    with open_image(path) as img:
+        size = compact_size(img, max_edge, quality)
+        if size is None:
+            return before, before
+        fmt, info = img.format, img.info
+        if fmt == "JPEG":
+            img.draft(img.mode, size)
+        with profiling.span("decode"):
+            img.load()
+        data, _ = encode_compact(img, fmt, info, size, quality)
+    if len(data) >= before:
+        return before, before
+    if cold_dir is not None:
+        cold_dir.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(path, cold_dir / path.name)
+    write_atomic(path, data)
+    return before, len(data)
+
+
+def _jpeg_quality_at_most(img, quality: int) -> bool:
+    """Whether a JPEG's luminance quantization table is no finer than our encoder's at ``quality``"""
+    tables = getattr(img, "quantization", None)
+    if not tables or 0 not in tables:
+        return False
+    # libjpeg's scale factor for the standard tables; a larger average step means lower quality
+    scale = 5000 / quality if quality < 50 else 200 - quality * 2
+    ours = sum(max(1, min(255, (q * scale + 50) // 100)) for q in _STANDARD_LUMINANCE) / 64.0
+    return sum(tables[0]) / 64.0 >= ours
+
+
+# libjpeg's standard luminance quantization table (natural order; only the average is used)
+_STANDARD_LUMINANCE = (
+    16, 11, 10, 16, 24, 40, 51, 61, 12, 12, 14, 19, 26, 58, 60, 55,
+    14, 13, 16, 24, 40, 57, 69, 56, 14, 17, 22, 29, 51, 87, 80, 62,
+    18, 22, 37, 56, 68, 109, 103, 77, 24, 35, 55, 64, 81, 104, 113, 92,
+    49, 64, 78, 87, 103, 121, 120, 101, 72, 92, 95, 98, 112, 100, 103, 99,
+)
+
+
+def _compact_job(args: Tuple[Path, int, int, Optional[Path]]) -> Tuple[Path, int, Optional[int], Optional[str]]:
+    path, max_edge, quality, cold_dir = args
+    try:
+        before, after = compact_photo(path, max_edge, quality, cold_dir)
+        return path, before, after, None
+    except Exception as e:
+        try:
+            before = path.stat().st_size
+        except OSError:
+            before = 0
+        return path, before, None, str(e)
+
+
+def compact_photos(
+    photos: Iterable[Path],
+    max_edge: int = COMPACT_MAX_EDGE,
+    quality: int = COMPACT_QUALITY,
+    cold_dir: Optional[Path] = None,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int, Path, Optional[str]], None]] = None,
+) -> CompactionSummary:
+    """Compact ``photos`` across a process pool; ``progress(done, total, photo, error)`` is called per photo"""
+    from concurrent.futures import ProcessPoolExecutor
+
+    jobs = [(photo, max_edge, quality, cold_dir) for photo in photos]
+    summary = CompactionSummary()
+    if not jobs:
+        return summary
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunksize = max(1, min(16, len(jobs) // ((workers or os.cpu_count() or 4) * 4)))
+        for done, (photo, before, after, error) in enumerate(pool.map(_compact_job, jobs, chunksize=chunksize), 1):
+            summary.add(before, after)
+            if progress is not None:
+                progress(done, len(jobs), photo, error)
+    return summary
+
+
+def format_bytes(size: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(size) < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024.0
+    return f"{size:.1f} GB"
@@ -0,0 +1,9 @@
+from __future__ import annotations
+
+import os
+
+
+def debug_print(message: str) -> None:
+    """Print debug message if debug mode is enabled"""
+    if os.environ.get('PHOTO_REVIEW_DEBUG') == '1':
+        print(f"DEBUG: {message}")
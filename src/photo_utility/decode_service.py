@@ -0,0 +1,316 @@
+"""Decode review photos in worker processes and hand the frames over in shared memory.
+
+Pillow releases the GIL inside the decoder, but file handling, mode
+conversion and resizing glue still run Python in the UI process and delay
+Tk's event loop. The decode service moves all of it to worker processes:
+each worker decodes and scales a photo to review width and writes the RGB
+pixels into a ``multiprocessing.shared_memory`` segment. The UI process wraps
+the segment with ``Image.frombuffer`` (no copy) and Tk copies the pixels
+into its own photo image, after which the segment is unlinked.
+
+Frames are decoded ahead for a sliding window of upcoming photos, within a
+byte budget. Segments are registered with the UI process's resource tracker
+as soon as they are handed over, so they are removed even if the UI process
+dies; ``sweep_stale_segments`` also clears segments of processes that no
+longer exist (Linux). If a worker dies, the service stops and callers decode
+photos themselves.
+"""
+
+from __future__ import annotations
+
+import itertools
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+from .thumbnails import REVIEW_WIDTH, load_review_image
+
+
+SEGMENT_PREFIX = "prdecode"
+DEFAULT_BUDGET_BYTES = 128 * 1024 * 1024
+# How long the UI waits for a frame still being decoded before decoding it itself
+TAKE_TIMEOUT = 0.5
+# Budget reserved per decode in flight, before its real size is known (a 400x400 RGB frame)
+IN_FLIGHT_ESTIMATE = REVIEW_WIDTH * REVIEW_WIDTH * 3
+
+_counter = itertools.count()
+
+
+def _segment_name(owner: int) -> str:
+    # POSIX shared memory names are short; pids and a counter keep them unique
+    return f"{SEGMENT_PREFIX}_{owner}_{os.getpid()}_{next(_counter)}"
+
+
+def _decode_job(args: Tuple[str, int, int]) -> Tuple[Optional[str], Tuple[int, int], Optional[str]]:
+    """Decode one photo into a new shared memory segment; returns (segment name, size, error)"""
+    path, width, owner = args
+    try:
+        img = load_review_image(Path(path), width)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        data = img.tobytes()
+        shm = shared_memory.SharedMemory(name=_segment_name(owner), create=True, size=max(1, len(data)))
+    except Exception as e:
+        return None, (0, 0), f"{type(e).__name__}: {e}"
+    try:
+        shm.buf[:len(data)] = data
+        # The UI process owns the segment from here; this worker must not unlink it on exit
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm.name, img.size, None
+    except Exception as e:
+        shm.unlink()
+        return None, (0, 0), f"{type(e).__name__}: {e}"
+    finally:
+        shm.close()
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    return shared_memory.SharedMemory(name=name)
+
+
+def _unlink(name: str) -> None:
+    try:
+        shm = _attach(name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+def sweep_stale_segments() -> int:
+    """Unlink decode segments left behind by UI processes that are gone; returns how many (Linux only)"""
+    shm_dir = Path("/dev/shm")
+    if not shm_dir.is_dir():
+        return 0
+    removed = 0
+    for entry in shm_dir.glob(f"{SEGMENT_PREFIX}_*"):
+        try:
+            owner = int(entry.name.split("_")[1])
+        except (IndexError, ValueError):
+            continue
+        try:
+            os.kill(owner, 0)
+            continue
+        except ProcessLookupError:
+            pass
+        except PermissionError:
+            # Someone else's live process
+            continue
+        try:
+            entry.unlink()
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+class Frame:
+    """A decoded photo backed by a shared memory segment; ``release()`` once Tk has its copy"""
+
+    def __init__(self, name: str, size: Tuple[int, int]) -> None:
+        from .imaging import load_pillow
+
+        Image = load_pillow()
+        self._shm = _attach(name)
+        self.size = size
+        self.nbytes = size[0] * size[1] * 3
+        self.image = Image.frombuffer("RGB", size, self._shm.buf, "raw", "RGB", 0, 1)
+
+    def release(self) -> None:
+        if self._shm is None:
+            return
+        # The image points into the segment, so it has to go before the segment is closed
+        self.image = None
+        try:
+            self._shm.close()
+        except BufferError:
+            # Someone still holds the image; the mapping goes with it
+            pass
+        self._shm.unlink()
+        self._shm = None
+
+    def __enter__(self) -> "Frame":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+class DecodeService:
+    """Decodes a window of upcoming photos in ``workers`` processes, within ``budget_bytes`` of frames.
+
+    ``prefetch(paths)`` sets the window (in review order); ``take(path)`` hands
+    over the frame for ``path`` or returns None, in which case the caller
+    decodes it itself. Call ``close()`` when done.
+    """
+
+    def __init__(self, workers: int = 2, budget_bytes: int = DEFAULT_BUDGET_BYTES, width: int = REVIEW_WIDTH) -> None:
+        from concurrent.futures import ProcessPoolExecutor
+
+        sweep_stale_segments()
+        # Started before the pool so the workers share it instead of each starting their own
+        resource_tracker.ensure_running()
+        self.workers = workers
+        self.budget_bytes = budget_bytes
+        self.width = width
+        self._pool = ProcessPoolExecutor(max_workers=workers)
+        self._lock = threading.Lock()
+        self._queue: Deque[Path] = deque()
+        self._futures: Dict[Path, Future] = {}
+        # Decoded frame sizes, counted against the budget until taken or discarded
+        self._ready_bytes: Dict[Future, int] = {}
+        self._discarded: set = set()
+        # Taken before _on_decoded ran; it must neither book nor register their segments
+        self._taken: set = set()
+        self._closed = False
+        # A worker died; nothing more can be decoded
+        self._broken = False
+        self.decoded = self.hits = self.misses = self.failed = self.discarded = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def bytes_in_use(self) -> int:
+        with self._lock:
+            return self._bytes_in_use()
+
+    def _bytes_in_use(self) -> int:
+        in_flight = sum(1 for future in self._futures.values() if future not in self._ready_bytes)
+        return sum(self._ready_bytes.values()) + in_flight * IN_FLIGHT_ESTIMATE
+
+    def prefetch(self, paths: Iterable[Path]) -> None:
+        """Decode ``paths`` ahead, nearest first; frames outside the new window are dropped"""
+        wanted = list(dict.fromkeys(paths))
+        keep = set(wanted)
+        with self._lock:
+            if self._closed or self._broken:
+                return
+            for path in [p for p in self._futures if p not in keep]:
+                self._discard(self._futures.pop(path))
+            self._queue = deque(p for p in wanted if p not in self._futures)
+            submitted = self._pump()
+        self._watch(submitted)
+
+    def _pump(self) -> List[Future]:
+        """Submit queued decodes while the budget allows; called with the lock held, returns the new futures"""
+        submitted = []
+        while self._queue and not self._broken and self._bytes_in_use() + IN_FLIGHT_ESTIMATE <= self.budget_bytes:
+            path = self._queue.popleft()
+            try:
+                future = self._pool.submit(_decode_job, (str(path), self.width, os.getpid()))
+            except BrokenProcessPool:
+                self._mark_broken()
+                break
+            self._futures[path] = future
+            submitted.append(future)
+        return submitted
+
+    def _watch(self, futures: List[Future]) -> None:
+        # Outside the lock: a future already done runs its callback right here
+        for future in futures:
+            future.add_done_callback(self._on_decoded)
+
+    def _mark_broken(self) -> None:
+        """Stop decoding after a worker died; called with the lock held"""
+        self._broken = True
+        self._queue.clear()
+        self.last_error = "worker process failed"
+
+    def _on_decoded(self, future: Future) -> None:
+        if future.cancelled():
+            return
+        try:
+            name, size, error = future.result()
+        except Exception:
+            # A worker died; the pool is broken and nothing more will decode
+            name, size, error = None, (0, 0), "worker process failed"
+            with self._lock:
+                self._mark_broken()
+        with self._lock:
+            if name is not None:
+                self.decoded += 1
+            else:
+                self.failed += 1
+                self.last_error = error
+            if future in self._taken:
+                # take() registered the segment and its frame owns it now
+                self._taken.discard(future)
+                return
+            if name is not None:
+                # From now on the segment is removed even if this process crashes
+                resource_tracker.register(f"/{name}", "shared_memory")
+            if future in self._discarded or self._closed:
+                self._discarded.discard(future)
+                if name is not None:
+                    _unlink(name)
+                return
+            if name is not None:
+                self._ready_bytes[future] = size[0] * size[1] * 3
+            submitted = self._pump()
+        self._watch(submitted)
+
+    def _discard(self, future: Future) -> None:
+        """Drop a decode no longer wanted; called with the lock held"""
+        self.discarded += 1
+        if future.cancel():
+            return
+        if future in self._ready_bytes:
+            del self._ready_bytes[future]
+            name = future.result()[0]
+            if name is not None:
+                _unlink(name)
+        else:
+            # Still decoding; _on_decoded unlinks the segment when it arrives
+            self._discarded.add(future)
+
+    def take(self, path: Path, timeout: float = TAKE_TIMEOUT) -> Optional[Frame]:
+        """The decoded frame for ``path``, or None if it is not queued, failed or is not ready in time"""
+        with self._lock:
+            future = None if self._broken else self._futures.get(path)
+        if future is None:
+            self.misses += 1
+            return None
+        try:
+            name, size, error = future.result(timeout=timeout)
+        except FutureTimeout:
+            self.misses += 1
+            return None
+        except Exception:
+            name = None
+        with self._lock:
+            self._futures.pop(path, None)
+            # result() returns before the done callbacks run, so _on_decoded may not have seen this one yet
+            booked = self._ready_bytes.pop(future, None) is not None
+            if name is not None and not booked:
+                self._taken.add(future)
+                resource_tracker.register(f"/{name}", "shared_memory")
+            submitted = self._pump()
+        self._watch(submitted)
+        if name is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return Frame(name, size)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.clear()
+            futures = list(self._futures.values())
+            self._futures.clear()
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        # Decoded frames nobody took; in-flight ones were unlinked by _on_decoded
+        for future in futures:
+            if future.done() and not future.cancelled() and future not in self._discarded:
+                try:
+                    name = future.result()[0]
+                except Exception:
+                    continue
+                if name is not None:
+                    _unlink(name)
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional, Tuple
+
+import requests
+
+
+# Bytes pulled from the socket per write; keeps peak memory per download flat
+# no matter how large the photo is.
+CHUNK_SIZE = 64 * 1024
+
+# Largest body the ingest pipeline holds in memory; bigger photos are streamed
+# to disk as usual.
+MAX_BUFFERED_BYTES = 32 * 1024 * 1024
+
+# Suffix used for in-progress downloads. It is not an image extension, so the
+# scanner never picks up a half-written file.
+PARTIAL_SUFFIX = ".part"
+
+
+def _current_umask() -> int:
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# Permissions open() would give a new file. mkstemp() creates its files 0600,
+# which would leave every downloaded photo readable by its owner only.
+FILE_MODE = 0o666 & ~_current_umask()
+
+
+class IncompleteDownloadError(IOError):
+    """Raised when a download ends before the advertised Content-Length."""
+
+
+def _expected_length(response: requests.Response) -> Optional[int]:
+    # iter_content() transparently decodes gzip/deflate bodies, so the header
+    # only describes what we will write when the body is sent as-is.
+    encoding = response.headers.get("Content-Encoding", "identity").lower()
+    if encoding not in ("", "identity"):
+        return None
+    value = response.headers.get("Content-Length")
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _temp_file_beside(dest: Path) -> Tuple[int, str]:
+    """A temp file in ``dest``'s directory with the permissions ``dest`` would get if written directly"""
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{dest.name}.", suffix=PARTIAL_SUFFIX, dir=dest.parent)
+    try:
+        os.chmod(tmp_name, FILE_MODE)
+    except BaseException:
+        os.close(fd)
+        os.unlink(tmp_name)
+        raise
+    return fd, tmp_name
+
+
+def stream_to_file(response: requests.Response, dest: Path, chunk_size: int = CHUNK_SIZE) -> int:
+    """Stream a response body to ``dest`` through a temp file in the same directory.
+
+    The temp file is only renamed into place once every byte has arrived, so
+    ``dest`` either holds the complete photo or does not exist. Returns the
+    number of bytes written.
+    """
+    dest = Path(dest)
+    expected = _expected_length(response)
+    fd, tmp_name = _temp_file_beside(dest)
+    written = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    f.write(chunk)
+                    written += len(chunk)
+        if expected is not None and written != expected:
+            raise IncompleteDownloadError(
+                f"{dest.name}: received {written} of {expected} bytes"
+            )
+        os.replace(tmp_name, dest)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+    return written
+
+
+def write_atomic(dest: Path, data: bytes) -> None:
+    """Write ``data`` to ``dest`` through a temp file so readers never see a partial file."""
+    dest = Path(dest)
+    fd, tmp_name = _temp_file_beside(dest)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_name, dest)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def download_to_file(
+    url: str,
+    dest: Path,
+    auth: Optional[Tuple[str, str]] = None,
+    timeout: float = 30,
+    session: Optional[requests.Session] = None,
+) -> int:
+    """Download ``url`` to ``dest`` atomically without buffering the body in memory."""
+    getter = session if session is not None else requests
+    with getter.get(url, auth=auth, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        return stream_to_file(response, dest)
+
+
+def download_body(
+    url: str,
+    dest: Path,
+    auth: Optional[Tuple[str, str]] = None,
+    timeout: float = 30,
+    session: Optional[requests.Session] = None,
+    max_buffered: int = MAX_BUFFERED_BYTES,
+) -> Optional[bytes]:
+    """Download ``url`` into memory for the caller to process and write out.
+
+    Returns the complete body as one ``bytes`` object (so BytesIO and
+    memoryview consumers can share it without copying). A body advertised as
+    larger than ``max_buffered`` is streamed to ``dest`` instead and None is
+    returned.
+    """
+    getter = session if session is not None else requests
+    with getter.get(url, auth=auth, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        expected = _expected_length(response)
+        if expected is not None and expected > max_buffered:
+            stream_to_file(response, dest)
+            return None
+        chunks = []
+        received = 0
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            if chunk:
+                chunks.append(chunk)
+                received += len(chunk)
+        if expected is not None and received != expected:
+            raise IncompleteDownloadError(f"{Path(dest).name}: received {received} of {expected} bytes")
+        return b"".join(chunks)
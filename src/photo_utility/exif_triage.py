@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import requests
+from PIL import ExifTags, Image
+
+from .downloads import CHUNK_SIZE, stream_to_file, write_atomic
+
+
+# First Range request; phone EXIF blocks with their thumbnail usually fit
+TRIAGE_BYTES = 16 * 1024
+# Upper bound for a follow-up request when the EXIF segment runs past the first
+# range: SOI, a JFIF APP0 and a maximum-size (64 KB) APP1 segment
+MAX_TRIAGE_BYTES = 72 * 1024
+
+_CONTENT_RANGE_RE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+|\*)")
+
+_EXIF_HEADER = b"Exif\x00\x00"
+
+# Tag ids (see PIL.ExifTags.TAGS / GPSTAGS)
+_MAKE, _MODEL, _DATETIME, _ORIENTATION = 0x010F, 0x0110, 0x0132, 0x0112
+_DATETIME_ORIGINAL = 0x9003
+_THUMB_OFFSET, _THUMB_LENGTH = 0x0201, 0x0202
+_GPS_LAT_REF, _GPS_LAT, _GPS_LON_REF, _GPS_LON = 1, 2, 3, 4
+
+
+@dataclass(frozen=True)
+class TriageResult:
+    """Embedded EXIF thumbnail and fields fetched from the head of a remote photo."""
+
+    thumbnail: Optional[bytes]
+    fields: Dict[str, str] = field(default_factory=dict)
+    # True when the whole photo was saved to the destination path, either because
+    # the server ignored the Range request or the photo fit inside the range
+    full_download: bool = False
+    bytes_transferred: int = 0
+
+
+def _locate_exif(head: bytes) -> Optional[Tuple[int, int]]:
+    """Byte range ``(start, end)`` of the APP1 EXIF payload, even if ``head`` stops before ``end``."""
+    if head[:2] != b"\xff\xd8":
+        return None
+    pos = 2
+    while pos + 4 <= len(head):
+        if head[pos] != 0xFF:
+            return None
+        marker = head[pos + 1]
+        if marker == 0xFF:
+            # Fill byte before the real marker
+            pos += 1
+            continue
+        if marker in (0xD9, 0xDA):
+            # End of image / start of scan: metadata segments are behind us
+            return None
+        length = int.from_bytes(head[pos + 2:pos + 4], "big")
+        if marker == 0xE1 and head[pos + 4:pos + 10] == _EXIF_HEADER:
+            return pos + 4, pos + 2 + length
+        pos += 2 + length
+    return None
+
+
+def find_exif_segment(head: bytes) -> Optional[bytes]:
+    """Return the APP1 EXIF payload (starting with ``Exif\\0\\0``) from the start of a JPEG."""
+    located = _locate_exif(head)
+    if located is None or located[1] > len(head):
+        # A truncated segment would give bogus thumbnail offsets
+        return None
+    start, end = located
+    return head[start:end]
+
+
+def _gps_degrees(value, ref) -> Optional[float]:
+    try:
+        degrees, minutes, seconds = (float(v) for v in value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    result = degrees + minutes / 60.0 + seconds / 3600.0
+    return -result if ref in ("S", "W") else result
+
+
+def parse_exif_head(head: bytes) -> Tuple[Optional[bytes], Dict[str, str]]:
+    """Extract the embedded JPEG thumbnail and a few review-relevant EXIF fields."""
+    segment = find_exif_segment(head)
+    if segment is None:
+        return None, {}
+    exif = Image.Exif()
+    try:
+        exif.load(segment)
+    except Exception:
+        return None, {}
+
+    fields: Dict[str, str] = {}
+    for tag, label in ((_MAKE, "Make"), (_MODEL, "Model"), (_DATETIME, "DateTime"), (_ORIENTATION, "Orientation")):
+        if tag in exif:
+            fields[label] = str(exif[tag]).strip("\x00 ")
+    try:
+        exif_ifd = exif.get_ifd(ExifTags.IFD.Exif)
+        if _DATETIME_ORIGINAL in exif_ifd:
+            fields["DateTimeOriginal"] = str(exif_ifd[_DATETIME_ORIGINAL]).strip("\x00 ")
+        gps = exif.get_ifd(ExifTags.IFD.GPSInfo)
+        lat = _gps_degrees(gps.get(_GPS_LAT), gps.get(_GPS_LAT_REF))
+        lon = _gps_degrees(gps.get(_GPS_LON), gps.get(_GPS_LON_REF))
+        if lat is not None and lon is not None:
+            fields["GPS"] = f"{lat:.5f}, {lon:.5f}"
+        ifd1 = exif.get_ifd(ExifTags.IFD.IFD1)
+    except Exception:
+        return None, fields
+
+    thumbnail = None
+    offset, length = ifd1.get(_THUMB_OFFSET), ifd1.get(_THUMB_LENGTH)
+    if isinstance(offset, int) and isinstance(length, int) and length > 0:
+        # Offsets are relative to the TIFF header that follows "Exif\0\0"
+        tiff = segment[len(_EXIF_HEADER):]
+        candidate = tiff[offset:offset + length]
+        if len(candidate) == length and candidate[:2] == b"\xff\xd8":
+            thumbnail = bytes(candidate)
+    return thumbnail, fields
+
+
+def _read_at_most(response: requests.Response, limit: int) -> bytes:
+    buf = bytearray()
+    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+        buf += chunk
+        if len(buf) >= limit:
+            break
+    return bytes(buf[:limit])
+
+
+def fetch_triage(
+    url: str,
+    dest: Path,
+    auth: Optional[Tuple[str, str]] = None,
+    timeout: float = 30,
+    session: Optional[requests.Session] = None,
+    head_bytes: int = TRIAGE_BYTES,
+) -> TriageResult:
+    """Fetch just the head of a remote JPEG with a Range request and pull out its EXIF thumbnail.
+
+    If the server ignores ``Range`` and answers 200 with the whole photo, the
+    body is streamed to ``dest`` instead so the transfer is not wasted.
+    """
+    getter = session if session is not None else requests
+    headers = {"Range": f"bytes=0-{head_bytes - 1}"}
+    with getter.get(url, auth=auth, timeout=timeout, stream=True, headers=headers) as response:
+        response.raise_for_status()
+        if response.status_code != 206:
+            transferred = stream_to_file(response, dest)
+            with open(dest, "rb") as f:
+                head = f.read(MAX_TRIAGE_BYTES)
+            thumbnail, fields = parse_exif_head(head)
+            return TriageResult(thumbnail, fields, True, transferred)
+        head = _read_at_most(response, head_bytes)
+        total = _total_length(response)
+
+    if total is not None and len(head) >= total:
+        # The whole photo fit in the range
+        write_atomic(dest, head)
+        thumbnail, fields = parse_exif_head(head)
+        return TriageResult(thumbnail, fields, True, len(head))
+
+    transferred = len(head)
+    located = _locate_exif(head)
+    if located is not None and len(head) < located[1] <= MAX_TRIAGE_BYTES:
+        # EXIF block runs past the first range; fetch just the rest of it
+        headers = {"Range": f"bytes={len(head)}-{located[1] - 1}"}
+        with getter.get(url, auth=auth, timeout=timeout, stream=True, headers=headers) as response:
+            response.raise_for_status()
+            if response.status_code == 206:
+                rest = _read_at_most(response, located[1] - len(head))
+                head += rest
+                transferred += len(rest)
+    thumbnail, fields = parse_exif_head(head)
+    return TriageResult(thumbnail, fields, False, transferred)
+
+
+def _total_length(response: requests.Response) -> Optional[int]:
+    match = _CONTENT_RANGE_RE.match(response.headers.get("Content-Range", ""))
+    if match is None or match.group(3) == "*":
+        return None
+    return int(match.group(3))
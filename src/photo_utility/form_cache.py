@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+
+# Lives next to app_settings.txt and downloaded_photos/ in the working directory
+DEFAULT_CACHE_PATH = Path("form_cache.sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS forms (
+    form_id TEXT PRIMARY KEY,
+    domain TEXT NOT NULL,
+    app_id TEXT NOT NULL,
+    received_on TEXT NOT NULL,
+    payload BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS forms_by_app ON forms (domain, app_id, received_on);
+CREATE TABLE IF NOT EXISTS watermarks (
+    domain TEXT NOT NULL,
+    app_id TEXT NOT NULL,
+    synced_from TEXT NOT NULL,
+    received_on TEXT NOT NULL,
+    PRIMARY KEY (domain, app_id)
+);
+"""
+
+
+def _pack(form: dict) -> bytes:
+    return zlib.compress(json.dumps(form, separators=(",", ":")).encode("utf-8"))
+
+
+def _unpack(blob: bytes) -> dict:
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class FormCache:
+    """On-disk store of fetched forms plus a received_on high-water mark per domain/app.
+
+    Forms are stored as zlib-compressed JSON in SQLite, normally the projected
+    ``FormRecord`` form rather than the raw API object. The watermark is the
+    newest ``received_on`` we have seen for a domain/app, and ``synced_from`` is
+    the start date the sync began at, so a later run asking for an earlier
+    start date knows the cache does not cover it.
+    """
+
+    def __init__(self, path: Path = DEFAULT_CACHE_PATH) -> None:
+        self.path = Path(path)
+        # The per-domain fetch workers share one cache; the lock serialises
+        # access to the connection across threads.
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "FormCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def watermark(self, domain: str, app_id: str, date_start: str) -> Optional[str]:
+        """Newest cached received_on for domain/app, if the cache covers ``date_start`` onward."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT synced_from, received_on FROM watermarks WHERE domain = ? AND app_id = ?",
+                (domain, app_id),
+            ).fetchone()
+        if row is None:
+            return None
+        synced_from, received_on = row
+        if date_start and date_start < synced_from:
+            # Asked for older forms than we ever synced; start over from date_start
+            return None
+        return received_on
+
+    def merge(self, domain: str, app_id: str, forms: Iterable[dict], date_start: str) -> int:
+        """Upsert ``forms`` and advance the watermark. Returns the number of forms stored."""
+        count = 0
+        newest = None
+        with self._lock, self._conn:
+            for form in forms:
+                form_id = form.get("id")
+                received_on = form.get("received_on") or ""
+                if not form_id:
+                    continue
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO forms (form_id, domain, app_id, received_on, payload) VALUES (?, ?, ?, ?, ?)",
+                    (form_id, domain, app_id, received_on, _pack(form)),
+                )
+                count += 1
+                if newest is None or received_on > newest:
+                    newest = received_on
+            row = self._conn.execute(
+                "SELECT synced_from, received_on FROM watermarks WHERE domain = ? AND app_id = ?",
+                (domain, app_id),
+            ).fetchone()
+            synced_from = date_start
+            if row is not None and not (date_start and date_start < row[0]):
+                synced_from = row[0]
+                if newest is None or row[1] > newest:
+                    newest = row[1]
+            if newest is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO watermarks (domain, app_id, synced_from, received_on) VALUES (?, ?, ?, ?)",
+                    (domain, app_id, synced_from, newest),
+                )
+        return count
+
+    def forms(self, domain: str, app_id: str, date_start: str, date_end: str, limit: int) -> List[dict]:
+        """Return up to ``limit`` cached forms in [date_start, date_end], newest first."""
+        query = "SELECT payload FROM forms WHERE domain = ? AND app_id = ?"
+        args: list = [domain, app_id]
+        if date_start:
+            query += " AND received_on >= ?"
+            args.append(date_start)
+        if date_end:
+            # Dates are YYYY-MM-DD and received_on is ISO 8601, so compare the date prefix
+            query += " AND substr(received_on, 1, 10) <= ?"
+            args.append(date_end)
+        query += " ORDER BY received_on DESC LIMIT ?"
+        args.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, args).fetchall()
+        return [_unpack(blob) for (blob,) in rows]
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+
+PHOTO_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp')
+
+# Forms requested per List Forms API page; only one raw page is held in memory at a time
+API_PAGE_SIZE = 100
+
+
+def is_photo_attachment(name: str) -> bool:
+    return name.lower().endswith(PHOTO_EXTENSIONS)
+
+
+def _child_path(path: str, key, is_repeat: bool) -> str:
+    if is_repeat:
+        return f"{path}[{key}]"
+    return f"{path}/{key}" if path else str(key)
+
+
+def index_attachments(form_data: dict, attachment_names: Iterable[str]) -> Dict[str, str]:
+    """Map each attachment filename to the path of the question that holds it.
+
+    Walks the form JSON once, descending into groups (dicts) and repeat groups
+    (lists), and only records exact value matches. Paths are ``/``-separated
+    with repeat indexes in brackets, e.g. ``household/members[2]/photo``. If a
+    filename appears under more than one question, the first one found is kept.
+    """
+    wanted = set(attachment_names)
+    index: Dict[str, str] = {}
+    stack: list = [(form_data, "")]
+    while stack and len(index) < len(wanted):
+        node, path = stack.pop()
+        is_repeat = isinstance(node, list)
+        for key, value in (enumerate(node) if is_repeat else node.items()):
+            # Paths are only built for containers and matches, not for every leaf
+            if isinstance(value, str):
+                if value in wanted and value not in index:
+                    index[value] = _child_path(path, key, is_repeat)
+            elif isinstance(value, (dict, list)):
+                stack.append((value, _child_path(path, key, is_repeat)))
+    return index
+
+
+def split_question_path(path: str) -> Tuple[str, Optional[int]]:
+    """Return the question id (last path segment) and the innermost repeat index, if any."""
+    segments = path.split("/")
+    question = segments[-1]
+    repeat_index = None
+    for segment in reversed(segments[:-1]):
+        if segment.endswith("]") and "[" in segment:
+            repeat_index = int(segment[segment.rindex("[") + 1:-1])
+            break
+    if question.endswith("]") and "[" in question:
+        # A repeat of bare values, e.g. photos[1]
+        repeat_index = int(question[question.rindex("[") + 1:-1])
+        question = question[:question.rindex("[")]
+    return question, repeat_index
+
+
+def fallback_question_name(attachment_name: str) -> str:
+    # Use a cleaned version of the attachment name when no question holds it
+    return attachment_name.replace('.jpg', '').replace('.jpeg', '').replace('.png', '')
+
+
+@dataclass(frozen=True)
+class AttachmentRecord:
+    name: str
+    download_url: str
+    question_path: Optional[str]
+
+
+@dataclass(frozen=True)
+class FormRecord:
+    """The parts of a List Forms API object the photo pipeline needs.
+
+    Raw form objects carry the full ``form`` payload; projecting them to this
+    record as each page is parsed lets the payload be dropped immediately.
+    Only photo attachments are kept, with their question paths resolved.
+    """
+
+    id: str
+    domain: str
+    app_id: str
+    user_id: str
+    received_on: str
+    attachment_count: int
+    attachments: Tuple[AttachmentRecord, ...]
+
+    def to_json(self) -> dict:
+        return {
+            "id": self.id,
+            "domain": self.domain,
+            "app_id": self.app_id,
+            "user_id": self.user_id,
+            "received_on": self.received_on,
+            "attachment_count": self.attachment_count,
+            "attachments": [[a.name, a.download_url, a.question_path] for a in self.attachments],
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "FormRecord":
+        if "form" in data:
+            # Raw API object, e.g. cached before records were projected
+            return project_form(data)
+        return cls(
+            id=data["id"],
+            domain=data.get("domain", "unknown"),
+            app_id=data.get("app_id", ""),
+            user_id=data.get("user_id", "unknown"),
+            received_on=data.get("received_on", ""),
+            attachment_count=data.get("attachment_count", 0),
+            attachments=tuple(AttachmentRecord(*a) for a in data.get("attachments", [])),
+        )
+
+
+def project_form(form: dict) -> FormRecord:
+    """Reduce a raw List Forms API object to a FormRecord."""
+    form_data = form.get('form', {})
+    # User ID is in the form.meta section
+    meta = form_data.get('meta', {}) if isinstance(form_data, dict) else {}
+    attachments = form.get('attachments') or {}
+    photo_names = [name for name in attachments if is_photo_attachment(name)]
+    question_paths = index_attachments(form_data, photo_names) if photo_names and isinstance(form_data, dict) else {}
+    records = []
+    for name in photo_names:
+        info = attachments[name] if isinstance(attachments[name], dict) else {}
+        # Fall back to the alternative URL structure
+        download_url = info.get('download_url') or info.get('url') or ""
+        records.append(AttachmentRecord(name, download_url, question_paths.get(name)))
+    return FormRecord(
+        id=form.get('id', 'unknown'),
+        domain=form.get('domain', 'unknown'),
+        app_id=form.get('app_id', ''),
+        user_id=meta.get('userID', 'unknown'),
+        received_on=form.get('received_on', ''),
+        attachment_count=len(attachments),
+        attachments=tuple(records),
+    )
+
+
+def attachment_filename(record: FormRecord, attachment: AttachmentRecord) -> str:
+    """CommCare-style filename for a downloaded attachment, parseable by ``parse_commcare_filename``."""
+    # Question name is the last segment of the indexed question path
+    json_block = "api_photo"
+    if attachment.question_path:
+        question_name, repeat_index = split_question_path(attachment.question_path)
+        if repeat_index is not None:
+            # Keep photos from different repeat entries from sharing a filename
+            json_block = f"api_photo_r{repeat_index}"
+    else:
+        question_name = fallback_question_name(attachment.name)
+
+    # Determine file extension from original attachment name
+    file_ext = '.jpg'  # Default to .jpg
+    for ext in ('.jpeg', '.png', '.gif', '.bmp'):
+        if attachment.name.lower().endswith(ext):
+            file_ext = ext
+            break
+    return f"{json_block}-{question_name}-{record.user_id}-form_{record.id}{file_ext}"
@@ -4,23 +4,49 @@ import customtkinter as ctk
 import tkinter as tk
 from tkinter import filedialog, messagebox
 from pathlib import Path
-from typing import List
-import random
-from PIL import Image, ImageTk
+from typing import TYPE_CHECKING, Dict, List, Optional
 import csv
+import io
 from datetime import datetime
 import webbrowser
-import requests
-import json
-
-from .scanner import scan_directory_for_photos, group_by_question_id, group_by_form_id
-
-
-def debug_print(message: str) -> None:
-    """Print debug message if debug mode is enabled"""
-    import os
-    if os.environ.get('PHOTO_REVIEW_DEBUG') == '1':
-        print(f"DEBUG: {message}")
+import random
+import bisect
+
+# requests and Pillow are imported on first use (API fetch, first rendered
+# photo) so the config window comes up without them
+from . import profiling
+from .bundle import BUNDLE_SUFFIX, ReviewBundle, is_review_bundle
+from .compaction import COMPACT_MAX_EDGE, COMPACT_QUALITY
+from .debug import debug_print
+from .image_cache import DEFAULT_IMAGE_CACHE_BYTES, DecodedImageCache
+from .imaging import load_pillow
+from .pipeline import BackgroundTask, stream_sampled_visits
+from .reviewed import ReviewedIndex, drop_reviewed
+from .scheduler import ThroughputReport
+from .scanner import load_scan_manifest, scan_directory_batches, group_by_question_id, group_by_form_id
+from .session import configured_known_bad, index_remote_photos, insert_known_bad, known_bad_slots, load_session_manifest, new_download_dir, sample_visits, target_photo_count
+from .thumbnails import REVIEW_WIDTH, load_review_image
+from .tiles import DEFAULT_TILE_CACHE_BYTES, TilePyramid
+from .validation import drop_quarantined, validate_photos
+
+if TYPE_CHECKING:
+    from .decode_service import DecodeService
+    from .exif_triage import TriageResult
+    from .startup import StartupProfile
+
+
+# Photos per scan update posted to the Tk thread
+SCAN_BATCH_SIZE = 500
+# Visits after the one on screen whose photos the decode service prepares ahead
+PREFETCH_VISITS = 3
+# Zoom steps past 1:1 in the zoom window, each doubling, for reading small print
+ZOOM_MAGNIFY_STEPS = 2
+# Reviewer recorded for visits the quality pre-screen put in a bucket
+AUTO_REVIEWER = "auto-prescreen"
+# Pre-screen and clustering need the photos before review starts, so they do not apply to API downloads
+PRESCREEN_TEXT = "Pre-screen photos (flag dark, blank and blurry ones)"
+COLLAPSE_TEXT = "Collapse near-identical visits (one decision for the whole cluster)"
+LOCAL_ONLY_SUFFIX = " - not available for API downloads"
 
 
 class App(ctk.CTk):
@@ -38,14 +64,22 @@ class App(ctk.CTk):
         self.include_known_bad_var = ctk.BooleanVar(value=False)
         self.known_bad_dir_var = ctk.StringVar()
         self.known_bad_count_var = ctk.StringVar(value="")  # Number of bad photos to insert
-        self.path_mode_var = ctk.StringVar()  # local or api - no default value
+        self.path_mode_var = ctk.StringVar()  # local, api or bundle - no default value
         self.reviewer_name_var = ctk.StringVar()
+        self.bundle_var = ctk.StringVar()  # Review bundle file
         
         # API-specific variables
         self.api_file_var = ctk.StringVar()
         self.date_start_var = ctk.StringVar(value="01/01/24")
         self.date_end_var = ctk.StringVar()
         self.api_limit_var = ctk.StringVar(value="20")
+        self.api_headroom_var = ctk.StringVar(value="10")  # Extra sampled visits to download in case some fail
+        self.api_triage_var = ctk.BooleanVar(value=False)  # Fetch EXIF thumbnails only; full photos on request
+        self.api_compact_var = ctk.BooleanVar(value=False)  # Re-encode downloads to a bounded size
+        self.prescreen_var = ctk.BooleanVar(value=False)  # Measure photo quality before review (local photos)
+        self.auto_bucket_var = ctk.StringVar()  # Bucket for visits whose photos are all flagged; blank to only flag
+        self.collapse_var = ctk.BooleanVar(value=False)  # Review near-identical visits once (local photos)
+        self.skip_reviewed_var = ctk.BooleanVar(value=True)  # Leave out forms reviewed in earlier sessions
         
         # Set today's date as default for end date in MM/DD/YY format
         from datetime import datetime
@@ -60,16 +94,45 @@ class App(ctk.CTk):
         self.session_config = None
         self.session_visits: List[dict] = []
         self.results: List[dict] = []
+        # Visit index -> its rows in self.results (one per cluster member), so a corrected decision replaces the earlier one
+        self._result_rows: Dict[int, List[int]] = {}
         self._current_index = 0
+        # Visits of this session put in a bucket by the quality pre-screen
+        self._auto_bucketed = 0
+        # Forms reviewed in earlier sessions; read when first needed
+        self._reviewed: Optional[ReviewedIndex] = None
         self._last_selected_questions: List[str] = []
         self._selected_questions: List[str] = []
+        # API mode: indexed photo path -> (FormRecord, AttachmentRecord), downloaded after sampling
+        self._remote_photos: dict = {}
+        self._api_auth = ("", "")
+        self._api_stats: Optional[ThroughputReport] = None
+        # Triage mode: photo path -> TriageResult for photos whose full image is not downloaded yet
+        self._triage: dict = {}
+        # Fetch (config screen) and sampled-visit download (review screen) workers
+        self._task: Optional[BackgroundTask] = None
+        self._download_task: Optional[BackgroundTask] = None
+        self._download_progress = (0, 0)
+        self._kb_slots: dict = {}
+        self._session_expected = 0
+        self._waiting_for_visit = False
+        # Local mode: the scanned folder, its photos that failed the integrity check,
+        # and the check itself, which runs alongside configuration without blocking it
+        self._scan_root: Optional[Path] = None
+        self._quarantined: dict = {}
+        self._validation_task: Optional[BackgroundTask] = None
+        # Bundle mode: the open review bundle that photos are read from
+        self._bundle: Optional[ReviewBundle] = None
+        # Decodes upcoming photos in worker processes; None decodes on the Tk thread
+        self._decoder: Optional[DecodeService] = None
+        # Decoded photos of recently viewed visits, for moving back and forth without decoding again
+        self._image_cache = DecodedImageCache(DEFAULT_IMAGE_CACHE_BYTES)
+        # Zoom window tiles, shared by every photo zoomed into during the session
+        self._tile_cache = DecodedImageCache(DEFAULT_TILE_CACHE_BYTES)
         
         # Load saved settings
         self._load_settings()
         
-        # Initially hide API controls and show local directory controls
-        self.api_controls_frame.pack_forget()
-        
         # Initialize question options
         self.question_options = []
 
@@ -92,11 +155,19 @@ class App(ctk.CTk):
         ctk.CTkLabel(mode_row, text="Data Source:").pack(side="left")
         ctk.CTkRadioButton(mode_row, text="Local directory", variable=self.path_mode_var, value="local", command=self._on_data_source_change).pack(side="left", padx=(6, 0))
         ctk.CTkRadioButton(mode_row, text="CommCareHQ API", variable=self.path_mode_var, value="api", command=self._on_data_source_change).pack(side="left", padx=(6, 0))
+        ctk.CTkRadioButton(mode_row, text="Review bundle", variable=self.path_mode_var, value="bundle", command=self._on_data_source_change).pack(side="left", padx=(6, 0))
 
         # Status text below data source
         self.status_label = ctk.CTkLabel(frm, text="Select a directory and click 'Check Photo Data'", text_color="gray")
         self.status_label.pack(anchor="w", pady=(0, 8))
 
+        # Background task progress (shown while forms are being fetched)
+        self.task_frame = ctk.CTkFrame(frm)
+        self.task_label = ctk.CTkLabel(self.task_frame, text="")
+        self.task_label.pack(side="left")
+        self.task_cancel_btn = ctk.CTkButton(self.task_frame, text="Cancel", command=self._cancel_task, width=80)
+        self.task_cancel_btn.pack(side="left", padx=6)
+
         # Data source controls container
         self.data_source_frame = ctk.CTkFrame(frm)
         # Don't pack initially - will be shown when radio button is selected
@@ -109,33 +180,15 @@ class App(ctk.CTk):
         ctk.CTkButton(self.local_dir_frame, text="Browse", command=self._browse_dir, width=80).pack(side="left", padx=6)
         ctk.CTkButton(self.local_dir_frame, text="Check Photo Data", command=self._get_data, width=120).pack(side="left", padx=6)
 
-        # API controls (initially hidden)
-        self.api_controls_frame = ctk.CTkFrame(self.data_source_frame)
-        
-        # Date range
-        date_row = ctk.CTkFrame(self.api_controls_frame)
-        date_row.pack(fill="x", pady=(0, 8))
-        ctk.CTkLabel(date_row, text="Start Date (MM/DD/YY):").pack(side="left")
-        self.start_date_entry = ctk.CTkEntry(date_row, textvariable=self.date_start_var, width=120, placeholder_text="01/01/24")
-        self.start_date_entry.pack(side="left", padx=(6, 12))
-        ctk.CTkLabel(date_row, text="End Date (MM/DD/YY):").pack(side="left")
-        self.end_date_entry = ctk.CTkEntry(date_row, textvariable=self.date_end_var, width=120, placeholder_text="12/31/25")
-        self.end_date_entry.pack(side="left", padx=(6, 0))
-        
-        # Number of forms to download
-        limit_row = ctk.CTkFrame(self.api_controls_frame)
-        limit_row.pack(fill="x", pady=(0, 8))
-        ctk.CTkLabel(limit_row, text="Number of forms to download per domain:").pack(side="left")
-        ctk.CTkEntry(limit_row, textvariable=self.api_limit_var, width=80).pack(side="left", padx=(6, 0))
-        ctk.CTkLabel(limit_row, text="Max 1000 forms. Download from HQ exporter if you want more", text_color="gray").pack(side="left", padx=(6, 0))
-        
-        # domain/app pairs file
-        api_file_row = ctk.CTkFrame(self.api_controls_frame)
-        api_file_row.pack(fill="x", pady=(0, 8))
-        ctk.CTkLabel(api_file_row, text="Domain/app pairs file:").pack(side="left")
-        ctk.CTkEntry(api_file_row, textvariable=self.api_file_var, width=400).pack(side="left", padx=6)
-        ctk.CTkButton(api_file_row, text="Browse", command=self._browse_api_file, width=80).pack(side="left", padx=6)
-        ctk.CTkButton(api_file_row, text="Check Photo Data", command=self._get_data, width=120).pack(side="left", padx=6)
+        # Review bundle controls; a bundle is a prepared session, so it opens straight into review
+        self.bundle_frame = ctk.CTkFrame(self.data_source_frame)
+        ctk.CTkLabel(self.bundle_frame, text="Review bundle:").pack(side="left")
+        ctk.CTkEntry(self.bundle_frame, textvariable=self.bundle_var, width=400).pack(side="left", padx=6)
+        ctk.CTkButton(self.bundle_frame, text="Browse", command=self._browse_bundle, width=80).pack(side="left", padx=6)
+        ctk.CTkButton(self.bundle_frame, text="Open Bundle", command=lambda: self.open_review_bundle(self.bundle_var.get().strip()), width=120).pack(side="left", padx=6)
+
+        # API controls are built the first time "CommCareHQ API" is chosen
+        self.api_controls_frame = None
 
         # Two-column layout
         self.columns_frame = ctk.CTkFrame(frm)
@@ -152,6 +205,8 @@ class App(ctk.CTk):
         self.photo_filter_frame = ctk.CTkScrollableFrame(left_column, height=200)
         self.photo_filter_frame.pack(fill="both", expand=True, padx=8, pady=(0, 8))
         self.question_checkboxes = {}
+        self._question_widgets = {}
+        self._question_counts = {}
         
         # Right column - Other configuration
         right_column = ctk.CTkFrame(self.columns_frame)
@@ -197,11 +252,74 @@ class App(ctk.CTk):
         self.row7_kb.pack_forget()
         self.row8_kb.pack_forget()
 
+        # Quality pre-screen
+        prescreen_row = ctk.CTkFrame(right_column)
+        prescreen_row.pack(fill="x", pady=(8, 0))
+        self.prescreen_check = ctk.CTkCheckBox(prescreen_row, text=PRESCREEN_TEXT, variable=self.prescreen_var)
+        self.prescreen_check.pack(side="left")
+        auto_row = ctk.CTkFrame(right_column)
+        auto_row.pack(fill="x", pady=(4, 8))
+        ctk.CTkLabel(auto_row, text="Auto-bucket visits with only flagged photos as (blank: only flag):").pack(side="left")
+        self.auto_bucket_entry = ctk.CTkEntry(auto_row, textvariable=self.auto_bucket_var, width=120)
+        self.auto_bucket_entry.pack(side="left", padx=6)
+        collapse_row = ctk.CTkFrame(right_column)
+        collapse_row.pack(fill="x", pady=(0, 8))
+        self.collapse_check = ctk.CTkCheckBox(collapse_row, text=COLLAPSE_TEXT, variable=self.collapse_var)
+        self.collapse_check.pack(side="left")
+        skip_row = ctk.CTkFrame(right_column)
+        skip_row.pack(fill="x", pady=(0, 8))
+        ctk.CTkCheckBox(skip_row, text="Skip forms reviewed in earlier sessions (untick to review them again)", variable=self.skip_reviewed_var).pack(side="left")
+
         # Start Review button (separate from columns frame)
         self.start_review_frame = ctk.CTkFrame(frm)
         # Don't pack initially - will be shown when data source is selected
         ctk.CTkButton(self.start_review_frame, text="Start Review", command=self._build_set, width=120).pack(side="left")
 
+    def _ensure_api_controls(self) -> ctk.CTkFrame:
+        """Build the API controls on first use and return their frame"""
+        if self.api_controls_frame is not None:
+            return self.api_controls_frame
+        self.api_controls_frame = ctk.CTkFrame(self.data_source_frame)
+
+        # Date range
+        date_row = ctk.CTkFrame(self.api_controls_frame)
+        date_row.pack(fill="x", pady=(0, 8))
+        ctk.CTkLabel(date_row, text="Start Date (MM/DD/YY):").pack(side="left")
+        self.start_date_entry = ctk.CTkEntry(date_row, textvariable=self.date_start_var, width=120, placeholder_text="01/01/24")
+        self.start_date_entry.pack(side="left", padx=(6, 12))
+        ctk.CTkLabel(date_row, text="End Date (MM/DD/YY):").pack(side="left")
+        self.end_date_entry = ctk.CTkEntry(date_row, textvariable=self.date_end_var, width=120, placeholder_text="12/31/25")
+        self.end_date_entry.pack(side="left", padx=(6, 0))
+        
+        # Number of forms to download
+        limit_row = ctk.CTkFrame(self.api_controls_frame)
+        limit_row.pack(fill="x", pady=(0, 8))
+        ctk.CTkLabel(limit_row, text="Number of forms to download per domain:").pack(side="left")
+        ctk.CTkEntry(limit_row, textvariable=self.api_limit_var, width=80).pack(side="left", padx=(6, 0))
+        ctk.CTkLabel(limit_row, text="Max 1000 forms. Download from HQ exporter if you want more", text_color="gray").pack(side="left", padx=(6, 0))
+        
+        # Headroom for sampled downloads
+        headroom_row = ctk.CTkFrame(self.api_controls_frame)
+        headroom_row.pack(fill="x", pady=(0, 8))
+        ctk.CTkLabel(headroom_row, text="Extra sampled visits to download (%):").pack(side="left")
+        ctk.CTkEntry(headroom_row, textvariable=self.api_headroom_var, width=80).pack(side="left", padx=(6, 0))
+        ctk.CTkLabel(headroom_row, text="Only photos of sampled visits are downloaded; spares replace failed downloads", text_color="gray").pack(side="left", padx=(6, 0))
+        
+        # Thumbnail triage
+        triage_row = ctk.CTkFrame(self.api_controls_frame)
+        triage_row.pack(fill="x", pady=(0, 8))
+        ctk.CTkCheckBox(triage_row, text="Triage mode: fetch only embedded EXIF thumbnails (full photos on request)", variable=self.api_triage_var).pack(side="left")
+        ctk.CTkCheckBox(triage_row, text=f"Compact downloads (max {COMPACT_MAX_EDGE}px, quality {COMPACT_QUALITY})", variable=self.api_compact_var).pack(side="left", padx=(12, 0))
+        
+        # domain/app pairs file
+        api_file_row = ctk.CTkFrame(self.api_controls_frame)
+        api_file_row.pack(fill="x", pady=(0, 8))
+        ctk.CTkLabel(api_file_row, text="Domain/app pairs file:").pack(side="left")
+        ctk.CTkEntry(api_file_row, textvariable=self.api_file_var, width=400).pack(side="left", padx=6)
+        ctk.CTkButton(api_file_row, text="Browse", command=self._browse_api_file, width=80).pack(side="left", padx=6)
+        ctk.CTkButton(api_file_row, text="Check Photo Data", command=self._get_data, width=120).pack(side="left", padx=6)
+        return self.api_controls_frame
+
     def _browse_dir(self) -> None:
         # Use last directory as default
         initial_dir = self.dir_var.get().strip()
@@ -225,6 +343,9 @@ class App(ctk.CTk):
             self.dir_var.set(path)
 
     def _get_data(self) -> None:
+        if self._task is not None:
+            # A fetch is already running; it has its own Cancel button
+            return
         mode = self.path_mode_var.get()
         debug_print(f"Data source mode: {mode}")
         
@@ -243,26 +364,122 @@ class App(ctk.CTk):
                 return
 
             debug_print(f"Scanning directory: {root}")
-            valid, invalid = scan_directory_for_photos(root)
-            self.valid_metas = valid
-            self.invalid_paths = invalid
-            debug_print(f"Found {len(valid)} valid photos, {len(invalid)} invalid paths")
+            self._start_local_scan(root)
         elif mode == "api":
             # Handle API data
             self._get_api_data()
-            return
 
-        if invalid:
+    def _start_local_scan(self, root: Path) -> None:
+        """Scan ``root`` on a worker thread, filling in the question filter batch by batch"""
+        self.valid_metas = []
+        self.invalid_paths = []
+        self.question_options = []
+        self._scan_root = root
+        self._quarantined = {}
+        self._cancel_validation()
+        self._clear_question_menu()
+        self.status_label.configure(text="Scanning...", text_color="gray")
+
+        def work(task: BackgroundTask) -> None:
+            # A scan manifest written by the batch CLI makes this instant
+            cached = load_scan_manifest(root)
+            if cached is not None:
+                valid, invalid = cached
+                batches = [(valid[i:i + SCAN_BATCH_SIZE], []) for i in range(0, len(valid), SCAN_BATCH_SIZE)]
+                batches.append(([], invalid))
+            else:
+                batches = scan_directory_batches(root, SCAN_BATCH_SIZE)
+            for batch in batches:
+                if task.cancelled:
+                    break
+                task.post("batch", batch)
+
+        self._start_config_task(work, f"Scanning {root}...", {
+            "batch": lambda batch: self._add_scan_batch(*batch),
+            "done": lambda _: self._finish_local_scan(),
+            "cancelled": lambda _: self._on_scan_cancelled(),
+            "error": lambda error: messagebox.showerror("Scan error", f"Failed to scan directory: {error[0]}"),
+        })
+
+    def _add_scan_batch(self, valid: list, invalid: list) -> None:
+        self.valid_metas.extend(valid)
+        self.invalid_paths.extend(invalid)
+        changed = set()
+        for meta in valid:
+            self._question_counts[meta.question_id] = self._question_counts.get(meta.question_id, 0) + 1
+            changed.add(meta.question_id)
+        for opt in sorted(changed):
+            self._show_question_option(opt)
+        self.task_label.configure(text=f"Scanning... {len(self.valid_metas)} photos found")
+        self._on_question_select()
+
+    def _on_scan_cancelled(self) -> None:
+        # A partial scan would bias the sample, so drop it
+        self._clear_question_menu()
+        self.question_options = []
+        self.valid_metas = []
+        self.invalid_paths = []
+        self._update_percent_count()
+        self.status_label.configure(text="Scan cancelled", text_color="gray")
+
+    def _finish_local_scan(self) -> None:
+        debug_print(f"Found {len(self.valid_metas)} valid photos, {len(self.invalid_paths)} invalid paths")
+        if self.invalid_paths:
             self._show_warning_status("Some files do not match required format. Please download multimedia from CommCareHQ (per instructions).")
         else:
             self._show_success_status("All files match expected naming format.")
+        self._update_percent_count()
+        if self.valid_metas and self._scan_root is not None:
+            self._start_photo_validation(self._scan_root)
+
+    def _start_photo_validation(self, root: Path) -> None:
+        """Check the scanned photos decode, in worker processes, and keep unreadable ones out of sampling.
+
+        Review can start while the check runs; photos it quarantines are left
+        out of any sample drawn after it finishes.
+        """
+        photos = [meta.filepath for meta in self.valid_metas]
+
+        def work(task: BackgroundTask) -> dict:
+            quarantined, checked = validate_photos(root, photos, cancel=task.cancel_event)
+            debug_print(f"Checked {checked} photos, {len(quarantined)} quarantined")
+            return quarantined
+
+        task = BackgroundTask(work, name="photo-validation")
+        self._validation_task = task
+        task.start()
+        self._poll_task(task, {
+            "done": lambda quarantined: self._apply_quarantine(task, quarantined),
+            "error": lambda error: self._on_validation_error(task, error),
+        })
+
+    def _cancel_validation(self) -> None:
+        if self._validation_task is not None:
+            self._validation_task.cancel()
+            self._validation_task = None
+
+    def _on_validation_error(self, task: BackgroundTask, error: tuple) -> None:
+        if task is not self._validation_task:
+            return
+        self._validation_task = None
+        self._show_warning_status(f"Could not check photos: {error[0]}")
 
-        groups = group_by_question_id(valid)
-        self.question_options = sorted(groups.keys())
+    def _apply_quarantine(self, task: BackgroundTask, quarantined: dict) -> None:
+        if task is not self._validation_task:
+            # Superseded by a new scan, or the data source changed
+            return
+        self._validation_task = None
+        self._quarantined = quarantined
+        if not quarantined:
+            return
+        for path, reason in quarantined.items():
+            debug_print(f"Quarantined {path.name}: {reason}")
+        self.valid_metas = drop_quarantined(self.valid_metas, set(quarantined))
         self._refresh_question_menu()
-
-        total = len(valid)
-        self._update_percent_count()
+        self.status_label.configure(
+            text=f"{len(self.valid_metas)} photos found; {len(quarantined)} unreadable photos left out of review",
+            text_color="orange",
+        )
 
     def _show_warning_status(self, message: str) -> None:
         self.status_label.configure(text=f"⚠️ {message}", text_color="red")
@@ -294,6 +511,9 @@ class App(ctk.CTk):
             self.known_bad_dir_var.set(path)
 
     def _build_set(self) -> None:
+        if self._task is not None:
+            messagebox.showwarning("Loading", "Photo data is still loading. Wait for it to finish or cancel it.")
+            return
         if not self.valid_metas:
             messagebox.showwarning("No data", "Load data first with 'Check Photo Data'.")
             return
@@ -344,9 +564,16 @@ class App(ctk.CTk):
                 messagebox.showwarning("Known Bad Count", "Enter a valid number for bad photos to insert.")
                 return
 
+        # Greyed out in API mode; photos are only downloaded once the review has started
+        local_photos = self.path_mode_var.get() != "api"
+        prescreen = local_photos and self.prescreen_var.get()
+        auto_bucket = self.auto_bucket_var.get().strip() if prescreen else ""
+        if auto_bucket and auto_bucket not in buckets:
+            messagebox.showwarning("Pre-screen", f"Auto-bucket '{auto_bucket}' is not one of the review buckets.")
+            return
+
         # Compute filtered photos count for confirmation
-        filtered = [m for m in self.valid_metas if m.question_id in selected_questions]
-        target_count = max(1, int(round(len(filtered) * (percent / 100.0)))) if filtered else 0
+        target_count = target_photo_count(self.valid_metas, selected_questions, percent)
 
         # Store session config
         self.session_config = {
@@ -357,6 +584,10 @@ class App(ctk.CTk):
             "known_bad_dir": str(kb_dir) if kb_dir else None,
             "known_bad_count": self.known_bad_count_var.get().strip(),
             "target_count": target_count,
+            "prescreen": prescreen,
+            "auto_bucket": auto_bucket or None,
+            "collapse_clusters": local_photos and self.collapse_var.get(),
+            "skip_reviewed": self.skip_reviewed_var.get(),
         }
         # Save settings for next time
         self._save_settings()
@@ -364,36 +595,59 @@ class App(ctk.CTk):
         # Build session now and proceed to review UI
         self._create_session_and_start_review()
 
-    def _refresh_question_menu(self) -> None:
+    def _clear_question_menu(self) -> None:
         # Clear existing checkboxes
         for widget in self.photo_filter_frame.winfo_children():
             widget.destroy()
         self.question_checkboxes.clear()
+        self._question_widgets.clear()
+        self._question_counts = {}
+
+    def _refresh_question_menu(self) -> None:
+        options = list(self.question_options)
+        self._clear_question_menu()
+        self.question_options = []
         
         # Get photo counts for each question
         groups = group_by_question_id(self.valid_metas)
+        self._question_counts = {opt: len(metas) for opt, metas in groups.items()}
         
         # Create checkboxes for each question option
-        for opt in self.question_options:
-            count = len(groups.get(opt, []))
-            var = ctk.BooleanVar(value=True)  # Default to selected
-            checkbox = ctk.CTkCheckBox(
-                self.photo_filter_frame, 
-                text=f"{opt} ({count} photos)",
-                variable=var,
-                command=self._on_question_select
-            )
-            checkbox.pack(anchor="w", pady=2)
-            self.question_checkboxes[opt] = var
+        for opt in options:
+            self._show_question_option(opt)
         
         # Update selection state
         self._on_question_select()
 
+    def _show_question_option(self, opt: str) -> None:
+        """Add a checkbox for ``opt`` in sorted position, or update its photo count"""
+        count = self._question_counts.get(opt, 0)
+        checkbox = self._question_widgets.get(opt)
+        if checkbox is not None:
+            checkbox.configure(text=f"{opt} ({count} photos)")
+            return
+        var = ctk.BooleanVar(value=True)  # Default to selected
+        checkbox = ctk.CTkCheckBox(
+            self.photo_filter_frame, 
+            text=f"{opt} ({count} photos)",
+            variable=var,
+            command=self._on_question_select
+        )
+        position = bisect.bisect(self.question_options, opt)
+        if position < len(self.question_options):
+            checkbox.pack(anchor="w", pady=2, before=self._question_widgets[self.question_options[position]])
+        else:
+            checkbox.pack(anchor="w", pady=2)
+        self.question_options.insert(position, opt)
+        self.question_checkboxes[opt] = var
+        self._question_widgets[opt] = checkbox
+
     def _on_question_select(self, event=None) -> None:
         # Get selected questions from checkboxes
         self._selected_questions = []
-        for opt, var in self.question_checkboxes.items():
-            if var.get():
+        for opt in self.question_options:
+            var = self.question_checkboxes.get(opt)
+            if var is not None and var.get():
                 self._selected_questions.append(opt)
         self._update_percent_count()
 
@@ -408,73 +662,268 @@ class App(ctk.CTk):
         except (ValueError, TypeError):
             percent = 0.0
         selected = self._selected_questions if self._selected_questions else self.question_options
-        filtered = [m for m in self.valid_metas if m.question_id in selected]
-        count = int(round(len(filtered) * (percent / 100.0))) if filtered and percent > 0 else 0
+        # Per-question counts keep this cheap while a large scan is still adding photos
+        filtered = sum(self._question_counts.get(q, 0) for q in selected)
+        count = int(round(filtered * (percent / 100.0))) if filtered and percent > 0 else 0
         self.percent_count_label.configure(text=f"(~{count} photos)")
 
     # ---- Review session building and UI ----
     def _create_session_and_start_review(self) -> None:
-        # Filter by selected questions
-        chosen = [m for m in self.valid_metas if m.question_id in self.session_config["question_ids"]]
-        if not chosen:
+        # Filter by selected questions, group by form_id (visit) and sample whole visits
+        if not any(m.question_id in self.session_config["question_ids"] for m in self.valid_metas):
             messagebox.showwarning("No photos", "No photos match the selected filters.")
             return
-        # Group by form_id (visit)
-        visits = {}
-        for m in chosen:
-            visits.setdefault(m.form_id, []).append(m)
-        visit_items = list(visits.items())
-        random.shuffle(visit_items)
-        # Determine how many photos we want, then include visits until we surpass
-        target_photos = self.session_config["target_count"]
-        selected_visits: List[dict] = []
-        total = 0
-        for form_id, metas in visit_items:
-            selected_visits.append({
-                "form_id": form_id,
-                "user_id": metas[0].user_id,
-                "photos": metas,
-                "is_known_bad": False,
-            })
-            total += len(metas)
-            if target_photos and total >= target_photos:
-                break
+        metas = self.valid_metas
+        if self.session_config.get("skip_reviewed"):
+            reviewed = self._reviewed_index()
+            if reviewed is not None and len(reviewed):
+                # API photos of these forms are never sampled, so never downloaded
+                metas, skipped = drop_reviewed(metas, reviewed)
+                debug_print(f"Skipped {skipped} forms reviewed in earlier sessions")
+                if not any(m.question_id in self.session_config["question_ids"] for m in metas):
+                    messagebox.showwarning("Already reviewed", "Every form matching the selected filters was reviewed in an earlier session. "
+                                           "Untick \"Skip forms reviewed in earlier sessions\" to review them again.")
+                    return
+        selected_visits, remaining = sample_visits(metas, self.session_config["question_ids"], self.session_config["target_count"])
+        # API photos are only indexed so far; fetch just the sampled visits while the review runs
+        if self.path_mode_var.get() == "api" and self._remote_photos:
+            self._start_progressive_review(selected_visits, remaining)
+            return
         # Known-bad insertion with count limit and proper randomization
-        if self.session_config.get("include_known_bad") and self.session_config.get("known_bad_dir"):
-            try:
-                kb_count = int(self.session_config.get("known_bad_count", "5"))
-            except (ValueError, TypeError):
-                kb_count = 5
-            
-            kb_dir = Path(self.session_config["known_bad_dir"])  # type: ignore[arg-type]
-            kb_paths = [p for p in kb_dir.iterdir() if p.is_file()]
-            random.shuffle(kb_paths)
-            
-            # Limit to requested count
-            kb_paths = kb_paths[:kb_count]
-            
-            if kb_paths:
-                kb_visits = [{
-                    "form_id": f"KNOWN_BAD_{i}",
-                    "user_id": "",
-                    "photos": [type("KBMeta", (), {"filepath": p, "filename": p.name, "form_id": f"KNOWN_BAD_{i}", "user_id": "", "question_id": "known_bad", "json_block": "known_bad", "extension": p.suffix.lstrip(".")})()],
-                    "is_known_bad": True,
-                } for i, p in enumerate(kb_paths)]
-                
-                # Randomly insert known-bad visits into the main list
-                all_visits = selected_visits + kb_visits
-                random.shuffle(all_visits)
-                selected_visits = all_visits
+        selected_visits = insert_known_bad(selected_visits, self.session_config)
 
         if not selected_visits:
             messagebox.showwarning("No visits", "No visits were selected for review.")
             return
+        if self.session_config.get("prescreen") or self.session_config.get("collapse_clusters"):
+            self._prepare_review(selected_visits)
+            return
+        self._begin_review(selected_visits)
+
+    def _prepare_review(self, visits: List[dict]) -> None:
+        """Pre-screen the sampled photos and/or collapse near-identical visits in worker processes, then start the review"""
+        from .clusters import collapse_similar_visits, hash_photos
+        from .quality import analyze_photos, prescreen_visits
+
+        prescreen, collapse = self.session_config.get("prescreen"), self.session_config.get("collapse_clusters")
+        # Known-bad photos are not measured; they are there to test the reviewer
+        photos = [meta.filepath for visit in visits if not visit.get("is_known_bad", False) for meta in visit["photos"]]
+        bucket = self.session_config.get("auto_bucket")
+        stage = ["Preparing review..."]
+
+        def work(task: BackgroundTask) -> List[dict]:
+            prepared = visits
+            if prescreen:
+                task.post("stage", "Pre-screening photos...")
+                signals, _measured = analyze_photos(photos, progress=task.progress, cancel=task.cancel_event)
+                prescreen_visits(prepared, signals, bucket=bucket)
+            if collapse and not task.cancelled:
+                task.post("stage", "Grouping near-identical photos...")
+                hashes, _hashed = hash_photos(photos, progress=task.progress, cancel=task.cancel_event)
+                prepared = collapse_similar_visits(prepared, hashes)
+            return prepared
+
+        def on_stage(text: str) -> None:
+            stage[0] = text
+            self.task_label.configure(text=text)
+
+        def on_progress(progress: tuple) -> None:
+            done, total = progress
+            self.task_label.configure(text=f"{stage[0]} {done}/{total}")
+
+        def on_error(error) -> None:
+            # A failed pre-screen or grouping should not block the review
+            self._show_warning_status(f"Could not prepare photos: {error[0]}")
+            self._begin_review(visits)
+
+        self._start_config_task(work, stage[0], {
+            "stage": on_stage,
+            "progress": on_progress,
+            "done": self._begin_review,
+            "error": on_error,
+        })
+
+    def _begin_review(self, visits: List[dict]) -> None:
+        """Record the visits the pre-screen put in a bucket and open the review screen for the rest"""
+        auto = [visit for visit in visits if visit.get("auto_bucket")]
+        for visit in auto:
+            self.results.extend(self._result_rows_for(visit, visit["auto_bucket"], AUTO_REVIEWER))
+        visits = [visit for visit in visits if not visit.get("auto_bucket")]
+        self._auto_bucketed = len(auto)
+        if not visits:
+            messagebox.showinfo("Pre-screen", f"All {len(auto)} visits were auto-bucketed. Choose where to save CSV results.")
+            self._export_csvs()
+            return
+        self.session_visits = visits
+        self._session_expected = len(visits)
+        self._current_index = 0
+        self._show_review_ui()
 
-        self.session_visits = selected_visits
+    def _start_progressive_review(self, selected_visits: List[dict], remaining: list) -> None:
+        """Open the review screen right away and add sampled visits as their photos finish downloading"""
+        kb_visits = configured_known_bad(self.session_config)
+        # Known-bad visits cannot be shuffled in up front, so they get fixed random positions
+        self._kb_slots = known_bad_slots(len(selected_visits), kb_visits)
+        self.session_visits = []
+        self._session_expected = len(selected_visits) + len(kb_visits)
+        self._auto_bucketed = 0
         self._current_index = 0
+        self._download_progress = (0, 0)
+
+        remote, auth, stats = self._remote_photos, self._api_auth, self._api_stats
+        headroom, triage = self._api_headroom_percent(), self.api_triage_var.get()
+        ingest = self._ingest_options()
+        task = BackgroundTask(
+            lambda t: stream_sampled_visits(t, selected_visits, remaining, remote, auth, headroom, stats, triage=triage, ingest=ingest),
+            name="photo-downloads",
+        )
+        self._download_task = task
         self._show_review_ui()
+        task.start()
+        self._poll_task(task, {
+            "visit": lambda payload: self._on_visit_ready(task, *payload),
+            "progress": lambda payload: self._on_download_progress(task, payload),
+            "done": lambda payload: self._on_downloads_finished(task, payload),
+            "error": lambda payload: self._on_downloads_finished(task, 0, payload),
+        })
+
+    def _poll_task(self, task: BackgroundTask, handlers: dict) -> None:
+        """Dispatch a background task's events on the Tk thread until it finishes"""
+        finished = False
+        for kind, payload in task.drain():
+            handler = handlers.get(kind)
+            if handler is not None:
+                handler(payload)
+            if kind in ("done", "error"):
+                finished = True
+        if not finished:
+            self.after(100, lambda: self._poll_task(task, handlers))
+
+    def _start_config_task(self, work, message: str, handlers: dict) -> None:
+        """Run ``work`` in the background with a progress line and Cancel button on the config screen"""
+        task = BackgroundTask(work)
+        self._task = task
+        self.task_label.configure(text=message)
+        self.task_cancel_btn.configure(state="normal", text="Cancel")
+        self.task_frame.pack(fill="x", pady=(0, 8), after=self.status_label)
+
+        def finishing(handler):
+            def run(payload):
+                self._task = None
+                self.task_frame.pack_forget()
+                callback = handler
+                if task.cancelled:
+                    # The reviewer gave up on this load; a "cancelled" handler may tidy up
+                    callback = handlers.get("cancelled")
+                    self.status_label.configure(text="Cancelled", text_color="gray")
+                if callback is not None:
+                    callback(payload)
+            return run
+
+        handlers = dict(handlers, done=finishing(handlers.get("done")), error=finishing(handlers.get("error")))
+        task.start()
+        self._poll_task(task, handlers)
+
+    def _cancel_task(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self.task_cancel_btn.configure(state="disabled", text="Cancelling...")
+
+    def _cancel_downloads(self) -> None:
+        if self._download_task is not None:
+            self._download_task.cancel()
+            self.cancel_downloads_btn.configure(state="disabled", text="Cancelling...")
+
+    def _on_visit_ready(self, task: BackgroundTask, visit: dict, triaged: dict) -> None:
+        if task is not self._download_task:
+            return
+        self._triage.update(triaged)
+        while len(self.session_visits) in self._kb_slots:
+            self.session_visits.append(self._kb_slots.pop(len(self.session_visits)))
+        self.session_visits.append(visit)
+        if self._waiting_for_visit and self._current_index < len(self.session_visits):
+            # The reviewer was waiting for this visit
+            self._render_current_visit()
+        else:
+            self._update_review_progress()
+
+    def _on_download_progress(self, task: BackgroundTask, progress: tuple) -> None:
+        if task is not self._download_task:
+            return
+        self._download_progress = progress
+        self._update_review_progress()
+
+    def _on_downloads_finished(self, task: BackgroundTask, posted, error=None) -> None:
+        if task is not self._download_task:
+            return
+        self._download_task = None
+        if error is not None:
+            exc, tb = error
+            print(f"[ERROR] Photo downloads failed: {exc}")
+            print(f"Traceback: {tb}")
+        real_visits = [v for v in self.session_visits if not v.get("is_known_bad")]
+        if not real_visits:
+            if not task.cancelled:
+                messagebox.showwarning("No photos", "None of the sampled photos could be downloaded.")
+            self._back_to_config()
+            return
+        # Known-bad visits whose slot was never reached go somewhere in the unreviewed part. After going
+        # back, visits past the current one may be decided already; _result_rows is keyed by position,
+        # so nothing at or before the last decided visit may shift
+        for kb_visit in self._kb_slots.values():
+            start = min(max(self._current_index, max(self._result_rows, default=-1)) + 1, len(self.session_visits))
+            self.session_visits.insert(random.randint(start, len(self.session_visits)), kb_visit)
+        self._kb_slots = {}
+        self._session_expected = len(self.session_visits)
+        self.cancel_downloads_btn.pack_forget()
+        if self._current_index >= len(self.session_visits):
+            self._on_review_complete()
+        elif self._waiting_for_visit:
+            self._render_current_visit()
+        else:
+            self._update_review_progress()
+
+    def open_session_manifest(self, path: str) -> None:
+        """Start reviewing a session prepared by the batch CLI"""
+        try:
+            config, visits = load_session_manifest(Path(path))
+        except Exception as e:
+            messagebox.showerror("Session", f"Could not open session file: {e}")
+            return
+        if not visits:
+            messagebox.showwarning("No visits", "The session file has no visits to review.")
+            return
+        self._start_prepared_session(config, visits)
+
+    def open_review_bundle(self, path: str) -> None:
+        """Start reviewing a bundle packed by the batch CLI; photos are read from the bundle"""
+        if not path:
+            messagebox.showwarning("Missing", "Please select a review bundle.")
+            return
+        try:
+            bundle = ReviewBundle(Path(path))
+        except Exception as e:
+            messagebox.showerror("Review bundle", f"Could not open review bundle: {e}")
+            return
+        if not bundle.visits:
+            bundle.close()
+            messagebox.showwarning("No visits", "The review bundle has no visits to review.")
+            return
+        if self._bundle is not None:
+            self._bundle.close()
+        self._bundle = bundle
+        self._start_prepared_session(bundle.config, bundle.visits)
+
+    def _start_prepared_session(self, config: dict, visits: List[dict]) -> None:
+        self.session_config = config
+        self._selected_questions = list(config.get("question_ids", []))
+        self.buckets_var.set(", ".join(config.get("buckets", [])))
+        # Sessions prepared with --auto-bucket carry their pre-screen decisions
+        self._begin_review(visits)
 
     def _show_review_ui(self) -> None:
+        self._result_rows = {}
+        self._image_cache.clear()
         # Hide all widgets in root and create review frame
         for child in list(self.children.values()):
             child.pack_forget()
@@ -486,6 +935,9 @@ class App(ctk.CTk):
         self.progress_var = ctk.StringVar()
         ctk.CTkLabel(header, textvariable=self.progress_var).pack(side="left")
         ctk.CTkButton(header, text="Back to Config", command=self._back_to_config).pack(side="right")
+        self.cancel_downloads_btn = ctk.CTkButton(header, text="Cancel downloads", command=self._cancel_downloads)
+        if self._download_task is not None:
+            self.cancel_downloads_btn.pack(side="right", padx=6)
 
         # Canvas for images with scrollbar - use regular tkinter for better compatibility
         body = tk.Frame(self.review_frame)
@@ -504,35 +956,86 @@ class App(ctk.CTk):
         self.bucket_frame.pack(fill="x", pady=(8, 12))
         for b in self.session_config["buckets"]:
             ctk.CTkButton(self.bucket_frame, text=b, command=lambda v=b: self._record_and_next(v)).pack(side="left", padx=6)
+        self.next_btn = ctk.CTkButton(self.bucket_frame, text="Next", command=self._next_visit, width=90)
+        self.next_btn.pack(side="right", padx=6)
+        self.previous_btn = ctk.CTkButton(self.bucket_frame, text="Previous", command=self._previous_visit, width=90)
+        self.previous_btn.pack(side="right", padx=6)
 
         self._render_current_visit()
 
+    def _update_review_progress(self) -> None:
+        idx = self._current_index + 1
+        total = max(self._session_expected, len(self.session_visits))
+        text = f"Photo Review {idx}/{total}"
+        if self._auto_bucketed:
+            text += f"  ({self._auto_bucketed} auto-bucketed)"
+        rows = self._result_rows.get(self._current_index)
+        if rows:
+            text += f"  (marked {self.results[rows[0]]['bucket']})"
+        if self._download_task is not None:
+            done, count = self._download_progress
+            text += f"  (downloading photos {done}/{count}, {len(self.session_visits)} visits ready)"
+        self.progress_var.set(text)
+
     def _render_current_visit(self) -> None:
         # Clear previous inner content
         for w in self.inner.winfo_children():
             w.destroy()
         # Update progress
-        idx = self._current_index + 1
-        total = len(self.session_visits)
+        self._update_review_progress()
+        self._waiting_for_visit = self._current_index >= len(self.session_visits)
+        if self._waiting_for_visit:
+            # Photos for this visit are still downloading; _on_visit_ready renders it when they land
+            tk.Label(self.inner, text="Downloading photos for the next visit...", fg="gray").grid(row=0, column=0, padx=8, pady=8, sticky="nw")
+            return
         visit = self.session_visits[self._current_index]
-        self.progress_var.set(f"Photo Review {idx}/{total}")
         # Render images side-by-side, resized to width ~400px, three per row
-        max_width = 400
+        max_width = REVIEW_WIDTH
         cols = 3
         self._image_refs = []  # keep refs to avoid GC
         row = 0
         col = 0
+        from PIL import ImageTk
+        triage_only = [meta for meta in visit["photos"] if not meta.filepath.exists() and meta.filepath in self._triage]
+        if triage_only:
+            # Triage mode: show embedded thumbnails until the reviewer asks for the full photos
+            load_btn = ctk.CTkButton(self.inner, text="Load full photos", command=self._load_full_current_visit, width=140)
+            load_btn.grid(row=row, column=0, padx=8, pady=(8, 0), sticky="nw")
+            row += 1
+        members = visit.get("cluster", [])
+        if members:
+            users = sorted({visit.get("user_id", "")} | {m["user_id"] for m in members})
+            text = (f"Cluster of {len(members) + 1} near-identical visits from {len(users)} user(s): {', '.join(users)}\n"
+                    f"Your decision applies to all of them")
+            tk.Label(self.inner, text=text, justify="left", fg="#0b57d0").grid(row=row, column=0, columnspan=cols, padx=8, pady=(8, 0), sticky="nw")
+            row += 1
+        prescreen = visit.get("prescreen", {})
         for i, meta in enumerate(visit["photos"]):
             path = meta.filepath
+            if meta in triage_only:
+                self._render_triage_cell(self._triage[path], row, col)
+                col += 1
+                if col >= cols:
+                    col = 0
+                    row += 1
+                continue
             try:
-                img = Image.open(path)
-                w, h = img.size
-                if w > max_width:
-                    ratio = max_width / float(w)
-                    img = img.resize((int(w * ratio), int(h * ratio)), Image.LANCZOS)
-                tk_img = ImageTk.PhotoImage(img)
-                panel = tk.Label(self.inner, image=tk_img)
+                img = self._image_cache.get(path)
+                if img is None:
+                    img = self._decode_review_image(path, max_width)
+                    self._image_cache.put(path, img)
+                with profiling.span("tk.photo"):
+                    tk_img = ImageTk.PhotoImage(img)
+                flags = prescreen.get(meta.filename)
+                if flags:
+                    panel = tk.Label(self.inner, image=tk_img, text=f"Pre-screen: {', '.join(flags)}", compound="top", fg="#b00020")
+                else:
+                    panel = tk.Label(self.inner, image=tk_img)
                 panel.grid(row=row, column=col, padx=8, pady=8, sticky="nw")
+                if self._bundle is None or path not in self._bundle:
+                    # Bundles only carry review-size photos; files can be zoomed into
+                    panel.configure(cursor="hand2")
+                    panel.bind("<Button-1>", lambda e, p=path: self._open_zoom(p))
                 self._image_refs.append(tk_img)
                 col += 1
                 if col >= cols:
@@ -545,36 +1048,157 @@ class App(ctk.CTk):
                 if col >= cols:
                     col = 0
                     row += 1
+        if profiling.active() is not None:
+            # Only forced when profiling; normally Tk draws on its own next idle pass
+            with profiling.span("tk.paint"):
+                self.update_idletasks()
+        self._prefetch_upcoming()
+
+    def _decode_review_image(self, path: Path, max_width: int):
+        """Decode a photo at review size: from the bundle, the decode service or the file itself"""
+        if self._bundle is not None and path in self._bundle:
+            Image = load_pillow()
+            img = self._bundle.open_image(path)
+            with profiling.span("decode"):
+                img.load()
+            w, h = img.size
+            if w > max_width:
+                ratio = max_width / float(w)
+                with profiling.span("resize"):
+                    img = img.resize((int(w * ratio), int(h * ratio)), Image.LANCZOS)
+            return img
+        frame = self._decoder.take(path) if self._decoder is not None else None
+        if frame is not None:
+            # Copied out so the image can be cached; the shared memory goes straight away
+            with frame:
+                return frame.image.copy()
+        # Thumbnails prepared by the batch CLI are already review-sized
+        return load_review_image(path, max_width)
+
+    def _open_zoom(self, path: Path) -> None:
+        """Open the full-resolution photo in a zoom window"""
+        try:
+            pyramid = TilePyramid(path, self._tile_cache)
+        except Exception as e:
+            messagebox.showerror("Zoom", f"Could not open {path.name}: {e}")
+            return
+        ZoomWindow(self, pyramid)
+
+    def _prefetch_upcoming(self) -> None:
+        """Have the decode service prepare the photos of the next few visits"""
+        if self._decoder is None:
+            return
+        paths = []
+        for visit in self.session_visits[self._current_index + 1:self._current_index + 1 + PREFETCH_VISITS]:
+            for meta in visit["photos"]:
+                path = meta.filepath
+                # Bundle photos come from its memory map; triage photos are not downloaded yet
+                if (self._bundle is None or path not in self._bundle) and path not in self._triage and path not in self._image_cache:
+                    paths.append(path)
+        self._decoder.prefetch(paths)
+
+    def enable_decode_service(self, workers: int, budget_mb: Optional[int] = None) -> None:
+        """Decode upcoming photos in ``workers`` processes, keeping at most ``budget_mb`` of frames ready"""
+        from .decode_service import DEFAULT_BUDGET_BYTES, DecodeService
+
+        budget = budget_mb * 1024 * 1024 if budget_mb else DEFAULT_BUDGET_BYTES
+        self._decoder = DecodeService(workers=workers, budget_bytes=budget, width=REVIEW_WIDTH)
+
+    def set_image_cache_budget(self, budget_mb: int) -> None:
+        """Keep at most ``budget_mb`` of decoded photos from recently viewed visits"""
+        self._image_cache = DecodedImageCache(budget_mb * 1024 * 1024)
+
+    def destroy(self) -> None:
+        if self._decoder is not None:
+            self._decoder.close()
+            self._decoder = None
+        super().destroy()
+
+    def _render_triage_cell(self, result: TriageResult, row: int, col: int) -> None:
+        cell = tk.Frame(self.inner)
+        cell.grid(row=row, column=col, padx=8, pady=8, sticky="nw")
+        if result.thumbnail:
+            Image = load_pillow()
+            from PIL import ImageTk
+            try:
+                img = Image.open(io.BytesIO(result.thumbnail))
+                # Thumbnails are ~160px wide; double them so details are visible
+                img = img.resize((img.width * 2, img.height * 2), Image.LANCZOS)
+                tk_img = ImageTk.PhotoImage(img)
+                tk.Label(cell, image=tk_img).pack(anchor="w")
+                self._image_refs.append(tk_img)
+            except Exception as e:
+                tk.Label(cell, text=f"Unreadable thumbnail ({e})", fg="red").pack(anchor="w")
+        else:
+            tk.Label(cell, text="No embedded thumbnail", fg="gray").pack(anchor="w")
+        details = "\n".join(f"{k}: {v}" for k, v in result.fields.items())
+        if details:
+            tk.Label(cell, text=details, justify="left", fg="#444444").pack(anchor="w")
 
     def _record_and_next(self, bucket_value: str) -> None:
+        if self._current_index >= len(self.session_visits):
+            # Still waiting for the visit to download
+            return
         visit = self.session_visits[self._current_index]
-        reviewer = self.reviewer_name_var.get().strip()
+        results = self._result_rows_for(visit, bucket_value, self.reviewer_name_var.get().strip())
+        rows = self._result_rows.get(self._current_index)
+        if rows is not None:
+            # The reviewer went back and changed their mind
+            for row, result in zip(rows, results):
+                self.results[row] = result
+        else:
+            self._result_rows[self._current_index] = list(range(len(self.results), len(self.results) + len(results)))
+            self.results.extend(results)
+        if self._current_index + 1 < len(self.session_visits) or self._download_task is not None:
+            self._current_index += 1
+            self._render_current_visit()
+        else:
+            self._on_review_complete()
+
+    def _result_row(self, visit: dict, bucket_value: str, reviewer: str) -> dict:
+        # Pre-screen flags of the visit's photos, so results can be sorted by them
+        flags = sorted({flag for photo_flags in visit.get("prescreen", {}).values() for flag in photo_flags})
         if visit.get("is_known_bad", False):
             # For known-bad photos, put filename in form_id and KNOWN_BAD_X in user_id
             photo_filename = visit["photos"][0].filename if visit["photos"] else "unknown"
-            self.results.append({
+            return {
                 "form_id": photo_filename,
                 "user_id": visit["form_id"],  # This contains KNOWN_BAD_X
                 "reviewer": reviewer,
                 "bucket": bucket_value,
                 "is_known_bad": True,
                 "date_reviewed": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            })
-        else:
-            # For real photos, use normal format
-            self.results.append({
-                "form_id": visit["form_id"],
-                "user_id": visit.get("user_id", ""),
-                "reviewer": reviewer,
-                "bucket": bucket_value,
-                "is_known_bad": False,
-                "date_reviewed": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            })
-        if self._current_index + 1 < len(self.session_visits):
+                "prescreen": ";".join(flags),
+                "cluster": "",
+            }
+        # For real photos, use normal format
+        return {
+            "form_id": visit["form_id"],
+            "user_id": visit.get("user_id", ""),
+            "reviewer": reviewer,
+            "bucket": bucket_value,
+            "is_known_bad": False,
+            "date_reviewed": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "prescreen": ";".join(flags),
+            # The visit shown for a collapsed cluster; every member gets a row with the same decision
+            "cluster": visit["form_id"] if visit.get("cluster") else "",
+        }
+
+    def _result_rows_for(self, visit: dict, bucket_value: str, reviewer: str) -> List[dict]:
+        """The visit's results row, followed by one for each member of its cluster"""
+        result = self._result_row(visit, bucket_value, reviewer)
+        return [result] + [dict(result, form_id=m["form_id"], user_id=m["user_id"]) for m in visit.get("cluster", [])]
+
+    def _previous_visit(self) -> None:
+        if self._current_index > 0:
+            self._current_index -= 1
+            self._render_current_visit()
+
+    def _next_visit(self) -> None:
+        """Move on from a visit already decided (after going back) without changing its decision"""
+        if self._current_index in self._result_rows and self._current_index + 1 < max(self._session_expected, len(self.session_visits)):
             self._current_index += 1
             self._render_current_visit()
-        else:
-            self._on_review_complete()
 
     def _on_review_complete(self) -> None:
         messagebox.showinfo("Done", "Review complete. Choose where to save CSV results.")
@@ -595,7 +1219,7 @@ class App(ctk.CTk):
         if not save_path:
             return
         # Write main results
-        fields = ["form_id", "user_id", "reviewer", "bucket", "is_known_bad", "date_reviewed"]
+        fields = ["form_id", "user_id", "reviewer", "bucket", "is_known_bad", "date_reviewed", "prescreen", "cluster"]
         try:
             with open(save_path, "w", newline="", encoding="utf-8") as f:
                 w = csv.DictWriter(f, fieldnames=fields)
@@ -606,8 +1230,45 @@ class App(ctk.CTk):
             messagebox.showerror("Save error", f"Failed to save CSV: {e}")
             return
         # No separate known-bad CSV needed - all data is in the main CSV
+        self._record_reviewed(Path(save_path))
+
+    def _reviewed_index(self) -> Optional[ReviewedIndex]:
+        """The index of forms reviewed in earlier sessions, or None if it cannot be read"""
+        if self._reviewed is None:
+            try:
+                self._reviewed = ReviewedIndex()
+            except (OSError, ValueError) as e:
+                self._show_warning_status(f"Could not read reviewed forms: {e}")
+                return None
+        return self._reviewed
+
+    def _record_reviewed(self, results_csv: Path) -> None:
+        """Add an exported results CSV to the reviewed-forms index, so later sessions skip its forms"""
+        reviewed = self._reviewed_index()
+        if reviewed is None:
+            return
+        try:
+            _read, added = reviewed.add_results([results_csv])
+            reviewed.save()
+        except Exception as e:
+            self._show_warning_status(f"Could not record reviewed forms: {e}")
+            return
+        debug_print(f"Recorded {added} reviewed forms ({len(reviewed)} in total)")
 
     def _back_to_config(self) -> None:
+        # Stop downloading photos for a session that is being abandoned
+        if self._download_task is not None:
+            self._download_task.cancel()
+            self._download_task = None
+        if self._bundle is not None:
+            self._bundle.close()
+            self._bundle = None
+        if self._decoder is not None:
+            # Drop frames decoded for the abandoned session
+            self._decoder.prefetch([])
+        debug_print(f"Decoded image cache: {self._image_cache.stats()}")
+        self._image_cache.clear()
+        self._tile_cache.clear()
         # Save current selection state
         self._last_selected_questions = self._selected_questions.copy()
         
@@ -632,12 +1293,13 @@ class App(ctk.CTk):
             # Show the appropriate data source specific controls
             if current_mode == "local":
                 self.local_dir_frame.pack(fill="x", pady=(0, 8))
-                self.api_controls_frame.pack_forget()
                 self.status_label.configure(text="Select a directory and click 'Check Photo Data'", text_color="gray")
             elif current_mode == "api":
                 self.local_dir_frame.pack_forget()
-                self.api_controls_frame.pack(fill="x", pady=(0, 8))
+                self._ensure_api_controls().pack(fill="x", pady=(0, 8))
                 self.status_label.configure(text="Configure API settings and click 'Check Photo Data'", text_color="gray")
+            elif current_mode == "bundle":
+                self._show_bundle_controls()
         
         # Restore known bad photos checkbox state and show/hide controls accordingly
         if self.include_known_bad_var.get():
@@ -673,6 +1335,10 @@ class App(ctk.CTk):
                         api_file = line.split(":", 1)[1].strip()
                         if api_file:
                             self.api_file_var.set(api_file)
+                    elif line.startswith("last_bundle:"):
+                        bundle = line.split(":", 1)[1].strip()
+                        if bundle:
+                            self.bundle_var.set(bundle)
         except FileNotFoundError:
             pass  # No saved settings yet
         except Exception as e:
@@ -698,6 +1364,11 @@ class App(ctk.CTk):
                 api_file = self.api_file_var.get().strip()
                 if api_file:
                     f.write(f"api_file:{api_file}\n")
+
+                # Save last review bundle
+                bundle = self.bundle_var.get().strip()
+                if bundle:
+                    f.write(f"last_bundle:{bundle}\n")
         except Exception as e:
             print(f"Error saving settings: {e}")  # Debug output
 
@@ -714,27 +1385,54 @@ class App(ctk.CTk):
             self.start_review_frame.pack(fill="x", pady=(12, 0))
         
         if mode == "local":
+            self.bundle_frame.pack_forget()
             self.local_dir_frame.pack(fill="x", pady=(0, 8))
-            self.api_controls_frame.pack_forget()
+            if self.api_controls_frame is not None:
+                self.api_controls_frame.pack_forget()
             self.status_label.configure(text="Select a directory and click 'Check Photo Data'", text_color="gray")
         elif mode == "api":
             self.local_dir_frame.pack_forget()
-            self.api_controls_frame.pack(fill="x", pady=(0, 8))
+            self.bundle_frame.pack_forget()
+            self._ensure_api_controls().pack(fill="x", pady=(0, 8))
             self.status_label.configure(text="Configure API settings and click 'Check Photo Data'", text_color="gray")
             # Reset photo filter when switching to API mode
             self._reset_photo_filter()
+        elif mode == "bundle":
+            self._show_bundle_controls()
+        self._update_local_only_options(mode)
+
+    def _update_local_only_options(self, mode: str) -> None:
+        """Grey out the options that need every sampled photo before the review starts when photos come from the API"""
+        api = mode == "api"
+        state = "disabled" if api else "normal"
+        suffix = LOCAL_ONLY_SUFFIX if api else ""
+        self.prescreen_check.configure(state=state, text=PRESCREEN_TEXT + suffix)
+        self.collapse_check.configure(state=state, text=COLLAPSE_TEXT + suffix)
+        self.auto_bucket_entry.configure(state=state)
+
+    def _show_bundle_controls(self) -> None:
+        """Only the bundle picker applies; sampling and buckets come from the bundle"""
+        self.local_dir_frame.pack_forget()
+        if self.api_controls_frame is not None:
+            self.api_controls_frame.pack_forget()
+        self.columns_frame.pack_forget()
+        self.start_review_frame.pack_forget()
+        self.bundle_frame.pack(fill="x", pady=(0, 8))
+        self.status_label.configure(text="Select a review bundle and click 'Open Bundle'", text_color="gray")
 
     def _reset_photo_filter(self) -> None:
         """Reset photo filter when switching data sources"""
+        # Stop a scan or fetch that would keep filling the filter
+        self._cancel_task()
+        self._cancel_validation()
         # Clear existing checkboxes
-        for widget in self.photo_filter_frame.winfo_children():
-            widget.destroy()
-        self.question_checkboxes.clear()
+        self._clear_question_menu()
         
         # Clear question options and valid metas
         self.question_options = []
         self.valid_metas = []
         self.invalid_paths = []
+        self._remote_photos = {}
         
         # Update status
         self.status_label.configure(text="Configure API settings and click 'Check Photo Data'", text_color="gray")
@@ -751,410 +1449,73 @@ class App(ctk.CTk):
             # Save the API file path
             self._save_settings()
 
-    def _convert_date_format(self, date_str: str) -> str:
-        """Convert MM/DD/YY to YYYY-MM-DD format"""
-        try:
-            parts = date_str.split('/')
-            if len(parts) != 3:
-                return ""
-            
-            month, day, year = parts
-            month = int(month)
-            day = int(day)
-            year = int(year)
-            
-            # Convert 2-digit year to 4-digit
-            if year < 100:
-                if year < 50:  # Assume 20xx for years 00-49
-                    year += 2000
-                else:  # Assume 19xx for years 50-99
-                    year += 1900
-            
-            # Validate month and day
-            if not (1 <= month <= 12):
-                return ""
-            if not (1 <= day <= 31):
-                return ""
-            
-            return f"{year}-{month:02d}-{day:02d}"
-        except (ValueError, IndexError):
-            return ""
-
-    def _parse_domain_form_file(self, file_path: str) -> dict:
-        """Parse the domain/app pairs file"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Filter out comments
-            lines = [line.strip() for line in content.split('\n') if line.strip() and not line.strip().startswith('#')]
-            content = '\n'.join(lines)
-            
-            # Parse as JSON
-            import json
-            data = json.loads(content)
-            
-            domain_form_pairs = {}
-            for domain, app_id in data.items():
-                # Extract UUID from app_id if it's a full URL
-                if app_id.startswith('http'):
-                    # Extract UUID from URL like "http://openrosa.org/formdesigner/UUID"
-                    app_id = app_id.split('/')[-1]
-                domain_form_pairs[domain] = app_id
-            
-            return domain_form_pairs
-        except Exception as e:
-            print(f"Error parsing domain/app file: {e}")
-            return {}
-
-    def _find_env_file(self) -> str:
-        """Find the .env file in Coverage directory"""
-        return find_env_file()
-
-    def _load_api_credentials(self, env_file: str) -> tuple:
-        """Load API credentials from .env file"""
-        try:
-            with open(env_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line.startswith('COMMCARE_USERNAME='):
-                        username = line.split('=', 1)[1].strip()
-                    elif line.startswith('COMMCARE_API_KEY='):
-                        api_key = line.split('=', 1)[1].strip()
-            
-            return username, api_key
-        except Exception as e:
-            print(f"Error loading credentials: {e}")
-            return "", ""
+    def _browse_bundle(self) -> None:
+        filename = filedialog.askopenfilename(
+            title="Select review bundle",
+            filetypes=[("Review bundles", f"*{BUNDLE_SUFFIX}"), ("All files", "*.*")]
+        )
+        if filename:
+            self.bundle_var.set(filename)
+            self._save_settings()
 
-    def _get_forms_from_api(self, domain_form_pairs: dict, date_start: str, date_end: str, username: str, api_key: str, limit: int) -> list:
-        """Get forms from CommCare List Forms API"""
-        import requests
-        import json
-        
-        all_forms = []
-        
-        for domain, app_id in domain_form_pairs.items():
-            debug_print(f"  Processing domain: {domain}")
-            debug_print(f"  Form app_id: {app_id}")
-            
-            try:
-                # CommCare List Forms API
-                url = f"https://www.commcarehq.org/a/{domain}/api/v0.5/form/"
-                debug_print(f"  API URL: {url}")
-                
-                params = {
-                    'app_id': app_id,
-                    'limit': limit
-                }
-                
-                # Only add date filters if dates are provided and not empty
-                if date_start and date_start.strip():
-                    params['received_on_start'] = date_start
-                if date_end and date_end.strip():
-                    params['received_on_end'] = date_end
-                debug_print(f"  API Parameters: {params}")
-                
-                debug_print(f"  Making API request...")
-                response = requests.get(url, auth=(username, api_key), params=params, timeout=30)
-                debug_print(f"  Response status: {response.status_code}")
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    debug_print(f"  [OK] API call successful")
-                    debug_print(f"  Response keys: {list(data.keys())}")
-                    
-                    if 'objects' in data:
-                        forms = data['objects']
-                        debug_print(f"  Found {len(forms)} forms for domain {domain}")
-                        
-                        # If no forms found with app_id, try without app_id parameter
-                        if len(forms) == 0:
-                            print(f"  No forms found with app_id '{app_id}', trying without app_id filter...")
-                            params_without_app_id = {k: v for k, v in params.items() if k != 'app_id'}
-                            debug_print(f"  Retry API Parameters: {params_without_app_id}")
-                            
-                            retry_response = requests.get(url, auth=(username, api_key), params=params_without_app_id, timeout=30)
-                            if retry_response.status_code == 200:
-                                retry_data = retry_response.json()
-                                if 'objects' in retry_data:
-                                    retry_forms = retry_data['objects']
-                                    debug_print(f"  Found {len(retry_forms)} forms without app_id filter")
-                                    all_forms.extend(retry_forms)
-                                    
-                                    # Show sample of what forms are available
-                                    if retry_forms:
-                                        sample_form = retry_forms[0]
-                                        debug_print(f"  Sample form app_id: {sample_form.get('app_id', 'N/A')}")
-                                        debug_print(f"  Sample form type: {sample_form.get('type', 'N/A')}")
-                        else:
-                            all_forms.extend(forms)
-                        
-                        # Debug: Show sample form data
-                        if forms:
-                            sample_form = forms[0]
-                            debug_print(f"  Sample form keys: {list(sample_form.keys())}")
-                            if 'attachments' in sample_form:
-                                attachments = sample_form['attachments']
-                                debug_print(f"  Sample form has {len(attachments)} attachments")
-                                for att_name, att_info in list(attachments.items())[:3]:  # Show first 3
-                                    debug_print(f"    - {att_name}: {type(att_info)}")
-                    else:
-                        print(f"  [ERROR] No 'objects' key in response for domain {domain}")
-                        print(f"  Response data: {data}")
-                else:
-                    print(f"  [ERROR] API call failed with status {response.status_code}")
-                    print(f"  Response: {response.text}")
-                    
-            except requests.exceptions.Timeout:
-                print(f"  [ERROR] API request timed out for domain {domain}")
-                continue
-            except requests.exceptions.RequestException as e:
-                print(f"  [ERROR] API request failed for domain {domain}: {e}")
-                continue
-            except Exception as e:
-                print(f"  [ERROR] Unexpected error for domain {domain}: {e}")
-                import traceback
-                print(f"  Traceback: {traceback.format_exc()}")
-                continue
-        
-        print(f"Total forms collected: {len(all_forms)}")
-        return all_forms
-
-    def _download_attachments(self, forms_data: list, limit: int, username: str, api_key: str) -> list:
-        """Download attachments from forms using data from forms list API"""
-        import requests
-        import os
-        from pathlib import Path
-        
-        print(f"Starting photo download process...")
-        print(f"Forms to process: {len(forms_data)}")
-        
-        downloaded_photos = []
-        # Create timestamped subdirectory for this download session
-        from datetime import datetime
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        download_dir = Path("downloaded_photos") / f"session_{timestamp}"
-        download_dir.mkdir(parents=True, exist_ok=True)
-        debug_print(f"Download directory: {download_dir.absolute()}")
-        
-        photo_count = 0
-        forms_with_attachments = 0
-        total_attachments = 0
-        photo_attachments = 0
-        
-        # Track photos per domain
-        photos_per_domain = {}
-        
-        # Process all forms (limit was already applied per domain in API call)
-        forms_to_process = forms_data
-        debug_print(f"Processing {len(forms_to_process)} forms (limit applied per domain: {limit})")
-        
-        for i, form in enumerate(forms_to_process):
-                
-            debug_print(f"  Processing form {i+1}/{len(forms_data)}")
-            
-            # Get form metadata
-            # User ID is in the form.meta section
-            form_data = form.get('form', {})
-            meta = form_data.get('meta', {})
-            user_id = meta.get('userID', 'unknown')
-            form_id = form.get('id', 'unknown')
-            domain = form.get('domain', 'unknown')
-            
-            debug_print(f"    Form ID: {form_id}")
-            debug_print(f"    User ID: {user_id}")
-            debug_print(f"    Domain: {domain}")
-            
-            # Get attachments from the form data (already included in forms list API)
-            attachments = form.get('attachments', {})
-            debug_print(f"    Attachments found: {len(attachments)}")
-            
-            if attachments:
-                forms_with_attachments += 1
-                total_attachments += len(attachments)
-                
-                for attachment_name, attachment_info in attachments.items():
-                    debug_print(f"      Processing attachment: {attachment_name}")
-                    debug_print(f"      Attachment info type: {type(attachment_info)}")
-                    debug_print(f"      Attachment info keys: {list(attachment_info.keys()) if isinstance(attachment_info, dict) else 'Not a dict'}")
-                    
-                    # Check if it's a photo file
-                    if attachment_name.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.bmp')):
-                        photo_attachments += 1
-                        debug_print(f"      [OK] Photo file detected: {attachment_name}")
-                        
-                        try:
-                            # Get the download URL from attachment info
-                            download_url = attachment_info.get('download_url')
-                            if not download_url:
-                                # Try alternative URL structure
-                                download_url = attachment_info.get('url')
-                            
-                            debug_print(f"      Download URL: {download_url}")
-                            
-                            if download_url:
-                                debug_print(f"      Downloading photo...")
-                                # Download the photo
-                                photo_response = requests.get(download_url, auth=(username, api_key), timeout=30)
-                                photo_response.raise_for_status()
-                                
-                                # Extract question name from attachment name or form data
-                                question_name = self._extract_question_name(attachment_name, form)
-                                debug_print(f"      Question name: {question_name}")
-                                
-                                # Create filename in CommCare format with proper extension
-                                # Determine file extension from original attachment name
-                                file_ext = '.jpg'  # Default to .jpg
-                                if attachment_name.lower().endswith('.jpeg'):
-                                    file_ext = '.jpeg'
-                                elif attachment_name.lower().endswith('.png'):
-                                    file_ext = '.png'
-                                elif attachment_name.lower().endswith('.gif'):
-                                    file_ext = '.gif'
-                                elif attachment_name.lower().endswith('.bmp'):
-                                    file_ext = '.bmp'
-                                
-                                filename = f"api_photo-{question_name}-{user_id}-form_{form_id}{file_ext}"
-                                file_path = download_dir / filename
-                                
-                                with open(file_path, 'wb') as f:
-                                    f.write(photo_response.content)
-                                
-                                downloaded_photos.append(str(file_path))
-                                photo_count += 1
-                                
-                                # Track photos per domain
-                                if domain not in photos_per_domain:
-                                    photos_per_domain[domain] = 0
-                                photos_per_domain[domain] += 1
-                                
-                                debug_print(f"      [OK] Downloaded: {filename} ({len(photo_response.content)} bytes)")
-                                
-                            else:
-                                print(f"      [ERROR] No download URL found for {attachment_name}")
-                                
-                        except requests.exceptions.Timeout:
-                            print(f"      [ERROR] Download timeout for {attachment_name}")
-                        except requests.exceptions.RequestException as e:
-                            print(f"      [ERROR] Download failed for {attachment_name}: {e}")
-                        except Exception as e:
-                            print(f"      [ERROR] Error downloading {attachment_name}: {e}")
-                            import traceback
-                            print(f"      Traceback: {traceback.format_exc()}")
-                    else:
-                        debug_print(f"      [SKIP] Skipping non-photo file: {attachment_name}")
-            else:
-                debug_print(f"    No attachments in this form")
-        
-        print(f"Download summary:")
-        print(f"  - Forms processed: {len(forms_to_process)} (limit {limit} per domain)")
-        print(f"  - Forms with attachments: {forms_with_attachments}")
-        print(f"  - Total attachments: {total_attachments}")
-        print(f"  - Photo attachments: {photo_attachments}")
-        print(f"  - Photos downloaded: {len(downloaded_photos)}")
-        
-        # Show photos per domain
-        if photos_per_domain:
-            print(f"  - Photos per domain:")
-            for domain, count in photos_per_domain.items():
-                print(f"    * {domain}: {count} photos")
-        else:
-            print(f"  - No photos downloaded from any domain")
-        
-        return downloaded_photos
-
-    def _extract_question_name(self, attachment_name: str, form: dict) -> str:
-        """Extract question name from form data by finding the key that has this attachment as its value"""
-        # Try to find the question name in the form data
-        form_data = form.get('form', {})
-        if isinstance(form_data, dict):
-            # Recursively search through nested dictionaries
-            def find_question_in_data(data, path=""):
-                if isinstance(data, dict):
-                    for key, value in data.items():
-                        current_path = f"{path}.{key}" if path else key
-                        if isinstance(value, str) and value == attachment_name:
-                            # Found the key that corresponds to this attachment
-                            debug_print(f"      DEBUG: Found question key '{key}' for attachment '{attachment_name}' at path '{current_path}'")
-                            return key
-                        elif isinstance(value, str) and attachment_name in value:
-                            # Partial match - the value contains the attachment name
-                            debug_print(f"      DEBUG: Found partial match - key '{key}' contains attachment '{attachment_name}' at path '{current_path}'")
-                            return key
-                        elif isinstance(value, dict):
-                            # Recursively search nested dictionaries
-                            result = find_question_in_data(value, current_path)
-                            if result:
-                                return result
-                return None
-            
-            # Search through the form data
-            question_name = find_question_in_data(form_data)
-            if question_name:
-                return question_name
-        
-        # Fallback: use a cleaned version of the attachment name
-        fallback_name = attachment_name.replace('.jpg', '').replace('.jpeg', '').replace('.png', '')
-        debug_print(f"      DEBUG: Using fallback question name: {fallback_name}")
-        return fallback_name
-
-    def _process_downloaded_photos(self, downloaded_photos: list) -> None:
-        """Process downloaded photos and update the GUI"""
-        # Update the valid_metas with downloaded photos
-        self.valid_metas = []
-        for photo_path in downloaded_photos:
-            # Create a PhotoMeta object for each downloaded photo
-            from .filenames import PhotoMeta
-            # Extract metadata from the filename
-            photo_path_obj = Path(photo_path)
-            filename = photo_path_obj.name
-            extension = photo_path_obj.suffix.lstrip('.')
-            
-            # Try to parse the filename to extract metadata
-            from .filenames import parse_commcare_filename
-            parsed_meta = parse_commcare_filename(photo_path_obj)
-            
-            if parsed_meta:
-                # Use parsed metadata
-                meta = parsed_meta
-            else:
-                # Try to extract question name from filename
-                # Expected format: test_photo-{question_name}-{user_id}-form_{form_uuid}.jpg
-                # or: api_photo-{question_name}-{user_id}-form_{form_uuid}.jpg
-                question_name = "api_photo"  # Default fallback
-                if filename.startswith(('test_photo-', 'api_photo-')):
-                    # Find the position of the second dash (after question_name)
-                    parts = filename.split('-')
-                    if len(parts) >= 3:
-                        # The question name should be the second part (index 1)
-                        question_name = parts[1]
-                
-                # Create a basic PhotoMeta with extracted question name
-                meta = PhotoMeta(
-                    json_block="api_download",
-                    question_id=question_name,
-                    user_id="unknown",
-                    form_id="unknown",
-                    extension=extension,
-                    filename=filename,
-                    filepath=photo_path_obj
-                )
-            self.valid_metas.append(meta)
+    def _load_full_current_visit(self) -> None:
+        """Download the full photos of the visit on screen (triage mode) and re-render it"""
+        index = self._current_index
+        visit = self.session_visits[index]
+        jobs = []
+        for meta in visit["photos"]:
+            if not meta.filepath.exists() and meta.filepath in self._remote_photos:
+                record, attachment = self._remote_photos[meta.filepath]
+                jobs.append((record, attachment, meta.filepath))
+        username, api_key = self._api_auth
+        stats = self._api_stats
+        from .commcare import download_attachments
+        ingest = self._ingest_options()
+        task = BackgroundTask(lambda t: download_attachments(jobs, username, api_key, stats, ingest=ingest) if jobs else {}, name="full-photos")
+
+        def loaded(_payload) -> None:
+            for meta in visit["photos"]:
+                if meta.filepath.exists():
+                    self._triage.pop(meta.filepath, None)
+            # Only redraw if the reviewer is still on this visit
+            if self._current_index == index and hasattr(self, "review_frame") and self.review_frame.winfo_exists():
+                self._render_current_visit()
+
+        task.start()
+        self._poll_task(task, {"done": loaded, "error": loaded})
+
+    def _index_remote_photos(self, forms_data: list) -> None:
+        """Build the photo index from FormRecords without downloading anything and update the GUI"""
+        # Photos land here once sampled; filepaths are known up front from the records
+        self.valid_metas, self._remote_photos = index_remote_photos(forms_data, new_download_dir())
+        self._triage = {}
         
         # Update the question filter
         # First populate question_options from the valid_metas
-        from .scanner import group_by_question_id
         groups = group_by_question_id(self.valid_metas)
         self.question_options = sorted(groups.keys())
         self._refresh_question_menu()
         
         # Update status
-        self.status_label.configure(text=f"Downloaded {len(downloaded_photos)} photos from API", text_color="green")
+        self.status_label.configure(text=f"{len(self.valid_metas)} photos available on {len(forms_data)} forms (downloaded after sampling)", text_color="green")
+
+    def _ingest_options(self):
+        """Downloaded photos get their review thumbnail (and optional compaction) from a single decode"""
+        from .ingest import IngestOptions
+
+        compact = (COMPACT_MAX_EDGE, COMPACT_QUALITY) if self.api_compact_var.get() else None
+        return IngestOptions(thumbnail_width=REVIEW_WIDTH, compact=compact)
+
+    def _api_headroom_percent(self) -> float:
+        try:
+            return max(0.0, float(self.api_headroom_var.get().strip() or 0))
+        except (ValueError, TypeError):
+            return 0.0
 
     def _get_api_data(self) -> None:
         """Handle API data loading with comprehensive error handling"""
         debug_print("=== Starting API Data Loading ===")
+        from .commcare import convert_date_format, find_env_file, get_forms_from_api, load_api_credentials, parse_domain_form_file
         
         # Validate API inputs
         api_file = self.api_file_var.get().strip()
@@ -1164,8 +1525,8 @@ class App(ctk.CTk):
         print(f"API Limit: {api_limit}")
         
         # Get date values from text entries and convert MM/DD/YY to YYYY-MM-DD
-        date_start = self._convert_date_format(self.date_start_var.get().strip())
-        date_end = self._convert_date_format(self.date_end_var.get().strip())
+        date_start = convert_date_format(self.date_start_var.get().strip())
+        date_end = convert_date_format(self.date_end_var.get().strip())
         
         debug_print(f"Date Start: {self.date_start_var.get().strip()} -> {date_start}")
         debug_print(f"Date End: {self.date_end_var.get().strip()} -> {date_end}")
@@ -1204,7 +1565,7 @@ class App(ctk.CTk):
         try:
             debug_print("=== Parsing Domain/App Pairs ===")
             # Parse domain/app pairs file
-            domain_form_pairs = self._parse_domain_form_file(api_file)
+            domain_form_pairs = parse_domain_form_file(api_file)
             if not domain_form_pairs:
                 error_msg = "Could not parse domain/app pairs file."
                 print(f"[ERROR] Parse failed: {error_msg}")
@@ -1215,7 +1576,7 @@ class App(ctk.CTk):
             
             debug_print("=== Finding .env File ===")
             # Find .env file
-            env_file = self._find_env_file()
+            env_file = find_env_file()
             if not env_file:
                 error_msg = "Could not find .env file."
                 print(f"[ERROR] .env file not found: {error_msg}")
@@ -1226,7 +1587,7 @@ class App(ctk.CTk):
             
             debug_print("=== Loading API Credentials ===")
             # Load API credentials
-            api_username, api_key = self._load_api_credentials(env_file)
+            api_username, api_key = load_api_credentials(env_file)
             if not api_username or not api_key:
                 error_msg = "Could not load API credentials from .env file."
                 print(f"[ERROR] Credentials not found: {error_msg}")
@@ -1236,117 +1597,218 @@ class App(ctk.CTk):
             debug_print(f"Loaded credentials: Username={api_username[:3]}..., Key={api_key[:8]}...")
             
             debug_print("=== Getting Forms from API ===")
-            # Get forms from API
-            forms_data = self._get_forms_from_api(domain_form_pairs, date_start, date_end, api_username, api_key, limit)
-            if not forms_data:
-                error_msg = "No forms found for the specified criteria."
-                print(f"[ERROR] No forms found: {error_msg}")
-                print("Debug info:")
-                print(f"  - Date range: {date_start} to {date_end}")
-                print(f"  - Domains: {list(domain_form_pairs.keys())}")
-                print(f"  - Limit: {limit}")
-                from tkinter import messagebox
-                messagebox.showwarning("No Data", error_msg)
-                return
-            debug_print(f"Found {len(forms_data)} forms from API")
-            
-            debug_print("=== Downloading Attachments ===")
-            # Download attachments
-            downloaded_photos = self._download_attachments(forms_data, limit, api_username, api_key)
-            if not downloaded_photos:
-                error_msg = "No photos found in the downloaded forms."
-                print(f"[ERROR] No photos downloaded: {error_msg}")
-                print("Debug info:")
-                print(f"  - Forms processed: {len(forms_data)}")
-                print(f"  - Forms with attachments: {sum(1 for form in forms_data if form.get('attachments'))}")
-                from tkinter import messagebox
-                messagebox.showwarning("No Photos", error_msg)
-                return
-            debug_print(f"Downloaded {len(downloaded_photos)} photos")
-            
-            debug_print("=== Processing Downloaded Photos ===")
-            # Process downloaded photos
-            self._process_downloaded_photos(downloaded_photos)
-            
-            # Update status
-            self.status_label.configure(text=f"Downloaded {len(downloaded_photos)} photos from API", text_color="green")
-            print(f"[OK] API data loading completed successfully!")
+            # Get forms from API on a worker thread so the window stays responsive
+            stats = ThroughputReport()
+            context = {"date_start": date_start, "date_end": date_end, "domains": list(domain_form_pairs.keys()), "limit": limit}
+            self._start_config_task(
+                lambda task: get_forms_from_api(domain_form_pairs, date_start, date_end, api_username, api_key, limit, stats,
+                                                cancel=task.cancel_event, progress=task.progress),
+                "Fetching forms...",
+                {
+                    "progress": lambda p: self.task_label.configure(text=f"Fetching forms: {p[0]}/{p[1]} domain/app pairs done"),
+                    "done": lambda forms_data: self._on_api_forms_fetched(forms_data, (api_username, api_key), stats, context),
+                    "error": lambda error: self._on_api_error(*error),
+                },
+            )
             
         except Exception as e:
-            error_msg = f"Error during API data loading: {str(e)}"
-            print(f"[ERROR] Unexpected error: {error_msg}")
-            print(f"Exception type: {type(e).__name__}")
-            import traceback
-            print(f"Traceback: {traceback.format_exc()}")
-            
-            # Check if we have any downloaded photos to work with
-            if 'downloaded_photos' in locals() and downloaded_photos:
-                print(f"[INFO] Found {len(downloaded_photos)} photos despite error - proceeding with review")
-                from tkinter import messagebox
-                result = messagebox.askyesno(
-                    "API Error", 
-                    f"{error_msg}\n\nHowever, {len(downloaded_photos)} photos were successfully downloaded.\n\nWould you like to proceed with the review using these photos?"
-                )
-                if result:
-                    print("=== Processing Downloaded Photos (After Error) ===")
-                    # Process downloaded photos with error handling
-                    try:
-                        self._process_downloaded_photos(downloaded_photos)
-                        
-                        # Update status
-                        self.status_label.configure(text=f"Downloaded {len(downloaded_photos)} photos from API (with errors)", text_color="orange")
-                        print(f"[OK] Proceeding with {len(downloaded_photos)} photos despite API error!")
-                        return
-                    except Exception as process_error:
-                        print(f"[ERROR] Failed to process downloaded photos: {process_error}")
-                        from tkinter import messagebox
-                        messagebox.showerror("Processing Error", f"Failed to process downloaded photos: {process_error}")
-                        return
-                else:
-                    return
-            else:
-                from tkinter import messagebox
-                messagebox.showerror("API Error", error_msg)
-                return
-
+            self._on_api_error(e, None)
+            return
 
-def find_env_file() -> str:
-    """Find the .env file - first check current directory, then Coverage directories"""
-    import os
-    from pathlib import Path
-    
-    # First priority: Check for .env file in current photo_utility directory
-    current_env = Path.cwd() / ".env"
-    if current_env.exists():
-        debug_print(f"  Found .env file in current directory: {current_env}")
-        return str(current_env)
-    
-    # Second priority: Search for Coverage folder in common locations
-    home_dir = Path.home()
-    
-    search_paths = [
-        home_dir / "Documents" / "Coverage" / ".env",
-        home_dir / "Coverage" / ".env",
-        home_dir / "Documents" / "Coverage" / "Coverage" / ".env",  # Nested Coverage folder
-        Path.cwd() / "Coverage" / ".env",  # Current working directory
-    ]
-    
-    # Also search for any Coverage folder in Documents
-    documents_dir = home_dir / "Documents"
-    if documents_dir.exists():
-        for item in documents_dir.iterdir():
-            if item.is_dir() and item.name.lower() == "coverage":
-                search_paths.append(item / ".env")
-    
-    # Check each potential path
-    for env_path in search_paths:
-        if env_path.exists():
-            print(f"  Found .env file at: {env_path}")
-            return str(env_path)
-    
-    return ""
-
-
-def run_app() -> None:
-    app = App()
+    def _on_api_error(self, e: Exception, tb: Optional[str]) -> None:
+        error_msg = f"Error during API data loading: {str(e)}"
+        print(f"[ERROR] Unexpected error: {error_msg}")
+        print(f"Exception type: {type(e).__name__}")
+        import traceback
+        print(f"Traceback: {tb or traceback.format_exc()}")
+        from tkinter import messagebox
+        messagebox.showerror("API Error", error_msg)
+
+    def _on_api_forms_fetched(self, forms_data: list, auth: tuple, stats: ThroughputReport, context: dict) -> None:
+        """Index the fetched forms' photos once the background fetch finishes"""
+        if not forms_data:
+            error_msg = "No forms found for the specified criteria."
+            print(f"[ERROR] No forms found: {error_msg}")
+            print("Debug info:")
+            print(f"  - Date range: {context['date_start']} to {context['date_end']}")
+            print(f"  - Domains: {context['domains']}")
+            print(f"  - Limit: {context['limit']}")
+            from tkinter import messagebox
+            messagebox.showwarning("No Data", error_msg)
+            return
+        debug_print(f"Found {len(forms_data)} forms from API")
+        
+        debug_print("=== Indexing Photo Attachments ===")
+        # Index attachments only; photos are downloaded once the review sample is drawn
+        self._api_auth = auth
+        self._api_stats = stats
+        self._index_remote_photos(forms_data)
+        if not self.valid_metas:
+            error_msg = "No photos found in the downloaded forms."
+            print(f"[ERROR] No photos indexed: {error_msg}")
+            print("Debug info:")
+            print(f"  - Forms processed: {len(forms_data)}")
+            print(f"  - Forms with attachments: {sum(1 for record in forms_data if record.attachment_count)}")
+            from tkinter import messagebox
+            messagebox.showwarning("No Photos", error_msg)
+            return
+        debug_print(f"Indexed {len(self.valid_metas)} photos")
+        print(f"[OK] API data loading completed successfully!")
+
+
+class ZoomWindow(tk.Toplevel):
+    """Click-to-zoom view of one photo; only the tiles in view are decoded and drawn"""
+
+    def __init__(self, master, pyramid: TilePyramid) -> None:
+        super().__init__(master)
+        self.title(pyramid.path.name)
+        self.pyramid = pyramid
+        self._zoom = 0  # display scale is 2 ** zoom
+        # (level, column, row) -> (canvas item, PhotoImage) for the tiles drawn
+        self._items: dict = {}
+        self._render_pending = False
+
+        toolbar = tk.Frame(self)
+        toolbar.pack(fill="x")
+        tk.Button(toolbar, text="-", width=3, command=lambda: self._zoom_by(-1)).pack(side="left", padx=2, pady=2)
+        tk.Button(toolbar, text="+", width=3, command=lambda: self._zoom_by(1)).pack(side="left", padx=2, pady=2)
+        tk.Button(toolbar, text="Fit", command=self._fit).pack(side="left", padx=2, pady=2)
+        self.zoom_var = tk.StringVar()
+        tk.Label(toolbar, textvariable=self.zoom_var).pack(side="left", padx=8)
+        tk.Label(toolbar, text="Drag to pan, scroll or +/- to zoom", fg="gray").pack(side="right", padx=8)
+        self.canvas = tk.Canvas(self, width=1000, height=720, background="#222222", highlightthickness=0)
+        self.canvas.pack(fill="both", expand=True)
+
+        self.canvas.bind("<ButtonPress-1>", lambda e: self.canvas.scan_mark(e.x, e.y))
+        self.canvas.bind("<B1-Motion>", self._drag)
+        self.canvas.bind("<MouseWheel>", lambda e: self._zoom_by(1 if e.delta > 0 else -1, (e.x, e.y)))
+        self.canvas.bind("<Button-4>", lambda e: self._zoom_by(1, (e.x, e.y)))
+        self.canvas.bind("<Button-5>", lambda e: self._zoom_by(-1, (e.x, e.y)))
+        self.canvas.bind("<Configure>", lambda e: self._schedule_render())
+        for key in ("<plus>", "<equal>", "<KP_Add>"):
+            self.bind(key, lambda e: self._zoom_by(1))
+        for key in ("<minus>", "<KP_Subtract>"):
+            self.bind(key, lambda e: self._zoom_by(-1))
+        self.bind("<Key-0>", lambda e: self._fit())
+        self.bind("<Escape>", lambda e: self.destroy())
+        self._fit()
+        self.focus_set()
+
+    def _view_size(self) -> tuple:
+        w, h = self.canvas.winfo_width(), self.canvas.winfo_height()
+        if w <= 1 or h <= 1:
+            # Not mapped yet
+            return int(self.canvas["width"]), int(self.canvas["height"])
+        return w, h
+
+    def _fit(self) -> None:
+        """Zoom out until the whole photo is in view"""
+        vw, vh = self._view_size()
+        w, h = self.pyramid.size
+        zoom = 0
+        while zoom > 1 - self.pyramid.levels and (w * 2.0 ** zoom > vw or h * 2.0 ** zoom > vh):
+            zoom -= 1
+        self._set_zoom(zoom)
+
+    def _zoom_by(self, steps: int, anchor: Optional[tuple] = None) -> None:
+        if anchor is None:
+            vw, vh = self._view_size()
+            anchor = (vw / 2.0, vh / 2.0)
+        self._set_zoom(self._zoom + steps, anchor)
+
+    def _set_zoom(self, zoom: int, anchor: Optional[tuple] = None) -> None:
+        """Zoom to ``2 ** zoom``, keeping the photo point under ``anchor`` (window pixels) in place"""
+        zoom = max(1 - self.pyramid.levels, min(ZOOM_MAGNIFY_STEPS, zoom))
+        if anchor is not None:
+            old = 2.0 ** self._zoom
+            # In full-resolution photo pixels
+            px, py = self.canvas.canvasx(anchor[0]) / old, self.canvas.canvasy(anchor[1]) / old
+        self._zoom = zoom
+        for item, _ in self._items.values():
+            self.canvas.delete(item)
+        self._items.clear()
+        scale = 2.0 ** zoom
+        width, height = self.pyramid.size[0] * scale, self.pyramid.size[1] * scale
+        self.canvas.configure(scrollregion=(0, 0, width, height))
+        if anchor is None:
+            self.canvas.xview_moveto(0)
+            self.canvas.yview_moveto(0)
+        else:
+            self.canvas.xview_moveto(max(0.0, (px * scale - anchor[0]) / width))
+            self.canvas.yview_moveto(max(0.0, (py * scale - anchor[1]) / height))
+        self.zoom_var.set(f"{scale * 100:.0f}%")
+        self._render()
+
+    def _drag(self, event) -> None:
+        self.canvas.scan_dragto(event.x, event.y, gain=1)
+        self._schedule_render()
+
+    def _schedule_render(self) -> None:
+        # Motion events arrive faster than tiles need redrawing; draw once the queue is idle
+        if not self._render_pending:
+            self._render_pending = True
+            self.after_idle(self._render)
+
+    def _render(self) -> None:
+        self._render_pending = False
+        level = max(0, -self._zoom)
+        # Level pixels -> canvas pixels: 1 at or below 1:1, 2 or 4 when magnified
+        magnify = 2 ** max(0, self._zoom)
+        vw, vh = self._view_size()
+        left, top = self.canvas.canvasx(0), self.canvas.canvasy(0)
+        box = (left / magnify, top / magnify, (left + vw) / magnify, (top + vh) / magnify)
+        Image = load_pillow()
+        from PIL import ImageTk
+        with profiling.span("zoom.render"):
+            try:
+                tiles = self.pyramid.tiles(level, box)
+            except Exception as e:
+                self.canvas.delete("all")
+                self._items.clear()
+                self.canvas.create_text(left + 20, top + 20, text=f"Failed to load image: {e}", fill="red", anchor="nw")
+                return
+            visible = set()
+            for (c, r), (x, y), tile in tiles:
+                key = (level, c, r)
+                visible.add(key)
+                if key in self._items:
+                    continue
+                if magnify > 1:
+                    tile = tile.resize((tile.width * magnify, tile.height * magnify), Image.BILINEAR)
+                photo = ImageTk.PhotoImage(tile)
+                item = self.canvas.create_image(x * magnify, y * magnify, image=photo, anchor="nw")
+                self._items[key] = (item, photo)
+            # Tiles panned out of view go, so Tk holds only what is on screen
+            for key in [key for key in self._items if key not in visible]:
+                self.canvas.delete(self._items.pop(key)[0])
+
+
+def run_app(
+    session: Optional[str] = None,
+    startup_profile: Optional[StartupProfile] = None,
+    decode_workers: int = 0,
+    decode_budget_mb: Optional[int] = None,
+    image_cache_mb: Optional[int] = None,
+) -> None:
+    if startup_profile is None:
+        app = App()
+    else:
+        with startup_profile.span("build App()"):
+            app = App()
+
+        def first_paint() -> None:
+            app.update_idletasks()
+            startup_profile.mark("first paint")
+            startup_profile.report()
+
+        # Runs once mainloop has mapped the window and drained the idle (draw) queue
+        app.after(0, lambda: app.after_idle(first_paint))
+    if decode_workers > 0:
+        app.enable_decode_service(decode_workers, decode_budget_mb)
+    if image_cache_mb is not None:
+        app.set_image_cache_budget(image_cache_mb)
+    if session and is_review_bundle(Path(session)):
+        app.open_review_bundle(session)
+    elif session:
+        app.open_session_manifest(session)
     app.mainloop()
@@ -0,0 +1,90 @@
+"""Decoded review images kept in memory, so stepping back and forth between visits does not decode again."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Dict, Hashable
+
+
+DEFAULT_IMAGE_CACHE_BYTES = 64 * 1024 * 1024
+
+
+def image_nbytes(img) -> int:
+    """Bytes Pillow holds for ``img``'s pixels.
+
+    Pillow stores one byte per pixel for 1, L and P images, two for 16-bit
+    integer modes and four for everything else (RGB rows are padded to four).
+    """
+    mode = img.mode
+    if mode in ("1", "L", "P"):
+        per_pixel = 1
+    elif mode.startswith("I;16"):
+        per_pixel = 2
+    else:
+        per_pixel = 4
+    return img.width * img.height * per_pixel
+
+
+class DecodedImageCache:
+    """Least-recently-viewed cache of decoded images, bounded by their pixel bytes.
+
+    The review screen looks up every photo of a visit when it shows it, so
+    the photos of the visits viewed longest ago are evicted first.
+    """
+
+    def __init__(self, budget_bytes: int = DEFAULT_IMAGE_CACHE_BYTES) -> None:
+        self.budget_bytes = budget_bytes
+        self._images: "OrderedDict[Hashable, object]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._images)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._images
+
+    def get(self, key: Hashable):
+        """The cached image for ``key`` (now the most recently viewed), or None"""
+        img = self._images.get(key)
+        if img is None:
+            self.misses += 1
+            return None
+        self._images.move_to_end(key)
+        self.hits += 1
+        return img
+
+    def put(self, key: Hashable, img) -> None:
+        """Cache ``img``, evicting the least recently viewed images to stay within budget"""
+        self.discard(key)
+        size = image_nbytes(img)
+        if size > self.budget_bytes:
+            return
+        while self._images and self.bytes + size > self.budget_bytes:
+            old, _ = self._images.popitem(last=False)
+            self.bytes -= self._sizes.pop(old)
+            self.evictions += 1
+        self._images[key] = img
+        self._sizes[key] = size
+        self.bytes += size
+
+    def discard(self, key: Hashable) -> None:
+        if key in self._images:
+            del self._images[key]
+            self.bytes -= self._sizes.pop(key)
+
+    def clear(self) -> None:
+        self._images.clear()
+        self._sizes.clear()
+        self.bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "images": len(self._images),
+            "bytes": self.bytes,
+            "budget_bytes": self.budget_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
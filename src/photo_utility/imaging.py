@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import BinaryIO, Union
+
+
+# Review photos are JPEG or PNG; these are tried first
+PHOTO_FORMATS = ("JPEG", "PNG")
+
+
+def load_pillow():
+    """Import Pillow on first use and return ``PIL.Image``, so startup does not pay for it."""
+    from PIL import Image
+
+    return Image
+
+
+def open_image(path: Union[str, Path, BinaryIO]):
+    """Image.open() trying only JPEG/PNG, falling back to every plugin for anything else (e.g. a known-bad GIF).
+
+    Without ``formats`` the first Image.open() that does not match the
+    handful of plugins Pillow loads up front imports every other plugin it
+    ships. Limiting the first attempt to the review formats skips that, and
+    leaves Pillow's own state alone for any other caller.
+    """
+    Image = load_pillow()
+    try:
+        return Image.open(path, formats=PHOTO_FORMATS)
+    except Image.UnidentifiedImageError:
+        return Image.open(path, formats=None)
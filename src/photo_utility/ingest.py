@@ -0,0 +1,154 @@
+"""Single-pass processing of downloaded photos.
+
+A downloaded body is kept in memory as one ``bytes`` object and handed to
+every consumer without copying: hashed through a memoryview, its EXIF head
+parsed, and decoded once (from a BytesIO sharing the buffer) to check it is
+readable, optionally compact it and make its review thumbnail. The photo is
+then written to disk once. Hashes and EXIF fields go to the folder's photo
+index, and the decode result to its integrity-check state, so later scans,
+validation and the review screen do not reopen and decode the photo again.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from . import profiling
+from .compaction import compact_size, encode_compact
+from .downloads import write_atomic
+from .exif_triage import MAX_TRIAGE_BYTES, parse_exif_head
+from .imaging import open_image
+from .scanner import PhotoState, is_fresh, load_photo_state, write_photo_state
+from .thumbnails import REVIEW_WIDTH, encode_thumbnail, thumbnail_path, thumbnail_size
+from .validation import JPEG_MAGIC, PNG_MAGIC, load_validation_state, write_validation_state
+
+
+INDEX_NAME = "photos.json"
+INDEX_VERSION = 1
+
+# Photo name -> [size, mtime_ns, sha256, exif fields]
+PhotoIndex = PhotoState
+
+# Download threads finish batches concurrently (e.g. "Load full photos" during a session)
+_record_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class IngestOptions:
+    thumbnail_width: Optional[int] = REVIEW_WIDTH
+    # (max_edge, quality) to compact photos to before they are written
+    compact: Optional[Tuple[int, int]] = None
+
+
+@dataclass(frozen=True)
+class IngestedPhoto:
+    path: Path
+    downloaded: int
+    size: int
+    mtime_ns: int
+    sha256: str
+    exif: Dict[str, str] = field(default_factory=dict)
+    thumbnail: Optional[Path] = None
+    # Why the photo cannot be shown, or None if it decoded cleanly
+    reason: Optional[str] = None
+
+
+def _decode_once(body: bytes, options: IngestOptions) -> Tuple[bytes, Optional[bytes]]:
+    """Decode ``body`` once; returns the bytes to store (compacted or not) and the thumbnail, if any"""
+    if body.startswith(PNG_MAGIC):
+        # Chunk CRCs are only checked by verify(), which needs its own parser
+        with open_image(io.BytesIO(body)) as check:
+            check.verify()
+    # BytesIO shares an exact bytes object instead of copying it
+    with open_image(io.BytesIO(body)) as img:
+        fmt, info = img.format, img.info
+        w, h = img.size
+        compact = compact_size(img, *options.compact) if options.compact else None
+        thumb = thumbnail_size(compact or (w, h), options.thumbnail_width) if options.thumbnail_width else None
+        if fmt == "JPEG":
+            # Decode at the largest size anything needs; 1/8 scale still reads every block
+            img.draft(img.mode, compact or thumb or (max(1, w // 8), max(1, h // 8)))
+        with profiling.span("decode"):
+            img.load()
+        data, decoded = body, img
+        if compact is not None:
+            encoded, decoded = encode_compact(img, fmt, info, compact, options.compact[1])
+            if len(encoded) < len(body):
+                data = encoded
+        thumb_bytes = encode_thumbnail(decoded, thumb) if thumb is not None else None
+    return data, thumb_bytes
+
+
+def ingest_photo(path: Path, body: bytes, options: Optional[IngestOptions] = None) -> IngestedPhoto:
+    """Hash, inspect and decode a downloaded photo once, then write it (and its thumbnail) to disk"""
+    options = options or IngestOptions()
+    view = memoryview(body)
+    sha256 = hashlib.sha256(view).hexdigest()
+    # Pillow's EXIF parser wants bytes; only the metadata head is copied
+    _, exif = parse_exif_head(bytes(view[:MAX_TRIAGE_BYTES]))
+    view.release()
+
+    data, thumb_bytes, reason = body, None, None
+    if not body:
+        reason = "empty file"
+    elif not (body.startswith(JPEG_MAGIC) or body.startswith(PNG_MAGIC)):
+        reason = "not a JPEG or PNG file"
+    else:
+        try:
+            with profiling.span("ingest"):
+                data, thumb_bytes = _decode_once(body, options)
+        except Exception as e:
+            reason = f"{type(e).__name__}: {e}"
+    # Photos that fail to decode are still kept, as downloaded, for inspection
+    write_atomic(path, data)
+    thumb = None
+    if thumb_bytes is not None:
+        # Written after the photo, so the cache sees it as up to date
+        thumb = thumbnail_path(path, options.thumbnail_width)
+        thumb.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(thumb, thumb_bytes)
+    st = path.stat()
+    return IngestedPhoto(path, len(body), st.st_size, st.st_mtime_ns, sha256, exif, thumb, reason)
+
+
+def load_photo_index(root: Path) -> PhotoIndex:
+    """Hashes and EXIF fields recorded for photos ingested into ``root``; empty if there are none"""
+    return load_photo_state(root, INDEX_NAME, INDEX_VERSION)
+
+
+def write_photo_index(root: Path, index: PhotoIndex) -> Path:
+    return write_photo_state(root, INDEX_NAME, INDEX_VERSION, index)
+
+
+def record_ingested(photos: Iterable[IngestedPhoto]) -> None:
+    """Add ingested photos to their folders' photo index and integrity-check state"""
+    by_root: Dict[Path, List[IngestedPhoto]] = {}
+    for photo in photos:
+        by_root.setdefault(photo.path.parent, []).append(photo)
+    with _record_lock:
+        for root, batch in by_root.items():
+            index = load_photo_index(root)
+            state = load_validation_state(root)
+            for photo in batch:
+                index[photo.path.name] = [photo.size, photo.mtime_ns, photo.sha256, photo.exif]
+                state[photo.path.name] = [photo.size, photo.mtime_ns, photo.reason]
+            write_photo_index(root, index)
+            write_validation_state(root, state)
+
+
+def duplicate_photos(root: Path) -> Dict[str, List[str]]:
+    """Photos in ``root`` with byte-identical content, as sha256 -> names (only hashes shared by 2+ photos)"""
+    by_hash: Dict[str, List[str]] = {}
+    for name, entry in load_photo_index(root).items():
+        try:
+            st = (root / name).stat()
+        except OSError:
+            continue
+        if is_fresh(entry, st):
+            by_hash.setdefault(entry[2], []).append(name)
+    return {sha256: sorted(names) for sha256, names in by_hash.items() if len(names) > 1}
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import queue
+import threading
+import traceback
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+from .scheduler import DOWNLOAD_WORKERS, ThroughputReport
+from .session import RemotePhotos, plan_sampled_downloads
+
+if TYPE_CHECKING:
+    from .ingest import IngestOptions
+
+
+class BackgroundTask:
+    """Runs ``work(task)`` on a daemon thread and hands results back through a queue.
+
+    Tk widgets may only be touched from the main thread, so the worker never
+    calls back into the GUI; it posts ``(kind, payload)`` events with ``post``
+    and the GUI drains them from an ``after()`` poll. The task always ends with
+    a ``"done"`` event carrying the return value of ``work``, or an ``"error"``
+    event carrying ``(exception, traceback text)``.
+    """
+
+    def __init__(self, work: Callable[["BackgroundTask"], object], name: str = "background-task") -> None:
+        self.events: "queue.Queue[Tuple[str, object]]" = queue.Queue()
+        self.cancel_event = threading.Event()
+        self._work = work
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self) -> "BackgroundTask":
+        self._thread.start()
+        return self
+
+    def cancel(self) -> None:
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def is_alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def post(self, kind: str, payload: object = None) -> None:
+        self.events.put((kind, payload))
+
+    def progress(self, done: int, total: int) -> None:
+        """``(done, total)`` callback that posts a ``"progress"`` event"""
+        self.post("progress", (done, total))
+
+    def drain(self, max_events: int = 200) -> List[Tuple[str, object]]:
+        """Pop up to ``max_events`` pending events without blocking"""
+        events = []
+        while len(events) < max_events:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
+    def _run(self) -> None:
+        try:
+            result = self._work(self)
+        except Exception as e:
+            self.post("error", (e, traceback.format_exc()))
+        else:
+            self.post("done", result)
+
+
+def stream_sampled_visits(
+    task: BackgroundTask,
+    selected_visits: List[dict],
+    remaining: list,
+    remote: RemotePhotos,
+    auth: Tuple[str, str],
+    headroom_percent: float,
+    stats: Optional[ThroughputReport] = None,
+    triage: bool = False,
+    workers: int = DOWNLOAD_WORKERS,
+    ingest: Optional[IngestOptions] = None,
+) -> int:
+    """Download the sampled visits, posting each one as a ``"visit"`` event once all its photos are in.
+
+    Each event payload is ``(visit, {path: TriageResult})``. Photos that failed
+    are dropped from their visit, and a visit whose photos all failed is
+    replaced by the next headroom spare that is ready, so at most
+    ``len(selected_visits)`` visits are posted. Download counts are posted as
+    ``"progress"`` events. ``ingest`` is passed on to download_attachments.
+    Returns the number of visits posted.
+    """
+    from .commcare import download_attachments
+
+    candidates, jobs = plan_sampled_downloads(selected_visits, remaining, remote, headroom_percent)
+    wanted = len(selected_visits)
+    # Visit index -> photo paths still downloading, and the photos that made it
+    pending: Dict[int, set] = {}
+    ready_photos: Dict[int, list] = {i: [] for i in range(len(candidates))}
+    owner: Dict[Path, int] = {}
+    triaged: Dict[int, dict] = {i: {} for i in range(len(candidates))}
+    for i, visit in enumerate(candidates):
+        for meta in visit["photos"]:
+            if meta.filepath in remote and not meta.filepath.exists():
+                pending.setdefault(i, set()).add(meta.filepath)
+                owner[meta.filepath] = i
+            elif meta.filepath.exists():
+                ready_photos[i].append(meta)
+
+    state = {"posted": 0, "owed": 0}
+    spares: List[int] = []
+
+    def post_visit(i: int) -> None:
+        if state["posted"] >= wanted:
+            return
+        visit = candidates[i]
+        # Keep the visit's original photo order
+        keep = {m.filepath for m in ready_photos[i]}
+        visit["photos"] = [m for m in visit["photos"] if m.filepath in keep]
+        task.post("visit", (visit, triaged[i]))
+        state["posted"] += 1
+
+    def finish_visit(i: int) -> None:
+        is_spare = i >= wanted
+        if not ready_photos[i]:
+            if not is_spare:
+                # A sampled visit came up empty; a ready spare takes its place
+                if spares:
+                    post_visit(spares.pop(0))
+                else:
+                    state["owed"] += 1
+            return
+        if not is_spare:
+            post_visit(i)
+        elif state["owed"]:
+            state["owed"] -= 1
+            post_visit(i)
+        else:
+            spares.append(i)
+
+    # Visits with nothing to download are ready straight away
+    for i in range(len(candidates)):
+        if i not in pending:
+            finish_visit(i)
+
+    def on_photo(file_path: Path, ok: bool, result) -> None:
+        i = owner[file_path]
+        if ok:
+            meta = next(m for m in candidates[i]["photos"] if m.filepath == file_path)
+            ready_photos[i].append(meta)
+            if result is not None and not result.full_download:
+                triaged[i][file_path] = result
+        pending[i].discard(file_path)
+        if not pending[i]:
+            finish_visit(i)
+
+    if jobs:
+        username, api_key = auth
+        download_attachments(jobs, username, api_key, stats, triage=triage, workers=workers,
+                             progress=task.progress, on_photo=on_photo, cancel=task.cancel_event,
+                             ingest=ingest)
+    return state["posted"]
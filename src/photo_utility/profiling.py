@@ -0,0 +1,223 @@
+"""Named timing spans and the ``--profile`` report.
+
+Code wraps interesting stages in ``with span("download.attachment"):``. While
+profiling is off, ``span`` returns a shared no-op context manager, so the
+instrumentation costs a function call. ``enable()`` switches it on
+for the rest of the process; ``write_report()`` writes per-span counts, totals,
+percentiles and a latency histogram as JSON.
+
+With ``capture="cprofile"`` or ``"tracemalloc"`` the slowest occurrence of
+each span is also profiled, and the report includes the profile of the span
+with the largest total time. Only one span is captured at a time, so nested
+or concurrent spans are captured on a best-effort basis.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import io
+import json
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+CAPTURE_MODES = ("cprofile", "tracemalloc")
+
+# Upper bounds (ms) of the report's latency histogram buckets
+HISTOGRAM_BOUNDS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+# Lines of cProfile / tracemalloc output kept for the worst span
+CAPTURE_LINES = 25
+
+_NULL_SPAN = contextlib.nullcontext()
+_profiler: Optional["Profiler"] = None
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted ``values``"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(pct / 100.0 * len(values))) - 1))
+    return values[index]
+
+
+class _Span:
+    __slots__ = ("profiler", "name", "started", "capture")
+
+    def __init__(self, profiler: "Profiler", name: str) -> None:
+        self.profiler = profiler
+        self.name = name
+        self.capture = None
+
+    def __enter__(self) -> None:
+        self.capture = self.profiler._start_capture()
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc) -> None:
+        elapsed = time.perf_counter() - self.started
+        self.profiler._record(self.name, elapsed, self.capture)
+
+
+class Profiler:
+    """Collects span durations from any thread"""
+
+    def __init__(self, capture: Optional[str] = None) -> None:
+        if capture is not None and capture not in CAPTURE_MODES:
+            raise ValueError(f"Unknown capture mode: {capture}")
+        self.capture = capture
+        self.started = time.perf_counter()
+        self.started_at = datetime.now()
+        self._lock = threading.Lock()
+        self._durations: Dict[str, List[float]] = {}
+        # Span name -> (seconds, capture output) of its slowest captured occurrence
+        self._slowest: Dict[str, tuple] = {}
+        self._capturing = False
+        if capture == "tracemalloc":
+            import tracemalloc
+
+            tracemalloc.start()
+
+    def span(self, name: str) -> _Span:
+        return _Span(self, name)
+
+    def _start_capture(self):
+        if self.capture is None:
+            return None
+        with self._lock:
+            if self._capturing:
+                return None
+            self._capturing = True
+        try:
+            if self.capture == "cprofile":
+                import cProfile
+
+                prof = cProfile.Profile()
+                prof.enable()
+                return prof
+            import tracemalloc
+
+            return tracemalloc.take_snapshot()
+        except (ValueError, RuntimeError):
+            # Another profiler is already active on this interpreter
+            with self._lock:
+                self._capturing = False
+            return None
+
+    def _finish_capture(self, capture, name: str, seconds: float):
+        if self.capture == "cprofile":
+            capture.disable()
+        else:
+            import tracemalloc
+
+            ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+            after = tracemalloc.take_snapshot().filter_traces(ignore)
+            diff = after.compare_to(capture.filter_traces(ignore), "lineno")
+            capture = [stat for stat in diff if stat.size_diff][:CAPTURE_LINES]
+        with self._lock:
+            self._capturing = False
+            slowest = self._slowest.get(name)
+            if slowest is None or seconds > slowest[0]:
+                self._slowest[name] = (seconds, capture)
+
+    def _record(self, name: str, seconds: float, capture) -> None:
+        if capture is not None:
+            self._finish_capture(capture, name, seconds)
+        with self._lock:
+            durations = self._durations.get(name)
+            if durations is None:
+                durations = self._durations[name] = []
+            durations.append(seconds)
+
+    def summary(self) -> Dict[str, dict]:
+        """Per-span count, total, mean, p50/p95/p99, max and histogram, in milliseconds"""
+        with self._lock:
+            snapshot = {name: sorted(values) for name, values in self._durations.items()}
+        spans = {}
+        for name, values in sorted(snapshot.items()):
+            ms = [v * 1000.0 for v in values]
+            histogram = {f"<={bound}ms": 0 for bound in HISTOGRAM_BOUNDS_MS}
+            histogram[f">{HISTOGRAM_BOUNDS_MS[-1]}ms"] = 0
+            for value in ms:
+                for bound in HISTOGRAM_BOUNDS_MS:
+                    if value <= bound:
+                        histogram[f"<={bound}ms"] += 1
+                        break
+                else:
+                    histogram[f">{HISTOGRAM_BOUNDS_MS[-1]}ms"] += 1
+            spans[name] = {
+                "count": len(ms),
+                "total_ms": round(sum(ms), 3),
+                "mean_ms": round(sum(ms) / len(ms), 3),
+                "p50_ms": round(percentile(ms, 50), 3),
+                "p95_ms": round(percentile(ms, 95), 3),
+                "p99_ms": round(percentile(ms, 99), 3),
+                "max_ms": round(ms[-1], 3),
+                "histogram": histogram,
+            }
+        return spans
+
+    def report(self, capture_path: Optional[Path] = None) -> dict:
+        spans = self.summary()
+        report = {
+            "started": self.started_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "wall_seconds": round(time.perf_counter() - self.started, 3),
+            "capture": self.capture,
+            "spans": spans,
+        }
+        worst = max(spans, key=lambda name: spans[name]["total_ms"], default=None)
+        if worst is not None and worst in self._slowest:
+            seconds, capture = self._slowest[worst]
+            detail = {"span": worst, "occurrence_ms": round(seconds * 1000.0, 3)}
+            if self.capture == "cprofile":
+                import pstats
+
+                text = io.StringIO()
+                stats = pstats.Stats(capture, stream=text)
+                stats.sort_stats("cumulative").print_stats(CAPTURE_LINES)
+                detail["cprofile"] = [line for line in text.getvalue().splitlines() if line.strip()]
+                if capture_path is not None:
+                    stats.dump_stats(str(capture_path))
+                    detail["pstats_file"] = str(capture_path)
+            else:
+                detail["tracemalloc"] = [str(stat) for stat in capture]
+            report["worst_span"] = detail
+        return report
+
+
+def enable(capture: Optional[str] = None) -> Profiler:
+    """Start collecting spans for the rest of the process"""
+    global _profiler
+    _profiler = Profiler(capture)
+    return _profiler
+
+
+def active() -> Optional[Profiler]:
+    return _profiler
+
+
+def span(name: str):
+    """Context manager timing ``name``; a shared no-op unless profiling is enabled"""
+    profiler = _profiler
+    if profiler is None:
+        return _NULL_SPAN
+    return profiler.span(name)
+
+
+def record(name: str, seconds: float) -> None:
+    """Add a duration timed by the caller, for stages a ``with`` block cannot wrap (e.g. generator batches)"""
+    profiler = _profiler
+    if profiler is not None:
+        profiler._record(name, seconds, None)
+
+
+def write_report(path: Path) -> Optional[dict]:
+    """Write the active profiler's report to ``path`` (cProfile data goes next to it as .prof)"""
+    if _profiler is None:
+        return None
+    path = Path(path)
+    capture_path = path.with_suffix(".prof") if _profiler.capture == "cprofile" else None
+    report = _profiler.report(capture_path)
+    path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return report
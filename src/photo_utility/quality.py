@@ -0,0 +1,241 @@
+"""Image quality signals for pre-screening photos before human review.
+
+Every photo is reduced to a 128x128 RGB sample (from its review thumbnail
+when one is cached, else with JPEG draft decoding). Stacks of samples are
+measured in vectorized NumPy passes:
+
+- brightness: mean luma (0-255); black frames and covered lenses are dark
+- contrast: luma standard deviation; blank frames have almost none
+- blur: variance of the luma Laplacian; out-of-focus photos have little edge energy
+- entropy: Shannon entropy (bits) of a 512-colour histogram; flat frames use few colours
+
+Signals are cached per folder in the cache folder, keyed by size and mtime
+like the integrity check, and rules turn them into flags ("dark", "blank",
+"blurry", "flat"). Visits whose photos are all flagged can be put in a
+bucket automatically, so reviewers only see the ambiguous ones.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from . import profiling
+from .imaging import open_image
+from .scanner import PhotoState, is_fresh, load_photo_state, write_photo_state
+from .thumbnails import cached_thumbnail
+
+
+QUALITY_NAME = "quality.json"
+QUALITY_VERSION = 1
+QUALITY_SIZE = 128
+# Photos measured as one stack by a worker
+QUALITY_STACK = 64
+# Photos handed to the process pool between cancel checks
+QUALITY_BATCH = 2048
+
+SIGNALS = ("brightness", "contrast", "blur", "entropy")
+
+# brightness, contrast, blur, entropy
+Signals = Tuple[float, float, float, float]
+# Photo name -> [size, mtime_ns, signals]; signals is None for photos that could not be read
+QualityState = PhotoState
+
+
+@dataclass(frozen=True)
+class QualityRule:
+    """Flag a photo as ``flag`` when ``signal`` is below ``below``"""
+
+    flag: str
+    signal: str
+    below: float
+
+
+DEFAULT_RULES = (
+    QualityRule("dark", "brightness", 35.0),
+    QualityRule("blank", "contrast", 10.0),
+    QualityRule("blurry", "blur", 25.0),
+    QualityRule("flat", "entropy", 3.0),
+)
+
+
+def compute_signals(stack):
+    """Signals for a uint8 stack of shape (photos, height, width, 3), as a float array of shape (photos, 4)"""
+    import numpy as np
+
+    pixels = stack.astype(np.float32)
+    luma = pixels @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    brightness = luma.mean(axis=(1, 2))
+    contrast = luma.std(axis=(1, 2))
+    laplacian = (
+        luma[:, :-2, 1:-1] + luma[:, 2:, 1:-1] + luma[:, 1:-1, :-2] + luma[:, 1:-1, 2:]
+        - 4.0 * luma[:, 1:-1, 1:-1]
+    )
+    blur = laplacian.var(axis=(1, 2))
+
+    # 3 bits per channel: one bincount over every photo, offset so each gets its own 512 bins
+    count, height, width, _ = stack.shape
+    bins = stack >> 5
+    colours = (bins[..., 0].astype(np.int32) << 6) | (bins[..., 1].astype(np.int32) << 3) | bins[..., 2]
+    colours = colours.reshape(count, height * width) + (np.arange(count, dtype=np.int32) * 512)[:, None]
+    histogram = np.bincount(colours.ravel(), minlength=count * 512).reshape(count, 512) / float(height * width)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        entropy = np.where(histogram > 0, -histogram * np.log2(histogram), 0.0).sum(axis=1)
+    return np.stack([brightness, contrast, blur, entropy], axis=1)
+
+
+def load_sample(photo: Path):
+    """``photo`` reduced to a QUALITY_SIZE square RGB array"""
+    import numpy as np
+
+    from .imaging import load_pillow
+
+    Image = load_pillow()
+    with open_image(cached_thumbnail(photo) or photo) as img:
+        if img.format == "JPEG":
+            img.draft("RGB", (QUALITY_SIZE, QUALITY_SIZE))
+        img = img.convert("RGB").resize((QUALITY_SIZE, QUALITY_SIZE), Image.BILINEAR, reducing_gap=2.0)
+    return np.asarray(img, dtype=np.uint8)
+
+
+def _analyze_job(paths: List[str]) -> List[Optional[Signals]]:
+    import numpy as np
+
+    samples, readable = [], []
+    for n, path in enumerate(paths):
+        try:
+            samples.append(load_sample(Path(path)))
+            readable.append(n)
+        except Exception:
+            continue
+    results: List[Optional[Signals]] = [None] * len(paths)
+    if samples:
+        signals = compute_signals(np.stack(samples))
+        for n, row in zip(readable, signals.tolist()):
+            results[n] = tuple(round(value, 3) for value in row)
+    return results
+
+
+def load_quality_state(root: Path) -> QualityState:
+    """Signals measured earlier in ``root``; empty if there are none"""
+    return load_photo_state(root, QUALITY_NAME, QUALITY_VERSION)
+
+
+def write_quality_state(root: Path, state: QualityState) -> Path:
+    return write_photo_state(root, QUALITY_NAME, QUALITY_VERSION, state)
+
+
+def cached_signals(photos: Iterable[Path]) -> Dict[Path, Signals]:
+    """Signals already measured for ``photos`` that have not changed since; nothing is decoded"""
+    states: Dict[Path, QualityState] = {}
+    signals = {}
+    for photo in photos:
+        root = photo.parent
+        if root not in states:
+            states[root] = load_quality_state(root)
+        known = states[root].get(photo.name)
+        if known is None or known[2] is None:
+            continue
+        try:
+            st = photo.stat()
+        except OSError:
+            continue
+        if is_fresh(known, st):
+            signals[photo] = tuple(known[2])
+    return signals
+
+
+def analyze_photos(
+    photos: Iterable[Path],
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+    cancel: Optional[threading.Event] = None,
+) -> Tuple[Dict[Path, Signals], int]:
+    """Measure ``photos`` in a process pool, reusing signals cached for unchanged photos.
+
+    Returns ``({path: signals}`` for every readable photo, number measured
+    this time). ``progress(done, total)`` counts the photos that needed
+    measuring. Setting ``cancel`` stops after the current batch; results so
+    far are still saved.
+    """
+    states: Dict[Path, QualityState] = {}
+    requested: List[Path] = []
+    pending: List[Tuple[Path, int, int]] = []
+    for photo in photos:
+        root = photo.parent
+        if root not in states:
+            states[root] = load_quality_state(root)
+        try:
+            st = photo.stat()
+        except OSError:
+            continue
+        requested.append(photo)
+        if is_fresh(states[root].get(photo.name), st):
+            continue
+        pending.append((photo, st.st_size, st.st_mtime_ns))
+
+    measured = 0
+    if pending:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with profiling.span("prescreen"), ProcessPoolExecutor(max_workers=workers) as pool:
+            for start in range(0, len(pending), QUALITY_BATCH):
+                if cancel is not None and cancel.is_set():
+                    break
+                batch = pending[start:start + QUALITY_BATCH]
+                stacks = [batch[i:i + QUALITY_STACK] for i in range(0, len(batch), QUALITY_STACK)]
+                jobs = [[str(photo) for photo, _, _ in stack] for stack in stacks]
+                for stack, results in zip(stacks, pool.map(_analyze_job, jobs)):
+                    for (photo, size, mtime_ns), signals in zip(stack, results):
+                        states[photo.parent][photo.name] = [size, mtime_ns, signals]
+                    measured += len(stack)
+                    if progress is not None:
+                        progress(measured, len(pending))
+        for root, state in states.items():
+            write_quality_state(root, state)
+
+    signals = {}
+    for photo in requested:
+        known = states[photo.parent].get(photo.name)
+        if known is not None and known[2] is not None:
+            signals[photo] = tuple(known[2])
+    return signals, measured
+
+
+def photo_flags(signals: Signals, rules: Sequence[QualityRule] = DEFAULT_RULES) -> List[str]:
+    """The flags ``rules`` raise for one photo's signals"""
+    values = dict(zip(SIGNALS, signals))
+    return [rule.flag for rule in rules if values[rule.signal] < rule.below]
+
+
+def prescreen_visits(
+    visits: List[dict],
+    signals: Dict[Path, Signals],
+    rules: Sequence[QualityRule] = DEFAULT_RULES,
+    bucket: Optional[str] = None,
+) -> int:
+    """Record each visit's photo flags as ``visit["prescreen"]``; returns how many visits had every photo flagged.
+
+    With ``bucket``, those visits also get ``visit["auto_bucket"]`` and are
+    left out of human review. Known-bad visits are never auto-bucketed, so
+    they still test the reviewer.
+    """
+    flagged = 0
+    for visit in visits:
+        flags: Dict[str, List[str]] = {}
+        all_flagged = bool(visit["photos"])
+        for meta in visit["photos"]:
+            values = signals.get(meta.filepath)
+            photo = photo_flags(values, rules) if values is not None else []
+            if photo:
+                flags[meta.filename] = photo
+            else:
+                all_flagged = False
+        visit["prescreen"] = flags
+        if all_flagged and not visit.get("is_known_bad", False):
+            flagged += 1
+            if bucket:
+                visit["auto_bucket"] = bucket
+    return flagged
@@ -0,0 +1,157 @@
+"""Forms reviewed in earlier sessions, so new sessions do not sample them again.
+
+The index keeps a 64-bit fingerprint (BLAKE2b) of every reviewed form ID in
+one sorted array: 8 bytes a form, looked up by binary search. A Bloom
+filter would be smaller still, but its false positives would silently keep
+unreviewed forms out of every future sample; two form IDs only share a
+64-bit fingerprint once there are billions of them. Layout, all integers
+little-endian::
+
+    header        magic, version, fingerprint count, sources length
+    fingerprints  sorted, 8 bytes each
+    sources       JSON: results CSV path -> [size, mtime_ns] of each CSV read
+
+It is fed from review results CSVs: the app adds each export as it saves
+it, and the ``reviewed`` batch command adds older ones. A CSV is only read
+again if it changes.
+"""
+
+from __future__ import annotations
+
+import csv
+import hashlib
+import heapq
+import json
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Container, Dict, Iterable, List, Tuple
+
+from .filenames import PhotoMeta
+
+
+# Lives next to app_settings.txt and form_cache.sqlite3 in the working directory
+DEFAULT_REVIEWED_PATH = Path("reviewed_forms.idx")
+REVIEWED_MAGIC = b"PRREVIEW"
+REVIEWED_VERSION = 1
+REVIEWED_HEADER = struct.Struct("<8sIQQ")
+RESULTS_GLOB = "review_results_*.csv"
+
+
+def form_fingerprint(form_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(form_id.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def reviewed_form_ids(results_csv: Path) -> List[str]:
+    """Form IDs with a decision in a review results CSV; known-bad inserts are not forms"""
+    form_ids = []
+    with open(results_csv, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if str(row.get("is_known_bad", "")).strip().lower() == "true":
+                continue
+            form_id = (row.get("form_id") or "").strip()
+            if form_id:
+                form_ids.append(form_id)
+    return form_ids
+
+
+def results_files(paths: Iterable[Path]) -> List[Path]:
+    """``paths`` with directories replaced by the review results CSVs in them"""
+    files = []
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            files.extend(sorted(path.glob(RESULTS_GLOB)))
+        else:
+            files.append(path)
+    return files
+
+
+class ReviewedIndex:
+    """Fingerprints of reviewed form IDs; ``form_id in index`` says whether a form was reviewed before"""
+
+    def __init__(self, path: Path = DEFAULT_REVIEWED_PATH) -> None:
+        self.path = Path(path)
+        self._fingerprints = array("Q")
+        # Results CSV (resolved path) -> [size, mtime_ns] when it was read
+        self.sources: Dict[str, list] = {}
+        if self.path.exists():
+            self._load()
+
+    def _load(self) -> None:
+        data = self.path.read_bytes()
+        if len(data) < REVIEWED_HEADER.size:
+            raise ValueError(f"{self.path.name} is not a reviewed-forms index")
+        magic, version, count, sources_length = REVIEWED_HEADER.unpack_from(data, 0)
+        if magic != REVIEWED_MAGIC:
+            raise ValueError(f"{self.path.name} is not a reviewed-forms index")
+        if version != REVIEWED_VERSION:
+            raise ValueError(f"Unsupported reviewed-forms index version: {version}")
+        end = REVIEWED_HEADER.size + count * 8
+        if end + sources_length > len(data):
+            raise ValueError(f"{self.path.name} is truncated")
+        self._fingerprints.frombytes(data[REVIEWED_HEADER.size:end])
+        if sys.byteorder != "little":
+            self._fingerprints.byteswap()
+        self.sources = json.loads(data[end:end + sources_length]) if sources_length else {}
+
+    def __len__(self) -> int:
+        return len(self._fingerprints)
+
+    def __contains__(self, form_id: object) -> bool:
+        if not isinstance(form_id, str):
+            return False
+        value = form_fingerprint(form_id)
+        n = bisect_left(self._fingerprints, value)
+        return n < len(self._fingerprints) and self._fingerprints[n] == value
+
+    def add(self, form_ids: Iterable[str]) -> int:
+        """Add ``form_ids``; returns how many were new"""
+        new = sorted({form_fingerprint(form_id) for form_id in form_ids if form_id not in self})
+        if new:
+            # Both runs are sorted, so merging keeps the array sorted without re-sorting it
+            self._fingerprints = array("Q", heapq.merge(self._fingerprints, new))
+        return len(new)
+
+    def add_results(self, paths: Iterable[Path]) -> Tuple[int, int]:
+        """Add the forms of review results CSVs not read before (or changed since); returns (CSVs read, forms added)"""
+        read = added = 0
+        for path in paths:
+            st = Path(path).stat()
+            key = str(Path(path).resolve())
+            if self.sources.get(key) == [st.st_size, st.st_mtime_ns]:
+                continue
+            added += self.add(reviewed_form_ids(Path(path)))
+            self.sources[key] = [st.st_size, st.st_mtime_ns]
+            read += 1
+        return read, added
+
+    def save(self) -> Path:
+        fingerprints = array("Q", self._fingerprints)
+        if sys.byteorder != "little":
+            fingerprints.byteswap()
+        sources = json.dumps(self.sources, separators=(",", ":")).encode("utf-8")
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            f.write(REVIEWED_HEADER.pack(REVIEWED_MAGIC, REVIEWED_VERSION, len(fingerprints), len(sources)))
+            f.write(fingerprints.tobytes())
+            f.write(sources)
+        os.replace(tmp, self.path)
+        return self.path
+
+
+def drop_reviewed(metas: List[PhotoMeta], reviewed: Container[str]) -> Tuple[List[PhotoMeta], int]:
+    """``metas`` without the photos of forms in ``reviewed``, and how many forms were dropped"""
+    kept = []
+    # Form ID -> reviewed; each form is looked up once however many photos it has
+    seen: Dict[str, bool] = {}
+    for meta in metas:
+        skip = seen.get(meta.form_id)
+        if skip is None:
+            skip = seen[meta.form_id] = meta.form_id in reviewed
+        if not skip:
+            kept.append(meta)
+    return kept, sum(seen.values())
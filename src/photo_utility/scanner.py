@@ -1,35 +1,166 @@
 from __future__ import annotations
 
+import json
+import os
+import time
 from collections import defaultdict
 from pathlib import Path
-from typing import Dict, Iterable, List, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
-from .filenames import is_image_file, parse_commcare_filename, PhotoMeta
+from . import profiling
+from .filenames import IMAGE_EXTENSIONS, parse_commcare_filename, PhotoMeta
 
 
 def scan_directory_for_photos(root: Path) -> Tuple[List[PhotoMeta], List[Path]]:
     valid: List[PhotoMeta] = []
     invalid: List[Path] = []
-    for path in root.iterdir():
-        if not is_image_file(path):
-            continue
-        meta = parse_commcare_filename(path)
-        if meta is None:
-            invalid.append(path)
-        else:
-            valid.append(meta)
+    for valid_batch, invalid_batch in scan_directory_batches(root):
+        valid.extend(valid_batch)
+        invalid.extend(invalid_batch)
     return valid, invalid
 
 
+def scan_directory_batches(root: Path, batch_size: int = 1000) -> Iterator[Tuple[List[PhotoMeta], List[Path]]]:
+    """Yield ``(valid, invalid)`` batches of at most ``batch_size`` photos as ``root`` is read.
+
+    Uses os.scandir so the file check comes from the directory listing rather
+    than a stat per file; callers can show results before the scan finishes.
+    """
+    valid: List[PhotoMeta] = []
+    invalid: List[Path] = []
+    # Timed per batch, excluding the time the caller spends on each yielded batch
+    started = time.perf_counter()
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if not entry.is_file() or os.path.splitext(entry.name)[1].lower().lstrip(".") not in IMAGE_EXTENSIONS:
+                continue
+            path = Path(entry.path)
+            meta = parse_commcare_filename(path)
+            if meta is None:
+                invalid.append(path)
+            else:
+                valid.append(meta)
+            if len(valid) + len(invalid) >= batch_size:
+                profiling.record("scan.batch", time.perf_counter() - started)
+                yield valid, invalid
+                valid, invalid = [], []
+                started = time.perf_counter()
+    if valid or invalid:
+        profiling.record("scan.batch", time.perf_counter() - started)
+        yield valid, invalid
+
+
 def group_by_question_id(metas: Iterable[PhotoMeta]) -> Dict[str, List[PhotoMeta]]:
     groups: Dict[str, List[PhotoMeta]] = defaultdict(list)
-    for meta in metas:
-        groups[meta.question_id].append(meta)
+    with profiling.span("group"):
+        for meta in metas:
+            groups[meta.question_id].append(meta)
     return groups
 
 
 def group_by_form_id(metas: Iterable[PhotoMeta]) -> Dict[str, List[PhotoMeta]]:
     groups: Dict[str, List[PhotoMeta]] = defaultdict(list)
-    for meta in metas:
-        groups[meta.form_id].append(meta)
+    with profiling.span("group"):
+        for meta in metas:
+            groups[meta.form_id].append(meta)
     return groups
+
+
+# Per-directory cache folder for scan manifests and review thumbnails. It is a
+# directory, so the scanner's is_file() check never treats it as a photo.
+CACHE_DIR_NAME = ".photo_review"
+SCAN_MANIFEST_NAME = "manifest.json"
+SCAN_MANIFEST_VERSION = 1
+
+# Per-photo state kept in the cache folder (integrity checks, ingest index,
+# quality signals, hashes): photo name -> [size, mtime_ns, *values]. An entry
+# only holds while the photo's size and mtime still match.
+PhotoState = Dict[str, list]
+
+
+def load_photo_state(root: Path, name: str, version: int) -> PhotoState:
+    """The entries of state file ``name`` in ``root``'s cache folder; empty if there is none or it has another version"""
+    try:
+        state = json.loads((root / CACHE_DIR_NAME / name).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if state.get("version") != version:
+        return {}
+    return state.get("photos", {})
+
+
+def write_photo_state(root: Path, name: str, version: int, state: PhotoState) -> Path:
+    path = root / CACHE_DIR_NAME / name
+    path.parent.mkdir(exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"version": version, "photos": state}, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, path)
+    return path
+
+
+def is_fresh(entry: Optional[list], st: os.stat_result) -> bool:
+    """Whether a state entry was recorded for the file as it is now (``st`` is its current stat)"""
+    return entry is not None and entry[0] == st.st_size and entry[1] == st.st_mtime_ns
+
+
+def scan_manifest_path(root: Path) -> Path:
+    return root / CACHE_DIR_NAME / SCAN_MANIFEST_NAME
+
+
+def write_scan_manifest(root: Path, valid: List[PhotoMeta], invalid: List[Path]) -> Path:
+    """Record a scan of ``root`` so later runs can skip listing and parsing the directory.
+
+    The cache folder is created before the directory's mtime is read, so only
+    adding, removing or renaming photos afterwards makes the manifest stale.
+    """
+    cache_dir = root / CACHE_DIR_NAME
+    cache_dir.mkdir(exist_ok=True)
+    manifest = {
+        "version": SCAN_MANIFEST_VERSION,
+        "dir_mtime_ns": root.stat().st_mtime_ns,
+        "photos": [
+            [m.filename, m.json_block, m.question_id, m.user_id, m.form_id, m.extension]
+            for m in valid
+        ],
+        "invalid": [p.name for p in invalid],
+    }
+    path = scan_manifest_path(root)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, path)
+    return path
+
+
+def load_scan_manifest(root: Path) -> Optional[Tuple[List[PhotoMeta], List[Path]]]:
+    """Return the recorded scan of ``root``, or None if there is none or the directory changed since."""
+    path = scan_manifest_path(root)
+    try:
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+        if manifest.get("version") != SCAN_MANIFEST_VERSION:
+            return None
+        if manifest.get("dir_mtime_ns") != root.stat().st_mtime_ns:
+            return None
+    except (OSError, ValueError):
+        return None
+    valid = [
+        PhotoMeta(
+            json_block=json_block,
+            question_id=question_id,
+            user_id=user_id,
+            form_id=form_id,
+            extension=extension,
+            filename=filename,
+            filepath=root / filename,
+        )
+        for filename, json_block, question_id, user_id, form_id, extension in manifest["photos"]
+    ]
+    invalid = [root / name for name in manifest.get("invalid", [])]
+    return valid, invalid
+
+
+def scan_directory_cached(root: Path) -> Tuple[List[PhotoMeta], List[Path]]:
+    """Like scan_directory_for_photos, but reuses a fresh scan manifest (e.g. one written by the batch CLI)."""
+    cached = load_scan_manifest(root)
+    if cached is not None:
+        return cached
+    return scan_directory_for_photos(root)
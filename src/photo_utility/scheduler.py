@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Tuple, TypeVar
+
+
+T = TypeVar("T")
+
+# Concurrent List Forms requests (one per domain/app pair at most)
+FETCH_WORKERS = 4
+# Shared pool for attachment downloads across every domain
+DOWNLOAD_WORKERS = 8
+
+
+def round_robin(queues: Dict[str, Iterable[T]]) -> Iterator[Tuple[str, T]]:
+    """Yield ``(key, item)`` taking one item from each queue in turn.
+
+    Submitting jobs to a FIFO worker pool in this order gives every domain an
+    equal share of the workers, so one huge domain cannot starve the rest.
+    """
+    active = deque((key, iter(items)) for key, items in queues.items())
+    while active:
+        key, it = active.popleft()
+        try:
+            item = next(it)
+        except StopIteration:
+            continue
+        yield key, item
+        active.append((key, it))
+
+
+@dataclass
+class DomainStats:
+    domain: str
+    forms: int = 0
+    fetch_seconds: float = 0.0
+    photos: int = 0
+    failed: int = 0
+    bytes: int = 0
+    first_start: float = 0.0
+    last_finish: float = 0.0
+
+    @property
+    def download_seconds(self) -> float:
+        if not self.first_start:
+            return 0.0
+        return max(self.last_finish - self.first_start, 0.0)
+
+
+class ThroughputReport:
+    """Thread-safe per-domain counters for form fetches and attachment downloads."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stats: Dict[str, DomainStats] = {}
+
+    def _get(self, domain: str) -> DomainStats:
+        stats = self._stats.get(domain)
+        if stats is None:
+            stats = self._stats[domain] = DomainStats(domain)
+        return stats
+
+    def record_fetch(self, domain: str, forms: int, seconds: float) -> None:
+        with self._lock:
+            stats = self._get(domain)
+            stats.forms += forms
+            stats.fetch_seconds += seconds
+
+    def record_download(self, domain: str, started: float, size: int, ok: bool = True) -> None:
+        finished = time.perf_counter()
+        with self._lock:
+            stats = self._get(domain)
+            if ok:
+                stats.photos += 1
+                stats.bytes += size
+            else:
+                stats.failed += 1
+            if not stats.first_start or started < stats.first_start:
+                stats.first_start = started
+            stats.last_finish = max(stats.last_finish, finished)
+
+    def domains(self) -> List[DomainStats]:
+        with self._lock:
+            return sorted(self._stats.values(), key=lambda s: s.domain)
+
+    def summary_lines(self) -> List[str]:
+        lines = []
+        for s in self.domains():
+            seconds = s.download_seconds
+            photo_rate = s.photos / seconds if seconds else 0.0
+            kb_rate = s.bytes / 1024 / seconds if seconds else 0.0
+            lines.append(
+                f"{s.domain}: {s.forms} forms in {s.fetch_seconds:.1f}s, "
+                f"{s.photos} photos ({s.failed} failed, {s.bytes / 1024:.0f} KB) in {seconds:.1f}s "
+                f"= {photo_rate:.1f} photos/s, {kb_rate:.0f} KB/s"
+            )
+        return lines
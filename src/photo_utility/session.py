@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import json
+import math
+import random
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from . import profiling
+from .debug import debug_print
+from .filenames import PhotoMeta, parse_commcare_filename
+from .forms import AttachmentRecord, FormRecord, attachment_filename, fallback_question_name, split_question_path
+
+
+# API photos land in a fresh session folder under here
+DOWNLOAD_ROOT = Path("downloaded_photos")
+SESSION_MANIFEST_VERSION = 1
+
+# Indexed photo path -> the form and attachment it is downloaded from
+RemotePhotos = Dict[Path, Tuple[FormRecord, AttachmentRecord]]
+
+
+def new_download_dir(root: Path = DOWNLOAD_ROOT) -> Path:
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return root / f"session_{timestamp}"
+
+
+def index_remote_photos(records: Iterable[FormRecord], download_dir: Path) -> Tuple[List[PhotoMeta], RemotePhotos]:
+    """Plan a local path for every photo attachment without downloading anything"""
+    metas: List[PhotoMeta] = []
+    remote: RemotePhotos = {}
+    for record in records:
+        for attachment in record.attachments:
+            if not attachment.download_url:
+                debug_print(f"    [SKIP] No download URL for {attachment.name} on form {record.id}")
+                continue
+            photo_path = download_dir / attachment_filename(record, attachment)
+            meta = parse_commcare_filename(photo_path)
+            if meta is None:
+                # Unparseable ids; keep the photo reviewable under its own form
+                meta = PhotoMeta(
+                    json_block="api_download",
+                    question_id=split_question_path(attachment.question_path)[0] if attachment.question_path else fallback_question_name(attachment.name),
+                    user_id=record.user_id,
+                    form_id=record.id,
+                    extension=photo_path.suffix.lstrip('.'),
+                    filename=photo_path.name,
+                    filepath=photo_path,
+                )
+            metas.append(meta)
+            remote[meta.filepath] = (record, attachment)
+    return metas, remote
+
+
+def target_photo_count(metas: Iterable[PhotoMeta], question_ids: Sequence[str], percent: float) -> int:
+    """Number of photos to review for ``percent`` of the photos answering ``question_ids``"""
+    filtered = [m for m in metas if m.question_id in question_ids]
+    return max(1, int(round(len(filtered) * (percent / 100.0)))) if filtered else 0
+
+
+def make_visit(form_id: str, metas: List[PhotoMeta], is_known_bad: bool = False) -> dict:
+    return {
+        "form_id": form_id,
+        "user_id": metas[0].user_id if metas else "",
+        "photos": metas,
+        "is_known_bad": is_known_bad,
+    }
+
+
+def sample_visits(metas: Iterable[PhotoMeta], question_ids: Sequence[str], target_photos: int, rng: Optional[random.Random] = None) -> Tuple[List[dict], List[Tuple[str, List[PhotoMeta]]]]:
+    """Shuffle visits (forms) and take whole visits until ``target_photos`` is reached.
+
+    Returns the selected visits and the remaining shuffled ``(form_id, metas)``
+    pairs, which callers can use as spares.
+    """
+    rng = rng or random
+    with profiling.span("sample"):
+        # Group by form_id (visit)
+        visits: Dict[str, List[PhotoMeta]] = {}
+        for m in metas:
+            if m.question_id in question_ids:
+                visits.setdefault(m.form_id, []).append(m)
+        visit_items = list(visits.items())
+        rng.shuffle(visit_items)
+        # Include visits until we surpass the wanted number of photos
+        selected: List[dict] = []
+        total = 0
+        for form_id, visit_metas in visit_items:
+            selected.append(make_visit(form_id, visit_metas))
+            total += len(visit_metas)
+            if target_photos and total >= target_photos:
+                break
+    return selected, visit_items[len(selected):]
+
+
+def known_bad_visits(kb_dir: Path, count: int, rng: Optional[random.Random] = None) -> List[dict]:
+    """Up to ``count`` random photos from ``kb_dir`` as single-photo known-bad visits"""
+    rng = rng or random
+    kb_paths = [p for p in Path(kb_dir).iterdir() if p.is_file()]
+    rng.shuffle(kb_paths)
+    visits = []
+    for i, p in enumerate(kb_paths[:count]):
+        form_id = f"KNOWN_BAD_{i}"
+        meta = PhotoMeta(
+            json_block="known_bad",
+            question_id="known_bad",
+            user_id="",
+            form_id=form_id,
+            extension=p.suffix.lstrip("."),
+            filename=p.name,
+            filepath=p,
+        )
+        visits.append(make_visit(form_id, [meta], is_known_bad=True))
+    return visits
+
+
+def configured_known_bad(config: dict, rng: Optional[random.Random] = None) -> List[dict]:
+    """The known-bad visits a session config asks for (none if known-bad photos are off)"""
+    if not (config.get("include_known_bad") and config.get("known_bad_dir")):
+        return []
+    try:
+        kb_count = int(config.get("known_bad_count", "5"))
+    except (ValueError, TypeError):
+        kb_count = 5
+    return known_bad_visits(Path(config["known_bad_dir"]), kb_count, rng)
+
+
+def insert_known_bad(visits: List[dict], config: dict, rng: Optional[random.Random] = None) -> List[dict]:
+    """Randomly mix the configured known-bad photos into ``visits``"""
+    rng = rng or random
+    kb_visits = configured_known_bad(config, rng)
+    if not kb_visits:
+        return visits
+    all_visits = visits + kb_visits
+    rng.shuffle(all_visits)
+    return all_visits
+
+
+def known_bad_slots(visit_count: int, kb_visits: List[dict], rng: Optional[random.Random] = None) -> Dict[int, dict]:
+    """Random review positions for known-bad visits among ``visit_count`` sampled visits.
+
+    Used when sampled visits arrive one by one and cannot be shuffled together
+    up front; the result maps a position in the final review order to the
+    known-bad visit that goes there.
+    """
+    rng = rng or random
+    positions = sorted(rng.sample(range(visit_count + len(kb_visits)), len(kb_visits)))
+    return dict(zip(positions, kb_visits))
+
+
+def plan_sampled_downloads(selected_visits: List[dict], remaining: list, remote: RemotePhotos, headroom_percent: float) -> Tuple[List[dict], list]:
+    """Sampled visits plus headroom spares, and the (record, attachment, path) jobs for their missing photos"""
+    headroom = int(math.ceil(len(selected_visits) * headroom_percent / 100.0))
+    candidates = list(selected_visits)
+    for form_id, metas in remaining[:headroom]:
+        candidates.append(make_visit(form_id, metas))
+
+    jobs = []
+    for visit in candidates:
+        for meta in visit["photos"]:
+            if meta.filepath in remote and not meta.filepath.exists():
+                record, attachment = remote[meta.filepath]
+                jobs.append((record, attachment, meta.filepath))
+    print(f"Downloading {len(jobs)} photos for {len(selected_visits)} sampled visits (+{len(candidates) - len(selected_visits)} headroom) out of {len(remote)} available")
+    return candidates, jobs
+
+
+def _meta_to_json(meta: PhotoMeta) -> dict:
+    return {
+        "filepath": str(Path(meta.filepath).resolve()),
+        "filename": meta.filename,
+        "json_block": meta.json_block,
+        "question_id": meta.question_id,
+        "user_id": meta.user_id,
+        "form_id": meta.form_id,
+        "extension": meta.extension,
+    }
+
+
+def _meta_from_json(data: dict) -> PhotoMeta:
+    return PhotoMeta(
+        json_block=data["json_block"],
+        question_id=data["question_id"],
+        user_id=data["user_id"],
+        form_id=data["form_id"],
+        extension=data["extension"],
+        filename=data["filename"],
+        filepath=Path(data["filepath"]),
+    )
+
+
+def save_session_manifest(path: Path, config: dict, visits: List[dict]) -> None:
+    """Write a prepared review session (config plus the sampled visits, in review order)"""
+    manifest = {
+        "version": SESSION_MANIFEST_VERSION,
+        "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "config": config,
+        "visits": [
+            dict(visit, photos=[_meta_to_json(m) for m in visit["photos"]])
+            for visit in visits
+        ],
+    }
+    Path(path).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+
+def load_session_manifest(path: Path) -> Tuple[dict, List[dict]]:
+    """Read a session written by save_session_manifest; returns (config, visits)"""
+    manifest = json.loads(Path(path).read_text(encoding="utf-8"))
+    if manifest.get("version") != SESSION_MANIFEST_VERSION:
+        raise ValueError(f"Unsupported session manifest version: {manifest.get('version')}")
+    visits = [
+        dict(visit, photos=[_meta_from_json(m) for m in visit["photos"]])
+        for visit in manifest["visits"]
+    ]
+    return manifest["config"], visits
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import sys
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Tuple
+
+
+# Cold start to first painted config window we aim to stay under
+STARTUP_TARGET_MS = 1500
+
+# Modules the config window should not need before the reviewer uses them
+HEAVY_MODULES = ("customtkinter", "PIL.Image", "PIL.ImageTk", "PIL.JpegImagePlugin", "requests", "urllib3")
+
+
+class StartupProfile:
+    """Wall-clock timings from launch to first paint, printed by ``--startup-profile``"""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.spans: List[Tuple[str, float]] = []
+        self.marks: List[Tuple[str, float]] = []
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000.0
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans.append((name, (time.perf_counter() - start) * 1000.0))
+
+    def mark(self, name: str) -> None:
+        """Record ``name`` at the time since launch"""
+        self.marks.append((name, self.elapsed_ms()))
+
+    def report(self, stream=None) -> None:
+        stream = stream or sys.stderr
+        print("Startup profile (ms):", file=stream)
+        for name, ms in self.spans:
+            print(f"  {name:<28} {ms:8.1f}", file=stream)
+        for name, ms in self.marks:
+            print(f"  {name + ' (since launch)':<28} {ms:8.1f}", file=stream)
+        if self.marks:
+            total = self.marks[-1][1]
+            verdict = "OK" if total <= STARTUP_TARGET_MS else "over target"
+            print(f"  target {STARTUP_TARGET_MS} ms: {verdict}", file=stream)
+        loaded = [m for m in HEAVY_MODULES if m in sys.modules]
+        deferred = [m for m in HEAVY_MODULES if m not in sys.modules]
+        print(f"  loaded:   {', '.join(loaded) or '-'}", file=stream)
+        print(f"  deferred: {', '.join(deferred) or '-'}", file=stream)
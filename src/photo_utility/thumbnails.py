@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import io
+import time
+from pathlib import Path
+from typing import Callable, Iterable, Optional, Tuple
+
+from . import profiling
+from .imaging import load_pillow, open_image
+from .scanner import CACHE_DIR_NAME
+
+
+# Width the review screen shows photos at
+REVIEW_WIDTH = 400
+THUMBNAIL_QUALITY = 90
+
+
+def thumbnail_path(photo: Path, width: int = REVIEW_WIDTH) -> Path:
+    return photo.parent / CACHE_DIR_NAME / "thumbs" / f"{photo.name}.w{width}.jpg"
+
+
+def cached_thumbnail(photo: Path, width: int = REVIEW_WIDTH) -> Optional[Path]:
+    """The prepared thumbnail for ``photo`` if one exists and is not older than the photo."""
+    thumb = thumbnail_path(photo, width)
+    try:
+        if thumb.stat().st_mtime_ns >= photo.stat().st_mtime_ns:
+            return thumb
+    except OSError:
+        pass
+    return None
+
+
+def thumbnail_size(size: Tuple[int, int], width: int = REVIEW_WIDTH) -> Optional[Tuple[int, int]]:
+    """Size of the ``width``-wide thumbnail of an image of ``size``, or None if it needs no thumbnail"""
+    w, h = size
+    if w <= width:
+        return None
+    return width, int(h * width / float(w))
+
+
+def encode_thumbnail(img, size: Tuple[int, int]) -> bytes:
+    """Resize a decoded image to ``size`` and encode it as a thumbnail JPEG"""
+    Image = load_pillow()
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    with profiling.span("resize"):
+        img = img.resize(size, Image.LANCZOS)
+    body = io.BytesIO()
+    img.save(body, "JPEG", quality=THUMBNAIL_QUALITY)
+    return body.getvalue()
+
+
+def render_thumbnail(photo: Path, width: int = REVIEW_WIDTH) -> Optional[bytes]:
+    """A ``width``-wide JPEG of ``photo``, or None when the photo is already narrow enough to be shown as-is"""
+    with open_image(photo) as img:
+        size = thumbnail_size(img.size, width)
+        if size is None:
+            return None
+        # Let the JPEG decoder do most of the downscaling
+        img.draft("RGB", size)
+        with profiling.span("decode"):
+            img = img.convert("RGB")
+    return encode_thumbnail(img, size)
+
+
+def make_thumbnail(photo: Path, width: int = REVIEW_WIDTH) -> Optional[Path]:
+    """Write a ``width``-wide JPEG of ``photo`` to the cache folder.
+
+    Returns the thumbnail path, or None when the photo is already narrow
+    enough to be shown as-is.
+    """
+    from .downloads import write_atomic
+
+    data = render_thumbnail(photo, width)
+    if data is None:
+        return None
+    thumb = thumbnail_path(photo, width)
+    thumb.parent.mkdir(parents=True, exist_ok=True)
+    write_atomic(thumb, data)
+    return thumb
+
+
+def load_review_image(photo: Path, width: int = REVIEW_WIDTH):
+    """``photo`` (or its prepared thumbnail) decoded and scaled to at most ``width`` wide, as the review screen shows it"""
+    Image = load_pillow()
+    img = open_image(cached_thumbnail(photo, width) or photo)
+    size = thumbnail_size(img.size, width)
+    if size is not None and img.format == "JPEG":
+        img.draft(img.mode, size)
+    with profiling.span("decode"):
+        img.load()
+    if size is not None and img.size != size:
+        with profiling.span("resize"):
+            img = img.resize(size, Image.LANCZOS)
+    return img
+
+
+def review_image_bytes(photo: Path, width: int = REVIEW_WIDTH) -> bytes:
+    """What the review screen shows for ``photo``: its cached or freshly made thumbnail, else the photo itself"""
+    thumb = cached_thumbnail(photo, width)
+    if thumb is not None:
+        return thumb.read_bytes()
+    data = render_thumbnail(photo, width)
+    return data if data is not None else photo.read_bytes()
+
+
+def _thumbnail_job(args: Tuple[Path, int]) -> Tuple[Path, Optional[Path], Optional[str], float]:
+    photo, width = args
+    started = time.perf_counter()
+    try:
+        return photo, make_thumbnail(photo, width), None, time.perf_counter() - started
+    except Exception as e:
+        return photo, None, str(e), time.perf_counter() - started
+
+
+def generate_thumbnails(
+    photos: Iterable[Path],
+    width: int = REVIEW_WIDTH,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int, Path, Optional[str]], None]] = None,
+) -> Tuple[int, int, int]:
+    """Make review thumbnails for ``photos`` in a process pool, skipping ones that are up to date.
+
+    ``progress(done, total, photo, error)`` is called per photo. Returns
+    ``(made, skipped, failed)`` counts.
+    """
+    pending = []
+    skipped = 0
+    for photo in photos:
+        if cached_thumbnail(photo, width) is not None:
+            skipped += 1
+        else:
+            pending.append((photo, width))
+    made = failed = 0
+    if not pending:
+        return made, skipped, failed
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunksize = max(1, min(32, len(pending) // ((workers or 4) * 4)))
+        for done, (photo, thumb, error, seconds) in enumerate(pool.map(_thumbnail_job, pending, chunksize=chunksize), 1):
+            # Workers are separate processes, so their time is recorded here as one span per photo
+            profiling.record("thumbnail", seconds)
+            if error is not None:
+                failed += 1
+            elif thumb is None:
+                skipped += 1
+            else:
+                made += 1
+            if progress is not None:
+                progress(done, len(pending), photo, error)
+    return made, skipped, failed
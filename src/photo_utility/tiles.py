@@ -0,0 +1,127 @@
+"""Tile pyramids for zooming into full-resolution photos.
+
+Level 0 is the photo at full resolution and each level above halves it,
+up to one that fits in a single tile. Tiles are decoded on demand, only
+for the part of a level being looked at, and kept in a byte-budgeted
+cache shared by every photo.
+
+JPEGs are never decoded at more than the level's resolution. Levels 1-3
+come straight out of the decoder's 1/2, 1/4 and 1/8 draft scaling, and
+coarser levels are reduced from 1/8. Rows are decoded from the top
+down, because JPEG data cannot be entered part way through. For levels
+1 and up, the whole level is decoded and cut up. At level 0 decoding
+stops at the lowest tile row in view, so a reviewer zoomed in on the top
+of a photo never has the rest of it decoded. PNGs have no draft mode and
+are decoded whole, then reduced.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List, Tuple
+
+from . import profiling
+from .image_cache import DecodedImageCache
+from .imaging import open_image
+
+
+TILE_SIZE = 256
+DEFAULT_TILE_CACHE_BYTES = 96 * 1024 * 1024
+# Coarsest reduction JPEG decoders can do themselves
+MAX_DRAFT_LEVEL = 3
+
+# (tile column, tile row), its top-left corner in level pixels, the tile image
+Tile = Tuple[Tuple[int, int], Tuple[int, int], object]
+
+
+class TilePyramid:
+    """The tiles of one photo; only its header is read until tiles are asked for"""
+
+    def __init__(self, path: Path, cache: DecodedImageCache, tile_size: int = TILE_SIZE) -> None:
+        self.path = Path(path)
+        self.cache = cache
+        self.tile_size = tile_size
+        with open_image(self.path) as img:
+            self.size = img.size
+            self.format = img.format
+        levels = 1
+        while max(self.level_size(levels - 1)) > tile_size:
+            levels += 1
+        self.levels = levels
+
+    def level_size(self, level: int) -> Tuple[int, int]:
+        # Rounded up, as the JPEG decoder's scaled output is
+        scale = 1 << level
+        w, h = self.size
+        return (w + scale - 1) // scale, (h + scale - 1) // scale
+
+    def grid(self, level: int) -> Tuple[int, int]:
+        """Tile columns and rows at ``level``"""
+        w, h = self.level_size(level)
+        return (w + self.tile_size - 1) // self.tile_size, (h + self.tile_size - 1) // self.tile_size
+
+    def tiles(self, level: int, box: Tuple[float, float, float, float]) -> List[Tile]:
+        """Tiles of ``level`` overlapping ``box`` (left, top, right, bottom in level pixels), decoding any missing"""
+        cols, rows = self.grid(level)
+        left, top, right, bottom = box
+        c0 = max(0, int(left // self.tile_size))
+        r0 = max(0, int(top // self.tile_size))
+        c1 = min(cols - 1, int(max(left, right - 1) // self.tile_size))
+        r1 = min(rows - 1, int(max(top, bottom - 1) // self.tile_size))
+        wanted = [(c, r) for r in range(r0, r1 + 1) for c in range(c0, c1 + 1)]
+        missing_rows = [r for c, r in wanted if (self.path, level, c, r) not in self.cache]
+        if missing_rows:
+            self._decode_rows(level, min(missing_rows), max(missing_rows))
+        tiles = []
+        for c, r in wanted:
+            tile = self.cache.get((self.path, level, c, r))
+            if tile is not None:
+                tiles.append(((c, r), (c * self.tile_size, r * self.tile_size), tile))
+        return tiles
+
+    def _decode_rows(self, level: int, first_row: int, last_row: int) -> None:
+        """Decode ``level`` down to ``last_row`` and cache its tiles; all of them above level 0"""
+        cols, rows = self.grid(level)
+        if level > 0:
+            first_row, last_row = 0, rows - 1
+        bottom = min(self.level_size(level)[1], (last_row + 1) * self.tile_size)
+        with profiling.span("zoom.decode"):
+            band = self._decode_band(level, bottom)
+        with profiling.span("zoom.tile"):
+            for r in range(first_row, last_row + 1):
+                for c in range(cols):
+                    box = (c * self.tile_size, r * self.tile_size,
+                           min(band.width, (c + 1) * self.tile_size), min(band.height, (r + 1) * self.tile_size))
+                    self.cache.put((self.path, level, c, r), band.crop(box))
+
+    def _decode_band(self, level: int, bottom: int):
+        """The top ``bottom`` rows of ``level``"""
+        # Closed explicitly: a truncated JPEG decode leaves Pillow holding the file open
+        with open_image(self.path) as img:
+            if self.format != "JPEG":
+                img.load()
+                band = img.reduce(1 << level) if level else img
+                return band.crop((0, 0, band.width, bottom)) if bottom < band.height else band.copy()
+            draft_level = min(level, MAX_DRAFT_LEVEL)
+            w, h = self.level_size(draft_level)
+            img.draft(img.mode, (w, h))
+            if level == draft_level and bottom < img.height:
+                _truncate_jpeg(img, bottom)
+            else:
+                img.load()
+            if level > draft_level:
+                return img.reduce(1 << (level - draft_level))
+            return img.copy()
+
+
+def _truncate_jpeg(img, bottom: int) -> None:
+    """Decode only the top ``bottom`` rows of an opened (drafted) JPEG into ``img``"""
+    name, extents, offset, args = img.tile[0]
+    img._size = (img.width, bottom)
+    img.tile = [(name, (0, 0, img.width, bottom), offset, args)]
+    try:
+        img.load()
+    except OSError:
+        # libjpeg objects to finishing with scanlines left unread; the rows asked for are decoded by then
+        if img.im is None or img.im.size != (img.width, bottom):
+            raise
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from . import profiling
+from .filenames import PhotoMeta
+from .imaging import open_image
+from .scanner import PhotoState, is_fresh, load_photo_state, write_photo_state
+
+
+QUARANTINE_NAME = "quarantine.json"
+QUARANTINE_VERSION = 1
+# Photos handed to the process pool between cancel checks and state saves
+VALIDATION_BATCH = 2048
+
+JPEG_MAGIC = b"\xff\xd8\xff"
+PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+
+# Photo name -> [size, mtime_ns, reason]; reason is None for photos that passed
+ValidationState = PhotoState
+
+
+def check_photo(path: Path) -> Optional[str]:
+    """Why ``path`` cannot be shown, or None if it decodes cleanly.
+
+    Checks the JPEG/PNG signature, runs Image.verify() (PNG chunk CRCs), then
+    decodes the whole image. JPEGs are decoded at 1/8 scale, which still reads
+    every compressed block, so truncation and corrupt data are caught at a
+    fraction of the cost of a full-size decode.
+    """
+    try:
+        with open(path, "rb") as f:
+            head = f.read(8)
+        if not head:
+            return "empty file"
+        if not (head.startswith(JPEG_MAGIC) or head.startswith(PNG_MAGIC)):
+            # e.g. an HTML error page or a zero-filled partial download saved under a photo name
+            return "not a JPEG or PNG file"
+        with open_image(path) as img:
+            img.verify()
+        with open_image(path) as img:
+            if img.format == "JPEG":
+                img.draft(img.mode, (max(1, img.width // 8), max(1, img.height // 8)))
+            img.load()
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+    return None
+
+
+def _check_job(path: str) -> Optional[str]:
+    return check_photo(Path(path))
+
+
+def load_validation_state(root: Path) -> ValidationState:
+    """Results of earlier checks in ``root``; empty if there are none"""
+    return load_photo_state(root, QUARANTINE_NAME, QUARANTINE_VERSION)
+
+
+def write_validation_state(root: Path, state: ValidationState) -> Path:
+    return write_photo_state(root, QUARANTINE_NAME, QUARANTINE_VERSION, state)
+
+
+def quarantined_photos(root: Path, state: Optional[ValidationState] = None) -> Dict[Path, str]:
+    """Photos in ``root`` recorded as unreadable that have not changed since they were checked"""
+    if state is None:
+        state = load_validation_state(root)
+    quarantined = {}
+    for name, entry in state.items():
+        if entry[2] is None:
+            continue
+        path = root / name
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        if is_fresh(entry, st):
+            quarantined[path] = entry[2]
+    return quarantined
+
+
+def validate_photos(
+    root: Path,
+    photos: Iterable[Path],
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+    cancel: Optional[threading.Event] = None,
+) -> Tuple[Dict[Path, str], int]:
+    """Check ``photos`` (files directly in ``root``) in a process pool and quarantine the unreadable ones.
+
+    Photos whose size and mtime match an earlier check in ``root``'s
+    quarantine file are not opened again. Returns ``({path: reason}`` for every
+    quarantined photo, number of photos checked this time). ``progress(done,
+    total)`` counts the photos that needed checking. Setting ``cancel`` stops
+    after the current batch; results so far are still saved.
+    """
+    state = load_validation_state(root)
+    pending: List[Tuple[str, int, int]] = []
+    for path in photos:
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        if is_fresh(state.get(path.name), st):
+            continue
+        pending.append((path.name, st.st_size, st.st_mtime_ns))
+
+    checked = 0
+    if pending:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with profiling.span("validate"), ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, min(64, len(pending) // ((workers or os.cpu_count() or 4) * 4)))
+            for start in range(0, len(pending), VALIDATION_BATCH):
+                if cancel is not None and cancel.is_set():
+                    break
+                batch = pending[start:start + VALIDATION_BATCH]
+                paths = [str(root / name) for name, _, _ in batch]
+                for (name, size, mtime_ns), reason in zip(batch, pool.map(_check_job, paths, chunksize=chunksize)):
+                    state[name] = [size, mtime_ns, reason]
+                    checked += 1
+                    if progress is not None:
+                        progress(checked, len(pending))
+        write_validation_state(root, state)
+    return quarantined_photos(root, state), checked
+
+
+def drop_quarantined(metas: Iterable[PhotoMeta], quarantined: Set[Path]) -> List[PhotoMeta]:
+    return [meta for meta in metas if meta.filepath not in quarantined]
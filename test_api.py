@@ -4,9 +4,16 @@ Test script to verify CommCare API functionality
 """
 
 import json
+import sys
 import requests
 from pathlib import Path
 
+# Share the download and form helpers with the application package
+sys.path.insert(0, str(Path(__file__).resolve().parent / "src"))
+from photo_utility.commcare import form_list_url
+from photo_utility.downloads import download_to_file
+from photo_utility.forms import attachment_filename, project_form
+
 def test_api_parsing():
     """Test parsing the API inputs file"""
     print("=== Testing API Input File Parsing ===")
@@ -40,14 +47,17 @@ def test_api_parsing():
             
             # Extract domain and app_id from JSON
             domain_form_pairs = {}
-            for domain, app_id in data.items():
+            for domain, app_ids in data.items():
                 # Clean domain name (remove quotes and extra characters)
                 domain = domain.strip().strip('"')
-                # Clean app_id (remove quotes and extra characters)
-                app_id = app_id.strip().strip('"')
+                # A domain maps to a single app id or a list of them
+                if isinstance(app_ids, str):
+                    app_ids = [app_ids]
+                # Clean app_ids (remove quotes and extra characters)
+                app_ids = [app_id.strip().strip('"') for app_id in app_ids]
                 
-                domain_form_pairs[domain] = app_id
-                print(f"[OK] Domain: '{domain}' -> Form app_id: '{app_id}'")
+                domain_form_pairs[domain] = app_ids
+                print(f"[OK] Domain: '{domain}' -> Form app_id(s): {app_ids}")
             
             return domain_form_pairs
             
@@ -130,12 +140,13 @@ def test_api_call(domain_form_pairs, username, api_key):
         return False
     
     # Test with the first domain/form pair
-    domain, app_id = next(iter(domain_form_pairs.items()))
+    domain, app_ids = next(iter(domain_form_pairs.items()))
+    app_id = app_ids[0]
     print(f"Testing with domain: '{domain}', app_id: '{app_id}'")
     
     try:
         # CommCare List Forms API
-        url = f"https://www.commcarehq.org/a/{domain}/api/v0.5/form/"
+        url = form_list_url(domain)
         print(f"API URL: {url}")
         
         params = {
@@ -256,67 +267,46 @@ def test_photo_download(forms_data, username, api_key):
         attachments = form.get('attachments', {})
         print(f"  Found {len(attachments)} attachments")
         
-        for attachment_name, attachment_info in attachments.items():
-            # Check if it's a photo file
-            if attachment_name.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.bmp')):
-                print(f"  Processing photo: {attachment_name}")
-                try:
-                    # Get the download URL from attachment info
-                    download_url = attachment_info.get('download_url')
-                    if not download_url:
-                        # Try alternative URL structure
-                        download_url = attachment_info.get('url')
+        # Project the form once: its photo attachments with their question paths resolved in a single pass
+        record = project_form(form)
+        
+        for attachment in record.attachments:
+            attachment_name = attachment.name
+            print(f"  Processing photo: {attachment_name}")
+            try:
+                download_url = attachment.download_url
+                
+                if download_url:
+                    print(f"    Download URL: {download_url}")
                     
-                    if download_url:
-                        print(f"    Download URL: {download_url}")
-                        
-                        # Download the photo
-                        photo_response = requests.get(download_url, auth=(username, api_key))
-                        photo_response.raise_for_status()
-                        
-                        # Extract question name from attachment name or form data
-                        question_name = extract_question_name(attachment_name, form)
-                        
-                        # Create filename in CommCare format with proper extension
-                        # Determine file extension from original attachment name
-                        file_ext = '.jpg'  # Default to .jpg
-                        if attachment_name.lower().endswith('.jpeg'):
-                            file_ext = '.jpeg'
-                        elif attachment_name.lower().endswith('.png'):
-                            file_ext = '.png'
-                        elif attachment_name.lower().endswith('.gif'):
-                            file_ext = '.gif'
-                        elif attachment_name.lower().endswith('.bmp'):
-                            file_ext = '.bmp'
-                        
-                        filename = f"test_photo-{question_name}-{user_id}-form_{form_id}{file_ext}"
-                        file_path = download_dir / filename
-                        
-                        print(f"    DEBUG: Creating filename: {filename}")
-                        print(f"    DEBUG: Question name: {question_name}")
-                        print(f"    DEBUG: User ID: {user_id}")
-                        print(f"    DEBUG: Form UUID: {form_id}")
-                        print(f"    DEBUG: File extension: {file_ext}")
-                        
-                        with open(file_path, 'wb') as f:
-                            f.write(photo_response.content)
-                        
-                        downloaded_photos.append(str(file_path))
-                        photo_count += 1
-                        
-                        # Track photos per domain
-                        if domain not in photos_per_domain:
-                            photos_per_domain[domain] = 0
-                        photos_per_domain[domain] += 1
-                        
-                        print(f"    [OK] Downloaded: {filename}")
-                        
-                    else:
-                        print(f"    [ERROR] No download URL found for {attachment_name}")
-                        
-                except Exception as e:
-                    print(f"    [ERROR] Error downloading {attachment_name}: {e}")
-                    continue
+                    # Same CommCare-style name as the app, so photos from different repeat entries get their own file
+                    filename = attachment_filename(record, attachment)
+                    file_path = download_dir / filename
+                    
+                    print(f"    DEBUG: Creating filename: {filename}")
+                    print(f"    DEBUG: Question path: {attachment.question_path}")
+                    print(f"    DEBUG: User ID: {user_id}")
+                    print(f"    DEBUG: Form UUID: {form_id}")
+                    
+                    # Stream the photo to disk; the file only appears once complete
+                    download_to_file(download_url, file_path, auth=(username, api_key), timeout=30)
+                    
+                    downloaded_photos.append(str(file_path))
+                    photo_count += 1
+                    
+                    # Track photos per domain
+                    if domain not in photos_per_domain:
+                        photos_per_domain[domain] = 0
+                    photos_per_domain[domain] += 1
+                    
+                    print(f"    [OK] Downloaded: {filename}")
+                    
+                else:
+                    print(f"    [ERROR] No download URL found for {attachment_name}")
+                    
+            except Exception as e:
+                print(f"    [ERROR] Error downloading {attachment_name}: {e}")
+                continue
     
     # Print download summary
     print(f"\nDownload summary:")
@@ -332,41 +322,6 @@ def test_photo_download(forms_data, username, api_key):
     
     return downloaded_photos
 
-def extract_question_name(attachment_name, form):
-    """Extract question name from form data by finding the key that has this attachment as its value"""
-    # Look for question path in form data that matches this attachment
-    form_data = form.get('form', {})
-    if form_data:
-        # Recursively search through nested dictionaries
-        def find_question_in_data(data, path=""):
-            if isinstance(data, dict):
-                for key, value in data.items():
-                    current_path = f"{path}.{key}" if path else key
-                    if isinstance(value, str) and value == attachment_name:
-                        # Found the key that corresponds to this attachment
-                        print(f"    DEBUG: Found question key '{key}' for attachment '{attachment_name}' at path '{current_path}'")
-                        return key
-                    elif isinstance(value, str) and attachment_name in value:
-                        # Partial match - the value contains the attachment name
-                        print(f"    DEBUG: Found partial match - key '{key}' contains attachment '{attachment_name}' at path '{current_path}'")
-                        return key
-                    elif isinstance(value, dict):
-                        # Recursively search nested dictionaries
-                        result = find_question_in_data(value, current_path)
-                        if result:
-                            return result
-            return None
-        
-        # Search through the form data
-        question_name = find_question_in_data(form_data)
-        if question_name:
-            return question_name
-    
-    # Fallback: use a generic name based on attachment
-    fallback_name = attachment_name.replace('.jpg', '').replace('.jpeg', '').replace('.png', '')
-    print(f"    DEBUG: Using fallback question name: {fallback_name}")
-    return fallback_name
-
 def main():
     """Main test function"""
     print("CommCare API Test Script")
@@ -10,6 +10,12 @@ import json
 import requests
 from pathlib import Path
 import threading
+import sys
+
+# Use the package from src/ without installing it
+sys.path.insert(0, str(Path(__file__).resolve().parent / "src"))
+from photo_utility.commcare import form_list_url
+
 
 class APIResultsViewer:
     def __init__(self):
@@ -108,14 +114,17 @@ class APIResultsViewer:
                 
                 # Extract domain and app_id from JSON
                 domain_form_pairs = {}
-                for domain, app_id in data.items():
+                for domain, app_ids in data.items():
                     # Clean domain name (remove quotes and extra characters)
                     domain = domain.strip().strip('"')
-                    # Clean app_id (remove quotes and extra characters)
-                    app_id = app_id.strip().strip('"')
+                    # A domain maps to a single app id or a list of them
+                    if isinstance(app_ids, str):
+                        app_ids = [app_ids]
+                    # Clean app_ids (remove quotes and extra characters)
+                    app_ids = [app_id.strip().strip('"') for app_id in app_ids]
                     
-                    domain_form_pairs[domain] = app_id
-                    self.log(f"✅ Domain: '{domain}' -> Form app_id: '{app_id}'", "green")
+                    domain_form_pairs[domain] = app_ids
+                    self.log(f"✅ Domain: '{domain}' -> Form app_id(s): {app_ids}", "green")
                 
                 return domain_form_pairs
                 
@@ -209,12 +218,13 @@ class APIResultsViewer:
         all_forms = []
         total_forms = 0
         
-        for domain, app_id in domain_form_pairs.items():
+        pairs = [(domain, app_id) for domain, app_ids in domain_form_pairs.items() for app_id in app_ids]
+        for domain, app_id in pairs:
             self.log(f"Testing with domain: '{domain}', app_id: '{app_id}'")
             
             try:
                 # CommCare List Forms API
-                url = f"https://www.commcarehq.org/a/{domain}/api/v0.5/form/"
+                url = form_list_url(domain)
                 self.log(f"API URL: {url}")
                 
                 params = {